@@ -0,0 +1,122 @@
+"""Import-time profile for the Bunga di Kebun app.
+
+Runs ``python -X importtime`` on the app module in a fresh interpreter and
+reports the slowest top-level imports, so cold-start regressions on the
+small VM show up before they are deployed.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --top 15 --json import_time.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_MODULE = 'streamlit_firebase_tracker'
+
+# Modules that must stay out of the login-page import path. Streamlit itself imports
+# plotly.graph_objects for st.plotly_chart, so only plotly.express is checked.
+DEFERRED_MODULES = ['plotly.express', 'firebase_admin', 'smtplib', 'email.mime', 'google.generativeai']
+
+
+def profile_import(module):
+    """Import module in a fresh interpreter and return (wall_seconds, rows).
+    Each row is {'module', 'self_us', 'cumulative_us', 'depth'}."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    wall_seconds = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError("Importing " + module + " failed:\n" + result.stderr[-2000:])
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        # The module name is indented two spaces per nesting level after one separator space
+        name = name.rstrip()[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        rows.append({
+            'module': name.strip(),
+            'self_us': int(self_us.strip()),
+            'cumulative_us': int(cumulative_us.strip()),
+            'depth': depth
+        })
+    return wall_seconds, rows
+
+
+def summarize(module, wall_seconds, rows, top):
+    # The profiled module is the depth-0 row; its direct imports are at depth 1
+    module_rows = [row for row in rows if row['depth'] == 0 and row['module'] == module]
+    direct_imports = [row for row in rows if row['depth'] == 1]
+    direct_imports.sort(key=lambda row: row['cumulative_us'], reverse=True)
+
+    imported = {row['module'] for row in rows}
+    loaded_deferred = [
+        name for name in DEFERRED_MODULES
+        if any(loaded == name or loaded.startswith(name + '.') for loaded in imported)
+    ]
+
+    return {
+        'module': module,
+        'wall_seconds': round(wall_seconds, 3),
+        'import_seconds': round(sum(row['cumulative_us'] for row in module_rows) / 1e6, 3),
+        'modules_imported': len(rows),
+        'slowest_imports': [
+            {'module': row['module'], 'cumulative_ms': round(row['cumulative_us'] / 1000, 1)}
+            for row in direct_imports[:top]
+        ],
+        'deferred_modules_loaded': loaded_deferred
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the app's cold-start import time")
+    parser.add_argument('--module', default=APP_MODULE, help="Module to import (default: the app)")
+    parser.add_argument('--top', type=int, default=10, help="Number of slowest direct imports to show")
+    parser.add_argument('--runs', type=int, default=3, help="Take the fastest of this many runs")
+    parser.add_argument('--json', dest='json_path', help="Also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.runs):
+        wall_seconds, rows = profile_import(args.module)
+        if best is None or wall_seconds < best[0]:
+            best = (wall_seconds, rows)
+
+    summary = summarize(args.module, best[0], best[1], args.top)
+
+    print("Import profile for {} ({} modules)".format(summary['module'], summary['modules_imported']))
+    print("  Wall time:   {:.3f} s".format(summary['wall_seconds']))
+    print("  Import time: {:.3f} s".format(summary['import_seconds']))
+    print("  Slowest direct imports:")
+    for row in summary['slowest_imports']:
+        print("    {:>9.1f} ms  {}".format(row['cumulative_ms'], row['module']))
+
+    if summary['deferred_modules_loaded']:
+        print("  WARNING: deferred modules imported eagerly: " + ', '.join(summary['deferred_modules_loaded']))
+    else:
+        print("  Deferred modules not loaded: " + ', '.join(DEFERRED_MODULES))
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    return 1 if summary['deferred_modules_loaded'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""Benchmarks for the storage and analytics hot paths of Bunga di Kebun.
+
+Runs each scenario against seeded synthetic data (see synthetic_data.py) for
+1, 3 and 10 years of history and reports min/median/mean wall time. Storage
+runs against the app's in-process local store by default, so timings reflect
+the app code rather than network latency. With --backend fake it runs against
+fake_firestore.py instead, which also reports Firestore round trips and can
+simulate a slow connection with --latency-ms/--jitter-ms.
+
+    python benchmarks/run_benchmarks.py --json bench_before.json
+    python benchmarks/run_benchmarks.py --json bench_after.json --compare bench_before.json
+    python benchmarks/run_benchmarks.py --backend fake --latency-ms 5 --years 1
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import streamlit.logger
+from streamlit import config as streamlit_config
+
+# st.* calls outside a script run log a warning each; keep the report readable.
+# Parse the config first, otherwise Streamlit resets the level when it is read later.
+streamlit_config.get_config_options()
+streamlit.logger.set_log_level('error')
+
+from synthetic_data import REPO_ROOT, app, generate_dataset
+
+DEFAULT_YEARS = [1, 3, 10]
+
+# A median this much slower than the baseline is reported as a regression
+REGRESSION_THRESHOLD = 0.20
+
+
+def farm_documents(dataset):
+    """Farm rows as save_farm_changes writes them to Firestore"""
+    records = dataset['farm_data'].to_dict('records')
+    for record in records:
+        record['Date'] = record['Date'].isoformat()
+        record['username'] = dataset['username']
+        for farm in app.FARM_COLUMNS:
+            record[farm] = int(record[farm])
+    return records
+
+
+def reset_store(dataset):
+    """Seed the storage backend with the dataset for every scenario repetition"""
+    username = dataset['username']
+    if app.storage_backend() == 'fake':
+        client = app.get_fake_firestore_client()
+        client.clear()
+        client.load_documents('farm_data', farm_documents(dataset))
+        client.load_documents('harvest_data', dataset['harvests'])
+        client.load_documents('revenue_data', dataset['estimates'])
+    else:
+        store = app.get_local_store()
+        store['farm_data'][username] = dataset['farm_data'].to_dict('records')
+        store['harvest_data'][username] = list(dataset['harvests'])
+        store['revenue_data'][username] = list(dataset['estimates'])
+        store['summaries'].pop(username, None)
+    app.get_shared_user_cache()['users'].pop(username, None)
+
+
+def round_trips():
+    if app.storage_backend() != 'fake':
+        return None
+    return app.get_fake_firestore_client().round_trips
+
+
+def scenario_load_data(dataset):
+    reset_store(dataset)
+    return lambda: app.load_data(dataset['username'])
+
+
+def scenario_save_farm_changes(dataset):
+    """The data editor saving a week of corrected days"""
+    reset_store(dataset)
+    username = dataset['username']
+    updated_df = app.get_cached_farm_data(username).copy()
+    edited = updated_df.index[-7:]
+    updated_df.loc[edited, app.FARM_COLUMNS] += 1
+    upserts = updated_df.loc[edited]
+
+    def run():
+        if not app.save_farm_changes(username, updated_df, upserts, []):
+            raise RuntimeError("save_farm_changes failed")
+    return run
+
+
+def scenario_commit_harvest_changes(dataset):
+    """Editing the notes of the five latest harvests"""
+    reset_store(dataset)
+    username = dataset['username']
+    latest = sorted(app.get_cached_harvest_data(username), key=lambda h: h['created_at'])[-5:]
+    upserts = [dict(harvest, notes='checked') for harvest in latest]
+
+    def run():
+        if not app.commit_harvest_changes(username, upserts=upserts):
+            raise RuntimeError("commit_harvest_changes failed")
+    return run
+
+
+def scenario_commit_revenue_changes(dataset):
+    """Editing the latest estimate"""
+    reset_store(dataset)
+    username = dataset['username']
+    latest = max(app.get_cached_revenue_data(username), key=lambda t: t['created_at'])
+    upserts = [dict(latest, total_bakul=latest['total_bakul'] + 1)]
+
+    def run():
+        if not app.commit_revenue_changes(username, upserts=upserts):
+            raise RuntimeError("commit_revenue_changes failed")
+    return run
+
+
+def scenario_add_data(dataset):
+    reset_store(dataset)
+    st.session_state.username = dataset['username']
+    st.session_state.current_user_data = app.compact_farm_frame(dataset['farm_data'].copy())
+    new_date = (dataset['farm_data']['Date'].max() + timedelta(days=1)).date()
+
+    def run():
+        status, _ = app.add_data(new_date, 1200, 900, 600, 300, confirmed=True)
+        if status != "success":
+            raise RuntimeError("add_data returned " + status)
+    return run
+
+
+def scenario_harvest_history(dataset):
+    harvests = dataset['harvests']
+
+    def run():
+        summary_list = app.summarize_harvests_by_flower_date(harvests)
+        sorted_harvests = sorted(harvests, key=lambda x: x['harvest_date'], reverse=True)
+        app.summarize_harvests_by_day(sorted_harvests)
+        return summary_list
+    return run
+
+
+def scenario_revenue_history(dataset):
+    estimates = dataset['estimates']
+
+    def run():
+        sorted_transactions = app.sort_revenue_transactions(estimates)
+        return pd.DataFrame(app.build_revenue_history_rows(sorted_transactions))
+    return run
+
+
+SCENARIOS = {
+    'load_data': scenario_load_data,
+    'save_farm_changes': scenario_save_farm_changes,
+    'commit_harvest_changes': scenario_commit_harvest_changes,
+    'commit_revenue_changes': scenario_commit_revenue_changes,
+    'add_data': scenario_add_data,
+    'harvest_history': scenario_harvest_history,
+    'revenue_history': scenario_revenue_history
+}
+
+
+def time_scenario(name, dataset, repeat):
+    """Wall time in ms of `repeat` runs, each with freshly seeded state"""
+    timings = []
+    trips = None
+    for _ in range(repeat):
+        run = SCENARIOS[name](dataset)
+        gc.collect()
+        trips_before = round_trips()
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+        if trips_before is not None:
+            trips = round_trips() - trips_before
+    return {
+        'scenario': name,
+        'years': dataset['years'],
+        'farm_rows': len(dataset['farm_data']),
+        'harvests': len(dataset['harvests']),
+        'estimates': len(dataset['estimates']),
+        'repeat': repeat,
+        'round_trips': trips,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.mean(timings), 3)
+    }
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_metadata(seed, repeat):
+    fake_settings = app.fake_firestore_settings() if app.storage_backend() == 'fake' else None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'seed': seed,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'streamlit': st.__version__,
+        'storage_backend': app.storage_backend(),
+        'fake_firestore': fake_settings
+    }
+
+
+def compare(results, baseline_path):
+    """Print the median change against a previous run; return the regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(row['scenario'], row['years']): row for row in baseline['results']}
+
+    print()
+    print("Compared with {} ({})".format(baseline_path, baseline['meta'].get('git_revision') or 'unknown revision'))
+    regressions = []
+    for row in results:
+        before = previous.get((row['scenario'], row['years']))
+        if not before or before['median_ms'] <= 0:
+            continue
+        change = (row['median_ms'] - before['median_ms']) / before['median_ms']
+        flag = ''
+        if change > REGRESSION_THRESHOLD:
+            flag = '  REGRESSION'
+            regressions.append(row)
+        print("  {:<24} {:>3}y  {:>10.2f} -> {:>10.2f} ms  {:>+7.1%}{}".format(
+            row['scenario'], row['years'], before['median_ms'], row['median_ms'], change, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark storage and analytics hot paths on synthetic data")
+    parser.add_argument('--years', type=int, nargs='+', default=DEFAULT_YEARS, help="History sizes in years")
+    parser.add_argument('--scenario', nargs='+', choices=sorted(SCENARIOS), help="Only run these scenarios")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per scenario")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the synthetic data")
+    parser.add_argument('--json', dest='json_path', help="Write results to this JSON file")
+    parser.add_argument('--compare', help="Previous --json output to compare against")
+    parser.add_argument('--backend', choices=['local', 'fake'], default='local', help="Storage backend to run against")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Fake backend latency per round trip")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Fake backend latency jitter (+/-)")
+    args = parser.parse_args()
+
+    os.environ['BUNGA_STORAGE_BACKEND'] = args.backend
+    os.environ['BUNGA_FAKE_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['BUNGA_FAKE_JITTER_MS'] = str(args.jitter_ms)
+    os.environ['BUNGA_FAKE_SEED'] = str(args.seed)
+    scenarios = args.scenario or list(SCENARIOS)
+    results = []
+
+    print("{:<24} {:>4}  {:>7}  {:>10} {:>10} {:>10} {:>8}".format(
+        'scenario', 'yrs', 'rows', 'min ms', 'median ms', 'mean ms', 'trips'))
+    for years in args.years:
+        dataset = generate_dataset(years, seed=args.seed)
+        for name in scenarios:
+            row = time_scenario(name, dataset, args.repeat)
+            results.append(row)
+            print("{:<24} {:>4}  {:>7}  {:>10.2f} {:>10.2f} {:>10.2f} {:>8}".format(
+                name, years, row['farm_rows'], row['min_ms'], row['median_ms'], row['mean_ms'],
+                '-' if row['round_trips'] is None else row['round_trips']))
+
+    output = {'meta': run_metadata(args.seed, args.repeat), 'results': results}
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
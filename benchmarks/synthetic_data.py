@@ -0,0 +1,181 @@
+"""Seeded synthetic data for the Bunga di Kebun benchmarks.
+
+Generates flower entries, harvest records and revenue estimates with the same
+structure the app writes, sized by years of daily history:
+
+    from benchmarks.synthetic_data import generate_dataset
+    dataset = generate_dataset(years=3, seed=42)
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import streamlit_firebase_tracker as app
+
+# Typical daily bunga per farm at peak season
+FARM_BASE_BUNGA = [3200, 2400, 1600, 900]
+ZERO_DAY_PROBABILITY = 0.08
+HARVEST_DAYS_AFTER_PLANTING = (27, 35)
+ESTIMATES_PER_YEAR = 50
+
+
+def generate_farm_data(years, rng, start_date=None):
+    """Daily bunga counts per farm with a yearly season and occasional zero days"""
+    days = int(365 * years)
+    end_date = start_date or (datetime.now().date() - timedelta(days=1))
+    dates = pd.date_range(end=pd.Timestamp(end_date), periods=days, freq='D')
+
+    season = 0.6 + 0.4 * np.sin(2 * np.pi * dates.dayofyear.to_numpy() / 365.0)
+    data = {'Date': dates}
+    for farm, base in zip(app.FARM_COLUMNS, FARM_BASE_BUNGA):
+        counts = rng.normal(base * season, base * 0.15).clip(min=0)
+        counts[rng.random(days) < ZERO_DAY_PROBABILITY] = 0
+        data[farm] = counts.astype(np.int64)
+    return pd.DataFrame(data)
+
+
+def _size_split(total, rng):
+    """Split total bakul across fruit sizes around DEFAULT_DISTRIBUTION"""
+    weights = np.array([app.DEFAULT_DISTRIBUTION[size] for size in app.HARVEST_FRUIT_SIZES], dtype=float)
+    shares = rng.dirichlet(weights)
+    return rng.multinomial(total, shares)
+
+
+def generate_harvests(farm_df, rng, username, harvest_ratio=0.5):
+    """1-3 harvests for a share of the flower batches, 27-35 days after planting"""
+    harvests = []
+    flower_rows = farm_df[farm_df[app.FARM_COLUMNS].sum(axis=1) > 0]
+    flower_rows = flower_rows[rng.random(len(flower_rows)) < harvest_ratio]
+    today = datetime.now().date()
+
+    for _, row in flower_rows.iterrows():
+        plant_date = row['Date'].date()
+        total_bunga = int(sum(row[col] for col in app.FARM_COLUMNS))
+        total_bakul = int(total_bunga / 40)
+        if total_bakul == 0:
+            continue
+
+        harvest_count = int(rng.integers(1, 4))
+        offsets = sorted(rng.integers(HARVEST_DAYS_AFTER_PLANTING[0], HARVEST_DAYS_AFTER_PLANTING[1] + 1, harvest_count))
+        yield_share = rng.uniform(0.6, 1.0)
+        cumulative = 0.0
+
+        for number, offset in enumerate(offsets, start=1):
+            harvest_date = plant_date + timedelta(days=int(offset))
+            if harvest_date > today:
+                break
+
+            bakul = int(total_bakul * yield_share / harvest_count)
+            bakul_split = _size_split(bakul, rng)
+            bakul_distribution = {size: int(count) for size, count in zip(app.HARVEST_FRUIT_SIZES, bakul_split)}
+            kg_distribution = {size: round(float(rng.uniform(0, 14.9)) if rng.random() < 0.3 else 0.0, 1)
+                               for size in app.HARVEST_FRUIT_SIZES}
+
+            total_harvest_bakul = sum(bakul_distribution.values())
+            total_additional_kg = sum(kg_distribution.values())
+            total_harvest_kg = total_harvest_bakul * app.BAKUL_TO_KG + total_additional_kg
+            equivalent_bakul = total_harvest_kg / app.BAKUL_TO_KG
+            cumulative += equivalent_bakul
+
+            harvests.append({
+                'id': f"{plant_date.isoformat()}_{harvest_date.isoformat()}_{number}",
+                'flower_date': plant_date.isoformat(),
+                'harvest_date': harvest_date.isoformat(),
+                'days_to_harvest': int(offset),
+                'flower_total_bunga': total_bunga,
+                'flower_total_bakul': total_bakul,
+                'flower_farm_breakdown': {col: int(row[col]) for col in app.FARM_COLUMNS},
+                'harvest_bakul_distribution': bakul_distribution,
+                'harvest_kg_distribution': kg_distribution,
+                'total_harvest_bakul': total_harvest_bakul,
+                'total_additional_kg': total_additional_kg,
+                'total_harvest_kg': total_harvest_kg,
+                'equivalent_bakul': equivalent_bakul,
+                'harvest_efficiency': equivalent_bakul / total_bakul * 100,
+                'harvest_number': number,
+                'cumulative_harvested': cumulative,
+                'remaining_after_harvest': max(0, total_bakul - cumulative),
+                'marked_completed': number == harvest_count and rng.random() < 0.3,
+                'notes': "",
+                'created_at': datetime.combine(harvest_date, datetime.min.time()).isoformat(),
+                'username': username
+            })
+    return harvests
+
+
+def generate_estimates(years, rng, username):
+    """Revenue estimates with percentage distributions and per-buyer prices"""
+    estimates = []
+    count = int(ESTIMATES_PER_YEAR * years)
+    today = datetime.now().date()
+
+    for index in range(count):
+        estimate_date = today - timedelta(days=int(rng.integers(0, int(365 * years))))
+        total_bakul = int(rng.integers(20, 400))
+        distribution_percentages = {size: float(app.DEFAULT_DISTRIBUTION[size]) for size in app.FRUIT_SIZES}
+        bakul_per_size = app.calculate_bakul_distribution(total_bakul, distribution_percentages)
+
+        buyer_count = int(rng.integers(1, len(app.BUYERS) + 1))
+        selected_buyers = sorted(rng.choice(app.BUYERS, buyer_count, replace=False).tolist(), key=app.BUYERS.index)
+        buyer_distribution = {buyer: 100.0 / buyer_count for buyer in selected_buyers}
+
+        buyer_bakul_allocation = {}
+        buyer_prices = {}
+        revenue_breakdown = {}
+        total_revenue = 0
+        for buyer in selected_buyers:
+            buyer_bakul_allocation[buyer] = {}
+            buyer_prices[buyer] = {}
+            revenue_breakdown[buyer] = {}
+            for size in app.FRUIT_SIZES:
+                bakul_count = int(bakul_per_size[size] * buyer_distribution[buyer] / 100)
+                price = round(float(rng.uniform(1.0, 6.0)), 2)
+                revenue = bakul_count * app.BAKUL_TO_KG * price
+                buyer_bakul_allocation[buyer][size] = bakul_count
+                buyer_prices[buyer][size] = price
+                revenue_breakdown[buyer][size] = {
+                    'bakul': bakul_count,
+                    'kg': bakul_count * app.BAKUL_TO_KG,
+                    'price': price,
+                    'revenue': revenue
+                }
+                total_revenue += revenue
+
+        created_at = datetime.combine(estimate_date, datetime.min.time()) + timedelta(minutes=index)
+        estimates.append({
+            'id': app.generate_estimate_id(estimate_date, total_bakul, username) + f"_{index}",
+            'date': estimate_date.isoformat(),
+            'total_bakul': total_bakul,
+            'distribution_method': "By Percentage",
+            'buyer_method': "By Percentage",
+            'distribution_percentages': distribution_percentages,
+            'bakul_per_size': bakul_per_size,
+            'selected_buyers': selected_buyers,
+            'buyer_distribution': buyer_distribution,
+            'buyer_bakul_allocation': buyer_bakul_allocation,
+            'buyer_prices': buyer_prices,
+            'revenue_breakdown': revenue_breakdown,
+            'total_revenue': total_revenue,
+            'created_at': created_at.isoformat() + "+08:00",
+            'username': username
+        })
+    return estimates
+
+
+def generate_dataset(years, seed=42, username="bench_user"):
+    """Flower DataFrame, harvest records and revenue estimates for `years` of history"""
+    rng = np.random.default_rng(seed)
+    farm_df = generate_farm_data(years, rng)
+    return {
+        'username': username,
+        'years': years,
+        'farm_data': farm_df,
+        'harvests': generate_harvests(farm_df, rng, username),
+        'estimates': generate_estimates(years, rng, username)
+    }
@@ -0,0 +1,216 @@
+"""Firestore usage and cost meter for Bunga di Kebun.
+
+Every billed Firestore operation seen by the perf_profiler client proxy is
+counted in memory per day, user, collection and calling function. Counters
+are flushed to one JSON file per day (every FLUSH_INTERVAL_SECONDS by a daemon
+thread, and at exit), so metering adds only a dict update to the hot path.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+DEFAULT_USAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.firestore_usage')
+FLUSH_INTERVAL_SECONDS = 60
+
+# USD per 100,000 operations and free daily quota (Firestore standard pricing)
+DEFAULT_PRICING = {
+    'read': 0.06,
+    'write': 0.18,
+    'delete': 0.02
+}
+DEFAULT_FREE_QUOTA = {
+    'read': 50000,
+    'write': 20000,
+    'delete': 20000
+}
+
+# Functions responsible for at least this share of the cost are flagged
+DOMINANT_SHARE = 0.25
+
+_IGNORED_FILES = {os.path.abspath(__file__)}
+
+_local = threading.local()
+_lock = threading.Lock()
+_pending = defaultdict(int)
+_flusher = None
+_usage_dir = DEFAULT_USAGE_DIR
+
+
+def configure(usage_dir=None, ignore_files=()):
+    """Set where daily totals are stored and which modules are skipped when
+    attributing an operation to its calling function (e.g. client proxies)."""
+    global _usage_dir
+    if usage_dir:
+        _usage_dir = usage_dir
+    for filename in ignore_files:
+        _IGNORED_FILES.add(os.path.abspath(filename))
+
+
+def set_current_user(username):
+    """Attribute operations on this thread to username (per Streamlit rerun)"""
+    _local.username = username
+
+
+def _calling_function():
+    frame = sys._getframe(2)
+    while frame is not None:
+        if os.path.abspath(frame.f_code.co_filename) not in _IGNORED_FILES:
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return 'unknown'
+
+
+def record(kind, collection, count=1):
+    """perf_profiler op listener: count one billed operation"""
+    key = (
+        date.today().isoformat(),
+        getattr(_local, 'username', None) or 'system',
+        collection or 'unknown',
+        _calling_function(),
+        kind
+    )
+    global _flusher
+    with _lock:
+        _pending[key] += count
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_periodically, name='cost-meter-flush', daemon=True)
+            _flusher.start()
+
+
+def _flush_periodically():
+    # File I/O stays off the threads serving reruns
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        flush()
+
+
+def _day_path(day):
+    return os.path.join(_usage_dir, day + '.json')
+
+
+def _read_day(day):
+    try:
+        with open(_day_path(day)) as f:
+            return json.load(f).get('rows', [])
+    except (OSError, ValueError):
+        return []
+
+
+def flush():
+    """Merge in-memory counters into the per-day files"""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+
+    if not pending:
+        return
+
+    by_day = defaultdict(dict)
+    for (day, user, collection, function, kind), count in pending.items():
+        by_day[day][(user, collection, function, kind)] = count
+
+    try:
+        os.makedirs(_usage_dir, exist_ok=True)
+        for day, counts in by_day.items():
+            for row in _read_day(day):
+                key = (row['user'], row['collection'], row['function'], row['kind'])
+                counts[key] = counts.get(key, 0) + row['count']
+
+            rows = [
+                {'user': user, 'collection': collection, 'function': function, 'kind': kind, 'count': count}
+                for (user, collection, function, kind), count in sorted(counts.items())
+            ]
+            tmp_path = _day_path(day) + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'date': day, 'rows': rows}, f)
+            os.replace(tmp_path, _day_path(day))
+    except OSError:
+        # Metering must never break the app; put the counts back for the next flush
+        with _lock:
+            for key, count in pending.items():
+                _pending[key] += count
+
+
+atexit.register(flush)
+
+
+def load_usage(days=30):
+    """Rows of {'date', 'user', 'collection', 'function', 'kind', 'count'} for the
+    last `days` days, including counts not flushed yet."""
+    today = date.today()
+    rows = []
+    for offset in range(days):
+        day = (today - timedelta(days=offset)).isoformat()
+        for row in _read_day(day):
+            rows.append(dict(row, date=day))
+
+    with _lock:
+        for (day, user, collection, function, kind), count in _pending.items():
+            rows.append({'date': day, 'user': user, 'collection': collection,
+                         'function': function, 'kind': kind, 'count': count})
+    return rows
+
+
+def operation_cost(kind, count, pricing=None):
+    pricing = pricing or DEFAULT_PRICING
+    return count * pricing.get(kind, 0) / 100000
+
+
+def cost_summary(rows, pricing=None, free_quota=None):
+    """Daily costs, a 30-day projection and per-function/user/collection breakdowns"""
+    pricing = pricing or DEFAULT_PRICING
+    free_quota = DEFAULT_FREE_QUOTA if free_quota is None else free_quota
+
+    daily_ops = defaultdict(lambda: defaultdict(int))
+    by_dimension = {'function': defaultdict(float), 'user': defaultdict(float), 'collection': defaultdict(float)}
+    ops_by_function = defaultdict(lambda: defaultdict(int))
+
+    for row in rows:
+        daily_ops[row['date']][row['kind']] += row['count']
+        gross = operation_cost(row['kind'], row['count'], pricing)
+        for dimension, totals in by_dimension.items():
+            totals[row[dimension]] += gross
+        ops_by_function[row['function']][row['kind']] += row['count']
+
+    # The free quota applies to the whole project per day
+    daily = []
+    for day in sorted(daily_ops):
+        ops = daily_ops[day]
+        billable = sum(
+            operation_cost(kind, max(0, count - free_quota.get(kind, 0)), pricing)
+            for kind, count in ops.items()
+        )
+        gross = sum(operation_cost(kind, count, pricing) for kind, count in ops.items())
+        daily.append({'date': day, 'reads': ops.get('read', 0), 'writes': ops.get('write', 0),
+                      'deletes': ops.get('delete', 0), 'gross_cost': gross, 'billed_cost': billable})
+
+    average_gross = sum(d['gross_cost'] for d in daily) / len(daily) if daily else 0
+    average_billed = sum(d['billed_cost'] for d in daily) / len(daily) if daily else 0
+
+    total_gross = sum(by_dimension['function'].values())
+    functions = []
+    for function, cost in sorted(by_dimension['function'].items(), key=lambda item: item[1], reverse=True):
+        share = cost / total_gross if total_gross > 0 else 0
+        functions.append({
+            'function': function,
+            'reads': ops_by_function[function].get('read', 0),
+            'writes': ops_by_function[function].get('write', 0),
+            'deletes': ops_by_function[function].get('delete', 0),
+            'cost': cost,
+            'share': share,
+            'dominant': share >= DOMINANT_SHARE
+        })
+
+    return {
+        'daily': daily,
+        'projected_monthly_gross': average_gross * 30,
+        'projected_monthly_billed': average_billed * 30,
+        'functions': functions,
+        'users': sorted(by_dimension['user'].items(), key=lambda item: item[1], reverse=True),
+        'collections': sorted(by_dimension['collection'].items(), key=lambda item: item[1], reverse=True)
+    }
@@ -0,0 +1,125 @@
+"""On-disk cache of each user's Firestore documents for Bunga di Kebun.
+
+After a server restart the app would otherwise download every farm day, harvest
+and estimate again. With the disk cache enabled, each load keeps the user's
+documents in a Parquet file per dataset (zstd-compressed, one column per
+field) together with a high-water mark: the newest document update time seen.
+The next cold load reads the file and asks Firestore only for documents
+stamped after that mark and the tombstones of deleted ones, plus, now and then,
+a count to notice deletions that left no tombstone.
+
+Configured from the app's secrets:
+
+    [storage]
+    disk_cache = true
+    disk_cache_dir = ".bunga_cache"
+
+pyarrow is required; without it the cache stays off.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+
+FORMAT_VERSION = '1'
+DOC_ID_COLUMN = '__doc_id__'
+
+logger = logging.getLogger(__name__)
+
+
+def pyarrow_available():
+    import importlib.util
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _column(values):
+    """pyarrow array for one field, and whether it holds JSON text. Fields with a single
+    scalar type are stored natively; mixed types, dicts and lists are stored as JSON so
+    they come back unchanged. Missing fields are stored as null."""
+    import pyarrow as pa
+
+    kinds = {type(value) for value in values if value is not None}
+    if len(kinds) <= 1 and not kinds & {dict, list}:
+        try:
+            return pa.array(values), False
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    return pa.array([None if value is None else json.dumps(value, default=str) for value in values], pa.string()), True
+
+
+class DiskCache:
+    """One Parquet file per user and dataset under directory; safe to share between threads"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def path(self, username, key):
+        # Readable prefix plus a hash, so no username can escape the directory or collide
+        safe = re.sub(r'[^A-Za-z0-9_-]', '_', username)[:40]
+        digest = hashlib.sha256(username.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.directory, safe + '-' + digest, key + '.parquet')
+
+    def read(self, username, key):
+        """({document id: data}, high-water datetime or None, last count datetime or None),
+        or (None, None, None) without a usable file"""
+        import pyarrow.parquet as pq
+
+        path = self.path(username, key)
+        if not os.path.exists(path):
+            return None, None, None
+        try:
+            table = pq.read_table(path)
+            meta = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+            if meta.get('bunga_cache_version') != FORMAT_VERSION:
+                return None, None, None
+            json_columns = set(json.loads(meta.get('json_columns', '[]')))
+            columns = {name: table.column(name).to_pylist() for name in table.column_names}
+        except Exception:
+            logger.warning("Ignoring unreadable disk cache %s", path, exc_info=True)
+            return None, None, None
+
+        doc_ids = columns.pop(DOC_ID_COLUMN)
+        documents = {doc_id: {} for doc_id in doc_ids}
+        for name, values in columns.items():
+            decode = name in json_columns
+            for doc_id, value in zip(doc_ids, values):
+                if value is not None:
+                    documents[doc_id][name] = json.loads(value) if decode else value
+        high_water = meta.get('high_water')
+        counted_at = meta.get('counted_at')
+        return (documents, datetime.fromisoformat(high_water) if high_water else None,
+                datetime.fromisoformat(counted_at) if counted_at else None)
+
+    def write(self, username, key, documents, high_water, counted_at=None):
+        """Replace the cached documents; written to a temporary file first so readers never see half a file"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        doc_ids = list(documents)
+        fields = list(dict.fromkeys(field for data in documents.values() for field in data))
+        arrays = [pa.array(doc_ids, pa.string())]
+        json_columns = []
+        for field in fields:
+            array, is_json = _column([documents[doc_id].get(field) for doc_id in doc_ids])
+            arrays.append(array)
+            if is_json:
+                json_columns.append(field)
+        metadata = {
+            'bunga_cache_version': FORMAT_VERSION,
+            'json_columns': json.dumps(json_columns),
+            'high_water': high_water.isoformat() if high_water else '',
+            'counted_at': counted_at.isoformat() if counted_at else ''
+        }
+        table = pa.Table.from_arrays(arrays, names=[DOC_ID_COLUMN] + fields, metadata=metadata)
+
+        path = self.path(username, key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = path + '.tmp'
+            pq.write_table(table, temporary, compression='zstd')
+            os.replace(temporary, path)
+
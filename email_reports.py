@@ -0,0 +1,212 @@
+"""Scheduled email reports for Bunga di Kebun.
+
+A ReportScheduler thread wakes at the configured time (daily, or weekly on one
+weekday), builds every recipient's report in a thread pool and sends them over
+one SMTP connection. Interactive sessions never wait for it: report content
+comes from the app's shared per-user cache through the build_report callable.
+
+Configured from the app's secrets:
+
+    [email_reports]
+    enabled = true
+    schedule = "weekly"        # or "daily"
+    send_time = "07:00"
+    weekday = 0                # Monday, weekly schedule only
+    smtp_host = "localhost"
+    smtp_port = 1025
+    use_tls = false
+    smtp_user = ""
+    smtp_password = ""
+    sender = "bunga@localhost"
+
+    [email_reports.recipients]
+    admin = "admin@example.com"
+
+Try it against a local debugging server that prints messages instead of sending:
+
+    python -m aiosmtpd -n -l localhost:1025
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+DEFAULT_SETTINGS = {
+    'enabled': False,
+    'schedule': 'weekly',
+    'send_time': '07:00',
+    'weekday': 0,
+    'smtp_host': 'localhost',
+    'smtp_port': 25,
+    'use_tls': False,
+    'smtp_user': '',
+    'smtp_password': '',
+    'sender': 'bunga@localhost',
+    'recipients': {}
+}
+SCHEDULE_PERIOD_DAYS = {'daily': 1, 'weekly': 7}
+MAX_WORKERS = 4
+SMTP_TIMEOUT_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_settings(settings):
+    """DEFAULT_SETTINGS overlaid with settings, with ports/flags coerced to their types"""
+    merged = dict(DEFAULT_SETTINGS)
+    merged.update({key: value for key, value in (settings or {}).items() if value is not None})
+    merged['enabled'] = bool(merged['enabled'])
+    merged['use_tls'] = bool(merged['use_tls'])
+    merged['smtp_port'] = int(merged['smtp_port'])
+    merged['weekday'] = int(merged['weekday'])
+    merged['recipients'] = dict(merged['recipients'])
+    if merged['schedule'] not in SCHEDULE_PERIOD_DAYS:
+        raise ValueError("schedule must be one of: " + ', '.join(SCHEDULE_PERIOD_DAYS))
+    return merged
+
+
+def next_run_time(now, schedule, send_time, weekday=0):
+    """The first send time strictly after now"""
+    hour, minute = (int(part) for part in send_time.split(':'))
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    if schedule == 'weekly':
+        candidate += timedelta(days=(weekday - candidate.weekday()) % 7)
+    return candidate
+
+
+def report_period(run_time, schedule):
+    """(start_date, end_date) of the completed days a run at run_time reports on"""
+    end_date = run_time.date() - timedelta(days=1)
+    return end_date - timedelta(days=SCHEDULE_PERIOD_DAYS[schedule] - 1), end_date
+
+
+def build_message(sender, recipient, report):
+    """MIME message for a report dict of subject, body and [(file name, bytes, mime type)] attachments"""
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    message = MIMEMultipart()
+    message['From'] = sender
+    message['To'] = recipient
+    message['Subject'] = report['subject']
+    message.attach(MIMEText(report['body'], 'plain', 'utf-8'))
+
+    for file_name, data, mime_type in report.get('attachments', []):
+        main_type, sub_type = mime_type.split('/', 1)
+        part = MIMEBase(main_type, sub_type)
+        part.set_payload(data)
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', 'attachment', filename=file_name)
+        message.attach(part)
+    return message
+
+
+def send_messages(settings, messages):
+    """Send [(recipient, message)] over one SMTP connection; returns the recipients sent to"""
+    import smtplib
+
+    sent = []
+    with smtplib.SMTP(settings['smtp_host'], settings['smtp_port'], timeout=SMTP_TIMEOUT_SECONDS) as server:
+        if settings['use_tls']:
+            server.starttls()
+        if settings['smtp_user']:
+            server.login(settings['smtp_user'], settings['smtp_password'])
+        for recipient, message in messages:
+            server.sendmail(settings['sender'], [recipient], message.as_string())
+            sent.append(recipient)
+    return sent
+
+
+class ReportScheduler:
+    """Background thread sending every recipient's report on the configured schedule.
+
+    build_report(username, start_date, end_date) returns {'subject', 'body', 'attachments'}
+    and is called from worker threads, so it must not use Streamlit session state.
+    """
+
+    def __init__(self, settings, build_report, max_workers=MAX_WORKERS):
+        self.settings = normalize_settings(settings)
+        self._build_report = build_report
+        self._max_workers = max_workers
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._run_requested = False
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {'last_run': None, 'next_run': None, 'sent': [], 'errors': {}, 'running': False}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='email-reports', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def run_now(self):
+        """Ask the worker to send reports immediately, without blocking the caller"""
+        with self._lock:
+            self._run_requested = True
+        self._wake.set()
+
+    def status(self):
+        with self._lock:
+            return dict(self._status, sent=list(self._status['sent']), errors=dict(self._status['errors']))
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            now = datetime.now()
+            next_run = next_run_time(now, self.settings['schedule'], self.settings['send_time'], self.settings['weekday'])
+            with self._lock:
+                self._status['next_run'] = next_run
+
+            self._wake.wait(timeout=(next_run - now).total_seconds())
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+
+            with self._lock:
+                requested = self._run_requested
+                self._run_requested = False
+            if requested or datetime.now() >= next_run:
+                self.run_all(datetime.now())
+
+    def run_all(self, run_time):
+        """Build all reports in parallel, then send them; failures are recorded per recipient"""
+        start_date, end_date = report_period(run_time, self.settings['schedule'])
+        recipients = self.settings['recipients']
+        with self._lock:
+            self._status['running'] = True
+
+        messages = []
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='email-report') as pool:
+            futures = {
+                pool.submit(self._build_report, username, start_date, end_date): (username, address)
+                for username, address in recipients.items()
+            }
+            for future in as_completed(futures):
+                username, address = futures[future]
+                try:
+                    messages.append((address, build_message(self.settings['sender'], address, future.result())))
+                except Exception as e:
+                    logger.exception("Report for %s failed", username)
+                    errors[username] = str(e)
+
+        sent = []
+        if messages:
+            try:
+                sent = send_messages(self.settings, messages)
+            except Exception as e:
+                logger.exception("Sending reports failed")
+                errors['smtp'] = str(e)
+
+        with self._lock:
+            self._status.update(last_run=run_time, sent=sent, errors=errors, running=False)
+        return sent, errors
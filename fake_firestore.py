@@ -0,0 +1,622 @@
+"""In-memory stand-in for the Firestore client used by Bunga di Kebun.
+
+Implements the subset of the google-cloud-firestore API the app calls
+(collection/document references, where/order_by/limit/start_after queries,
+add/set/update/delete, snapshot.reference, write batches, optimistic
+transactions, count aggregations, SERVER_TIMESTAMP and on_snapshot listeners)
+on top of process-local dicts. Every call that would be a network round trip
+goes through FakeClient._rpc, which counts it and can add latency, jitter and
+injected failures:
+
+    client = FakeClient(latency_ms=250, jitter_ms=100, failure_rate=0.05, seed=1)
+    client.collection('farm_data').where('username', '==', 'alice').get()
+    client.round_trips  # -> 1
+
+Select it in the app with BUNGA_STORAGE_BACKEND=fake or [storage] backend = "fake".
+"""
+import copy
+import enum
+import functools
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+try:
+    from google.api_core.exceptions import Aborted as _AbortedBase
+    from google.api_core.exceptions import ServiceUnavailable as _UnavailableBase
+except ImportError:
+    _AbortedBase = _UnavailableBase = Exception
+
+_AUTO_ID_LENGTH = 20
+
+
+class FakeUnavailable(_UnavailableBase):
+    """Injected failure, raised like a dropped connection to Firestore"""
+
+
+class FakeAborted(_AbortedBase):
+    """A transaction lost a race: something it read changed before it committed"""
+
+
+def _auto_id():
+    return uuid.uuid4().hex[:_AUTO_ID_LENGTH]
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class _ServerTimestamp:
+    def __repr__(self):
+        return 'SERVER_TIMESTAMP'
+
+
+# Top-level field values equal to this are replaced with the commit time, as in Firestore
+SERVER_TIMESTAMP = _ServerTimestamp()
+
+
+class _Parent:
+    """What DocumentReference.parent exposes (the collection id)"""
+
+    def __init__(self, collection_path):
+        self.path = collection_path
+        self.id = collection_path.rsplit('/', 1)[-1]
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        value = self._data or {}
+        for part in field_path.split('.'):
+            value = value[part]
+        return value
+
+
+class ChangeType(enum.Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class DocumentChange:
+    def __init__(self, change_type, document, old_index, new_index):
+        self.type = change_type
+        self.document = document
+        self.old_index = old_index
+        self.new_index = new_index
+
+
+class Watch:
+    """A listener registered with on_snapshot. The callback runs on the client's
+    dispatcher thread with (snapshots, changes, read_time) whenever its results change."""
+
+    def __init__(self, client, snapshots, callback):
+        self._client = client
+        self._snapshots = snapshots
+        self._callback = callback
+        self._documents = {}
+        self._started = False
+        # Held from diff to callback, so one listener's snapshots arrive in order
+        self._delivering = threading.Lock()
+
+    def _refresh(self):
+        """Diff the results against the last snapshot delivered (under the client's lock).
+        Returns the callback's arguments, or None when nothing changed."""
+        snapshots = [snapshot for snapshot in self._snapshots() if snapshot.exists]
+        current = {snapshot.id: snapshot for snapshot in snapshots}
+        previous_ids = list(self._documents)
+        changes = []
+        for old_index, doc_id in enumerate(previous_ids):
+            if doc_id not in current:
+                changes.append(DocumentChange(ChangeType.REMOVED, self._documents[doc_id], old_index, -1))
+        for new_index, snapshot in enumerate(snapshots):
+            old = self._documents.get(snapshot.id)
+            if old is None:
+                changes.append(DocumentChange(ChangeType.ADDED, snapshot, -1, new_index))
+            elif (old.update_time, old._data) != (snapshot.update_time, snapshot._data):
+                changes.append(DocumentChange(ChangeType.MODIFIED, snapshot, previous_ids.index(snapshot.id), new_index))
+        self._documents = current
+        if changes or not self._started:
+            # The first snapshot is delivered even when the query matches nothing
+            self._started = True
+            return snapshots, changes, _now()
+        return None
+
+    def unsubscribe(self):
+        self._client._unwatch(self)
+
+
+class DocumentReference:
+    def __init__(self, client, collection_path, document_id):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = document_id
+        self.parent = _Parent(collection_path)
+
+    @property
+    def path(self):
+        return self._collection_path + '/' + self.id
+
+    def collection(self, name):
+        return CollectionReference(self._client, self.path + '/' + name)
+
+    def get(self, *args, **kwargs):
+        self._client._rpc('get')
+        return self._client._snapshot(self)
+
+    def set(self, document_data, merge=False):
+        self._client._rpc('set')
+        self._client._write(self, document_data, merge=merge)
+
+    def update(self, field_updates):
+        self._client._rpc('update')
+        self._client._write(self, field_updates, merge=True, must_exist=True)
+
+    def create(self, document_data):
+        self._client._rpc('create')
+        self._client._write(self, document_data, must_not_exist=True)
+
+    def delete(self, *args, **kwargs):
+        self._client._rpc('delete')
+        self._client._delete(self)
+
+    def on_snapshot(self, callback):
+        return self._client._watch(lambda: [self._client._snapshot(self)], callback)
+
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a is not None and a < b,
+    '<=': lambda a, b: a is not None and a <= b,
+    '>': lambda a, b: a is not None and a > b,
+    '>=': lambda a, b: a is not None and a >= b,
+    'in': lambda a, b: a in b,
+    'not-in': lambda a, b: a not in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+    'array_contains_any': lambda a, b: isinstance(a, list) and any(item in a for item in b)
+}
+
+
+def _field_value(doc_id, data, field_path):
+    if field_path == '__name__':
+        return doc_id
+    value = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+class Query:
+    def __init__(self, client, collection_path, filters=(), orders=(), limit=None,
+                 offset=0, start_after=None):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._start_after = start_after
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters,
+            'orders': self._orders,
+            'limit': self._limit,
+            'offset': self._offset,
+            'start_after': self._start_after
+        }
+        state.update(changes)
+        return Query(self._client, self._collection_path, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError("Unsupported operator in fake Firestore: " + str(op_string))
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field_path, direction == 'DESCENDING'),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def offset(self, num_to_skip):
+        return self._copy(offset=num_to_skip)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(start_after=document_fields_or_snapshot)
+
+    def select(self, field_paths):
+        return self
+
+    def _cursor_values(self, orders):
+        cursor = self._start_after
+        if isinstance(cursor, DocumentSnapshot):
+            data = cursor._data or {}
+            return [_field_value(cursor.id, data, field) for field, _ in orders]
+        if isinstance(cursor, dict):
+            return [cursor.get(field) for field, _ in orders]
+        return list(cursor)
+
+    def _run(self):
+        documents = self._client._collection_items(self._collection_path)
+        matches = [
+            (doc_id, entry) for doc_id, entry in documents
+            if all(_OPERATORS[op](_field_value(doc_id, entry['data'], field), value)
+                   for field, op, value in self._filters)
+        ]
+
+        orders = self._orders or (('__name__', False),)
+        for field, descending in reversed(orders):
+            matches.sort(key=lambda item: _sort_key(_field_value(item[0], item[1]['data'], field)),
+                         reverse=descending)
+
+        if self._start_after is not None:
+            cursor = [_sort_key(value) for value in self._cursor_values(orders)]
+            fields = [field for field, _ in orders]
+
+            def after_cursor(item):
+                values = [_sort_key(_field_value(item[0], item[1]['data'], field)) for field in fields]
+                for value, bound, (_, descending) in zip(values, cursor, orders):
+                    if value != bound:
+                        return value < bound if descending else value > bound
+                return False
+            matches = [item for item in matches if after_cursor(item)]
+
+        matches = matches[self._offset:]
+        if self._limit is not None:
+            matches = matches[:self._limit]
+
+        return [
+            DocumentSnapshot(
+                DocumentReference(self._client, self._collection_path, doc_id),
+                copy.deepcopy(entry['data']),
+                entry['create_time'],
+                entry['update_time']
+            )
+            for doc_id, entry in matches
+        ]
+
+    def get(self, *args, **kwargs):
+        self._client._rpc('query')
+        return self._run()
+
+    def stream(self, *args, **kwargs):
+        return iter(self.get())
+
+    def count(self, alias=None):
+        return _CountQuery(self, alias or 'count')
+
+    def on_snapshot(self, callback):
+        return self._client._watch(self._run, callback)
+
+
+def _sort_key(value):
+    # Firestore orders values by type first; None sorts before everything else
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value.timestamp())
+    return (4, str(value))
+
+
+class AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class _CountQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self, *args, **kwargs):
+        self._query._client._rpc('aggregate')
+        return [[AggregationResult(self._alias, len(self._query._run()))]]
+
+
+class CollectionReference(Query):
+    def __init__(self, client, collection_path):
+        super().__init__(client, collection_path)
+        self.id = collection_path.rsplit('/', 1)[-1]
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, self._collection_path, document_id or _auto_id())
+
+    def add(self, document_data, document_id=None):
+        reference = self.document(document_id)
+        self._client._rpc('add')
+        update_time = self._client._write(reference, document_data, must_not_exist=True)
+        return update_time, reference
+
+    def list_documents(self):
+        self._client._rpc('list')
+        return [DocumentReference(self._client, self._collection_path, doc_id)
+                for doc_id, _ in self._client._collection_items(self._collection_path)]
+
+
+class WriteBatch:
+    """Writes queued locally and applied atomically in one round trip"""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('set', reference, document_data, merge))
+
+    def update(self, reference, field_updates):
+        self._writes.append(('update', reference, field_updates, True))
+
+    def create(self, reference, document_data):
+        self._writes.append(('create', reference, document_data, False))
+
+    def delete(self, reference):
+        self._writes.append(('delete', reference, None, False))
+
+    def commit(self):
+        self._client._rpc('commit')
+        self._client._apply(self._writes)
+        results = [_now()] * len(self._writes)
+        self._writes = []
+        return results
+
+
+def _versions(snapshots):
+    return {snapshot.reference.path: snapshot.update_time for snapshot in snapshots if snapshot.exists}
+
+
+class Transaction(WriteBatch):
+    """Optimistic transaction: reads are remembered and the commit aborts with FakeAborted
+    if any document read (or any query's result set) changed in the meantime"""
+
+    def __init__(self, client, max_attempts=5):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._reads = []
+
+    def _read(self, run):
+        snapshots = run()
+        self._reads.append((run, _versions(snapshots)))
+        return snapshots
+
+    def get(self, ref_or_query, *args, **kwargs):
+        if isinstance(ref_or_query, DocumentReference):
+            return self.get_all([ref_or_query])
+        self._client._rpc('query')
+        return iter(self._read(ref_or_query._run))
+
+    def get_all(self, references, *args, **kwargs):
+        self._client._rpc('get')
+        return iter(self._read(lambda: [self._client._snapshot(reference) for reference in references]))
+
+    def _clean_up(self):
+        self._writes = []
+        self._reads = []
+
+    def _commit(self):
+        self._client._rpc('commit')
+        with self._client._lock:
+            for run, versions in self._reads:
+                if _versions(run()) != versions:
+                    self._clean_up()
+                    raise FakeAborted("Transaction aborted: documents it read have changed")
+            self._client._apply(self._writes)
+        results = [_now()] * len(self._writes)
+        self._clean_up()
+        return results
+
+    def commit(self):
+        return self._commit()
+
+
+def transactional(func):
+    """Like google.cloud.firestore.transactional: func(transaction, *args) is committed when it
+    returns and re-run from the start, up to the transaction's max_attempts, when it aborts"""
+    @functools.wraps(func)
+    def wrapper(transaction, *args, **kwargs):
+        for attempt in range(transaction._max_attempts):
+            transaction._clean_up()
+            result = func(transaction, *args, **kwargs)
+            try:
+                transaction._commit()
+                return result
+            except FakeAborted:
+                if attempt + 1 == transaction._max_attempts:
+                    raise
+    return wrapper
+
+
+class FakeClient:
+    """Process-local Firestore client with simulated network behaviour"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, failure_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._collections = {}
+        self.round_trips = 0
+        self.calls = {}
+        self._watches = []
+        self._changed = threading.Event()
+        self._dispatcher = None
+
+    def configure(self, latency_ms=None, jitter_ms=None, failure_rate=None):
+        if latency_ms is not None:
+            self.latency_ms = latency_ms
+        if jitter_ms is not None:
+            self.jitter_ms = jitter_ms
+        if failure_rate is not None:
+            self.failure_rate = failure_rate
+
+    def reset_stats(self):
+        with self._lock:
+            self.round_trips = 0
+            self.calls = {}
+
+    def clear(self):
+        with self._lock:
+            self._collections = {}
+        self._changed.set()
+
+    def load_documents(self, collection_path, documents):
+        """Bulk-load documents under auto ids without a round trip, for test fixtures"""
+        for document in documents:
+            self._write(DocumentReference(self, collection_path, _auto_id()), document)
+
+    def _rpc(self, name):
+        with self._lock:
+            self.round_trips += 1
+            self.calls[name] = self.calls.get(name, 0) + 1
+            delay_ms = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self.failure_rate > 0 and self._random.random() < self.failure_rate
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        if failed:
+            raise FakeUnavailable("Injected failure in fake Firestore " + name)
+
+    def _watch(self, snapshots, callback):
+        """Register a listener; its first callback (every document ADDED) runs before this returns"""
+        self._rpc('listen')
+        watch = Watch(self, snapshots, callback)
+        with self._lock:
+            self._watches.append(watch)
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name='fake-firestore-listen', daemon=True)
+                self._dispatcher.start()
+        self._notify(watch)
+        return watch
+
+    def _unwatch(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _dispatch(self):
+        # Writes only set the event, so a batch commit is delivered as one snapshot per listener
+        while True:
+            self._changed.wait()
+            self._changed.clear()
+            if self.latency_ms > 0:
+                time.sleep(self.latency_ms / 1000)
+            with self._lock:
+                watches = list(self._watches)
+            for watch in watches:
+                try:
+                    self._notify(watch)
+                except Exception:
+                    # A failing callback must not stop delivery to other listeners
+                    pass
+
+    def _notify(self, watch):
+        # The snapshot is taken under the client lock but the callback runs outside it,
+        # so a callback that reads or writes does not hold up other threads
+        with watch._delivering:
+            with self._lock:
+                delivery = watch._refresh()
+            if delivery:
+                watch._callback(*delivery)
+
+    def _collection_items(self, collection_path):
+        with self._lock:
+            return list(self._collections.get(collection_path, {}).items())
+
+    def _snapshot(self, reference):
+        with self._lock:
+            entry = self._collections.get(reference._collection_path, {}).get(reference.id)
+            if entry is None:
+                return DocumentSnapshot(reference, None)
+            return DocumentSnapshot(reference, copy.deepcopy(entry['data']),
+                                    entry['create_time'], entry['update_time'])
+
+    def _write(self, reference, data, merge=False, must_exist=False, must_not_exist=False):
+        with self._lock:
+            documents = self._collections.setdefault(reference._collection_path, {})
+            entry = documents.get(reference.id)
+            if must_exist and entry is None:
+                raise KeyError("No document to update: " + reference.path)
+            if must_not_exist and entry is not None:
+                raise ValueError("Document already exists: " + reference.path)
+
+            now = _now()
+            data = {key: now if value is SERVER_TIMESTAMP else value for key, value in data.items()}
+            if entry is None:
+                entry = {'data': {}, 'create_time': now}
+                documents[reference.id] = entry
+            if merge:
+                entry['data'].update(copy.deepcopy(data))
+            else:
+                entry['data'] = copy.deepcopy(data)
+            entry['update_time'] = now
+        self._changed.set()
+        return now
+
+    def _apply(self, writes):
+        """Apply a batch's writes all or nothing: every update/create precondition is checked,
+        against the documents as the earlier writes leave them, before anything changes"""
+        with self._lock:
+            exists = {}
+            for kind, reference, _, _ in writes:
+                if reference.path not in exists:
+                    exists[reference.path] = reference.id in self._collections.get(reference._collection_path, {})
+                if kind == 'update' and not exists[reference.path]:
+                    raise KeyError("No document to update: " + reference.path)
+                if kind == 'create' and exists[reference.path]:
+                    raise ValueError("Document already exists: " + reference.path)
+                exists[reference.path] = kind != 'delete'
+            for kind, reference, data, merge in writes:
+                if kind == 'delete':
+                    self._delete(reference)
+                else:
+                    self._write(reference, data, merge=merge)
+
+    def _delete(self, reference):
+        with self._lock:
+            self._collections.get(reference._collection_path, {}).pop(reference.id, None)
+        self._changed.set()
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def document(self, path):
+        collection_path, document_id = path.rsplit('/', 1)
+        return DocumentReference(self, collection_path, document_id)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts=5, **kwargs):
+        return Transaction(self, max_attempts)
+
+    def collections(self):
+        with self._lock:
+            return [CollectionReference(self, path) for path in self._collections if '/' not in path]
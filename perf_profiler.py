@@ -0,0 +1,334 @@
+"""Opt-in per-rerun profiling for Bunga di Kebun.
+
+Timing spans and Firestore operation counts are collected for every Streamlit
+rerun on the script thread that started it. Enable with
+
+    [profiling]
+    enabled = true
+
+in .streamlit/secrets.toml (or BUNGA_PROFILING=1). Profiles can be exported
+as Chrome trace JSON and opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+OP_KINDS = ('read', 'write', 'delete')
+
+_local = threading.local()
+_op_listeners = []
+
+
+class RerunProfile:
+    """Spans and Firestore operations recorded during one script rerun"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.spans = []
+        self.ops = defaultdict(int)
+        self._start = time.perf_counter()
+        self._depth = 0
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def op_totals(self):
+        totals = {kind: 0 for kind in OP_KINDS}
+        for (kind, _), count in self.ops.items():
+            totals[kind] += count
+        return totals
+
+    def span_totals(self):
+        """Total time and call count per span name, slowest first"""
+        totals = {}
+        for span_record in self.spans:
+            entry = totals.setdefault(span_record['name'], {'name': span_record['name'], 'calls': 0, 'total_ms': 0.0})
+            entry['calls'] += 1
+            entry['total_ms'] += span_record['duration_ms']
+        return sorted(totals.values(), key=lambda entry: entry['total_ms'], reverse=True)
+
+
+def start_rerun(label):
+    _local.profile = RerunProfile(label)
+    return _local.profile
+
+
+def end_rerun():
+    profile = getattr(_local, 'profile', None)
+    _local.profile = None
+    if profile is not None:
+        profile.finish()
+    return profile
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def span(name):
+    """Time a block of code within the current rerun (no-op when not profiling)"""
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+
+    start_ms = profile.elapsed_ms()
+    reads_before = profile.op_totals()['read']
+    profile._depth += 1
+    try:
+        yield
+    finally:
+        profile._depth -= 1
+        profile.spans.append({
+            'name': name,
+            'start_ms': start_ms,
+            'duration_ms': profile.elapsed_ms() - start_ms,
+            'depth': profile._depth,
+            'reads': profile.op_totals()['read'] - reads_before
+        })
+
+
+def traced(func=None, name=None):
+    """Decorator recording a span around every call of func"""
+    if func is None:
+        return functools.partial(traced, name=name)
+
+    span_name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_profile() is None:
+            return func(*args, **kwargs)
+        with span(span_name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def add_op_listener(listener):
+    """Register listener(kind, collection, count) called for every Firestore operation"""
+    if listener not in _op_listeners:
+        _op_listeners.append(listener)
+
+
+def record_op(kind, collection, count=1):
+    profile = current_profile()
+    if profile is not None:
+        profile.ops[(kind, collection)] += count
+    for listener in _op_listeners:
+        listener(kind, collection, count)
+
+
+def chrome_trace(profiles, pid=1):
+    """Convert rerun profiles to the Chrome trace event format"""
+    events = []
+    for index, profile in enumerate(profiles):
+        base_us = profile.started_at * 1e6
+        totals = profile.op_totals()
+        events.append({
+            'name': profile.label,
+            'cat': 'rerun',
+            'ph': 'X',
+            'ts': base_us,
+            'dur': (profile.duration_ms or 0) * 1000,
+            'pid': pid,
+            'tid': index,
+            'args': dict(totals)
+        })
+        for span_record in profile.spans:
+            events.append({
+                'name': span_record['name'],
+                'cat': 'span',
+                'ph': 'X',
+                'ts': base_us + span_record['start_ms'] * 1000,
+                'dur': span_record['duration_ms'] * 1000,
+                'pid': pid,
+                'tid': index,
+                'args': {'firestore_reads': span_record['reads']}
+            })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+# Firestore client instrumentation
+#
+# The proxies below wrap just enough of the google-cloud-firestore API to count
+# billed operations; everything else is passed through to the real objects.
+# Queries are billed at least one read even when they return no documents.
+
+def _unwrap(value):
+    return value._target if isinstance(value, _FirestoreProxy) else value
+
+
+def _unwrap_args(args, kwargs):
+    return [_unwrap(arg) for arg in args], {key: _unwrap(value) for key, value in kwargs.items()}
+
+
+def _billed_listener(callback, collection):
+    """on_snapshot callback that records one read per changed document"""
+    def on_snapshot(snapshots, changes, read_time):
+        record_op('read', collection, max(1, len(changes)))
+        return callback(snapshots, changes, read_time)
+    return on_snapshot
+
+
+class _FirestoreProxy:
+    def __init__(self, target, collection):
+        self._target = target
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+class _SnapshotProxy(_FirestoreProxy):
+    @property
+    def reference(self):
+        return _DocumentProxy(self._target.reference, self._collection)
+
+
+class _DocumentProxy(_FirestoreProxy):
+    def get(self, *args, **kwargs):
+        args, kwargs = _unwrap_args(args, kwargs)
+        snapshot = self._target.get(*args, **kwargs)
+        record_op('read', self._collection)
+        return _SnapshotProxy(snapshot, self._collection)
+
+    def set(self, *args, **kwargs):
+        record_op('write', self._collection)
+        return self._target.set(*args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        record_op('write', self._collection)
+        return self._target.update(*args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        record_op('write', self._collection)
+        return self._target.create(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        record_op('delete', self._collection)
+        return self._target.delete(*args, **kwargs)
+
+    def collection(self, name):
+        return _QueryProxy(self._target.collection(name), name)
+
+    def on_snapshot(self, callback):
+        return self._target.on_snapshot(_billed_listener(callback, self._collection))
+
+
+class _AggregationProxy(_FirestoreProxy):
+    def get(self, *args, **kwargs):
+        args, kwargs = _unwrap_args(args, kwargs)
+        result = self._target.get(*args, **kwargs)
+        record_op('read', self._collection)
+        return result
+
+
+class _QueryProxy(_FirestoreProxy):
+    _BUILDERS = ('where', 'order_by', 'limit', 'limit_to_last', 'offset', 'select',
+                 'start_at', 'start_after', 'end_at', 'end_before')
+    _AGGREGATIONS = ('count', 'sum', 'avg')
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in self._BUILDERS or name in self._AGGREGATIONS:
+            proxy_class = _QueryProxy if name in self._BUILDERS else _AggregationProxy
+
+            def build(*args, **kwargs):
+                args, kwargs = _unwrap_args(args, kwargs)
+                return proxy_class(attr(*args, **kwargs), self._collection)
+            return build
+        return attr
+
+    def get(self, *args, **kwargs):
+        args, kwargs = _unwrap_args(args, kwargs)
+        docs = list(self._target.get(*args, **kwargs))
+        record_op('read', self._collection, max(1, len(docs)))
+        return [_SnapshotProxy(doc, self._collection) for doc in docs]
+
+    def stream(self, *args, **kwargs):
+        return iter(self.get(*args, **kwargs))
+
+    def on_snapshot(self, callback):
+        return self._target.on_snapshot(_billed_listener(callback, self._collection))
+
+    def document(self, *args, **kwargs):
+        return _DocumentProxy(self._target.document(*args, **kwargs), self._collection)
+
+    def add(self, *args, **kwargs):
+        record_op('write', self._collection)
+        return self._target.add(*args, **kwargs)
+
+
+class _WriteBatchProxy(_FirestoreProxy):
+    """Counts writes queued on a WriteBatch or Transaction, and a Transaction's reads"""
+
+    def __init__(self, target):
+        super().__init__(target, None)
+
+    def get(self, ref_or_query, *args, **kwargs):
+        collection = getattr(ref_or_query, '_collection', None)
+        result = self._target.get(_unwrap(ref_or_query), *args, **kwargs)
+        if hasattr(result, 'reference'):
+            # Newer clients return a single snapshot for a document reference
+            record_op('read', collection)
+            return _SnapshotProxy(result, collection)
+        snapshots = list(result)
+        record_op('read', collection, max(1, len(snapshots)))
+        return iter([_SnapshotProxy(snapshot, collection) for snapshot in snapshots])
+
+    def get_all(self, references, *args, **kwargs):
+        references = list(references)
+        collection = getattr(references[0], '_collection', None) if references else None
+        snapshots = list(self._target.get_all([_unwrap(reference) for reference in references], *args, **kwargs))
+        record_op('read', collection, len(snapshots))
+        return iter([_SnapshotProxy(snapshot, collection) for snapshot in snapshots])
+
+    def _record(self, kind, reference):
+        collection = reference._collection if isinstance(reference, _FirestoreProxy) else reference.parent.id
+        record_op(kind, collection)
+
+    def set(self, reference, *args, **kwargs):
+        self._record('write', reference)
+        return self._target.set(_unwrap(reference), *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        self._record('write', reference)
+        return self._target.update(_unwrap(reference), *args, **kwargs)
+
+    def create(self, reference, *args, **kwargs):
+        self._record('write', reference)
+        return self._target.create(_unwrap(reference), *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        self._record('delete', reference)
+        return self._target.delete(_unwrap(reference), *args, **kwargs)
+
+
+class _ClientProxy(_FirestoreProxy):
+    def __init__(self, target):
+        super().__init__(target, None)
+
+    def collection(self, name):
+        return _QueryProxy(self._target.collection(name), name)
+
+    def batch(self):
+        return _WriteBatchProxy(self._target.batch())
+
+    def transaction(self, *args, **kwargs):
+        return _WriteBatchProxy(self._target.transaction(*args, **kwargs))
+
+
+def instrument_client(client):
+    """Wrap a Firestore client so every billed operation is passed to record_op"""
+    if client is None or isinstance(client, _ClientProxy):
+        return client
+    return _ClientProxy(client)
@@ -1,11 +1,6 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import re
 from typing import List, Dict, Any, Union, Optional
 from datetime import datetime, timedelta, timezone
-from email.mime.base import MIMEBase
-from email import encoders
 import io
 
 # streamlit_firebase_tracker.py
@@ -13,14 +8,28 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
+import bisect
 import hashlib
+import importlib.util
 import json
+import logging
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore
+import sys
+import threading
+import time
 import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import perf_profiler
+from perf_profiler import traced
+import cost_meter
+import email_reports
+import write_journal
+import disk_cache
+
+# Heavy optional dependencies (firebase_admin, plotly, smtplib/email) are imported
+# inside the functions that use them so the login page renders without paying for them.
+# Check with: python benchmarks/import_time.py
 
 # Define farm names and columns
 FARM_COLUMNS = ['A: Kebun Sendiri', 'B: Kebun DeYe', 'C: Kebun Asan', 'D: Kebun Uncle']
@@ -35,6 +44,77 @@ BAKUL_TO_KG = 15  # 1 bakul = 15kg
 # NEW: Harvest tracking constants
 HARVEST_FRUIT_SIZES = ['>600g', '>500g', '>400g', '>300g', 'Reject']
 
+# Schema versioning for farm_data documents
+SCHEMA_VERSION = 1
+SCHEMA_META_COLLECTION = 'app_meta'
+SCHEMA_META_DOCUMENT = 'schema'
+MIGRATION_BATCH_SIZE = 400  # Firestore batches allow up to 500 writes
+
+# Process-wide user data cache (shared by every session of the same user)
+USER_CACHE_TTL_SECONDS = 300
+
+# Write-behind journal file (see write_journal.py); must be on disk that survives restarts
+WRITE_JOURNAL_PATH = '.bunga_journal.sqlite3'
+
+# Persistent per-user cache for cold starts (see disk_cache.py)
+DISK_CACHE_DIR = '.bunga_cache'
+# Commit-time stamp on every farm, harvest and estimate document; cold loads fetch only newer ones
+RECORD_STAMP_FIELD = 'updated_at'
+# Deletes leave a stamped tombstone; a Firestore TTL policy on expire_at can remove old ones
+TOMBSTONE_TTL_DAYS = 30
+# How often a disk-cached dataset is checked against a document count (deletes without a tombstone)
+DISK_CACHE_COUNT_SECONDS = 3600
+
+# Season archives (see archive_user_seasons): closed farm days and harvests older than this
+# move to compressed per-season documents, read back only when a date filter reaches them
+ARCHIVE_AFTER_MONTHS = 12
+ARCHIVE_PART_RECORDS = 2000  # records per compressed document, far below Firestore's 1 MiB limit
+ARCHIVE_DATE_FIELDS = {'farm_data': 'Date', 'harvest_data': 'harvest_date'}
+
+# Live sync: snapshot listeners keep the cache current; sessions check it for changes this often
+LIVE_SYNC_POLL_SECONDS = 3
+LIVE_SYNC_START_TIMEOUT_SECONDS = 30
+
+# Bulk data entry grid
+WRITE_BATCH_SIZE = 500  # Firestore limit per batch commit
+# Saves touching up to this many records run in a transaction (see apply_record_changes)
+TRANSACTION_MAX_RECORDS = 50
+FIRESTORE_IN_LIMIT = 30  # values per 'in' filter
+BULK_OUTLIER_FACTOR = 5  # Days above 5x a farm's median day are flagged for review
+
+# Spreadsheet import
+IMPORT_CHUNK_ROWS = 5000
+# Tried in order per chunk; day-first before US month-first
+IMPORT_DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d', '%m/%d/%Y']
+
+# Admin dashboard: users loaded concurrently and how long rollups are reused
+ADMIN_MAX_WORKERS = 8
+ADMIN_ROLLUP_TTL_SECONDS = 300
+
+# History views: rows per page choices; further pages are fetched with "Load more"
+HISTORY_PAGE_SIZES = [25, 50, 100, 250]
+
+# Charts: points kept per trace after downsampling
+CHART_MAX_POINTS = 1000
+CHART_CACHE_ENTRIES = 32
+
+# Downloads
+EXPORT_CHUNK_ROWS = 10000
+EXPORT_CACHE_ENTRIES = 32
+EXPORT_FORMATS = {
+    'csv': ("CSV", ".csv", "text/csv"),
+    'parquet': ("Parquet", ".parquet", "application/vnd.apache.parquet"),
+    'xlsx': ("Excel", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+}
+
+# Opt-in per-rerun profiler (see perf_profiler.py)
+PROFILER_HISTORY_SIZE = 20
+
+# Firestore cost metering (see cost_meter.py); the proxy module is skipped when
+# attributing operations to the app function that issued them
+perf_profiler.add_op_listener(cost_meter.record)
+cost_meter.configure(ignore_files=[perf_profiler.__file__])
+
 # Set page config
 st.set_page_config(
     page_title="Bunga di Kebun",
@@ -57,10 +137,6 @@ if 'current_user_data' not in st.session_state:
     st.session_state.current_user_data = pd.DataFrame(columns=['Date'] + FARM_COLUMNS)
 if 'csv_backup_enabled' not in st.session_state:
     st.session_state.csv_backup_enabled = True
-if 'revenue_transactions' not in st.session_state:
-    st.session_state.revenue_transactions = []
-if 'harvest_data' not in st.session_state:
-    st.session_state.harvest_data = []
 
 # Helper functions for safe formatting
 def format_currency(amount):
@@ -102,57 +178,187 @@ def validate_estimate_data(estimate):
             missing_keys.append(key)
     return missing_keys
 
+def profiling_enabled():
+    """The profiler is opt-in via [profiling] enabled = true in secrets or BUNGA_PROFILING=1"""
+    if os.environ.get('BUNGA_PROFILING') == '1':
+        return True
+    try:
+        return bool(st.secrets.get('profiling', {}).get('enabled', False))
+    except Exception:
+        return False
+
+def storage_backend():
+    """Storage backend from BUNGA_STORAGE_BACKEND or [storage] backend in secrets:
+    "firestore" (default), "local" (process-wide local store, used by benchmarks)
+    or "fake" (in-memory Firestore with simulated latency, see fake_firestore.py)"""
+    backend = os.environ.get('BUNGA_STORAGE_BACKEND')
+    if not backend:
+        try:
+            backend = st.secrets.get('storage', {}).get('backend')
+        except Exception:
+            backend = None
+    return (backend or 'firestore').lower()
+
+def fake_firestore_settings():
+    """Simulated network for the fake backend: [storage] fake_latency_ms, fake_jitter_ms,
+    fake_failure_rate and fake_seed, overridable with BUNGA_FAKE_* environment variables"""
+    try:
+        settings = dict(st.secrets.get('storage', {}))
+    except Exception:
+        settings = {}
+    
+    def setting(name, cast, default):
+        value = os.environ.get('BUNGA_FAKE_' + name.upper(), settings.get('fake_' + name, default))
+        return cast(value) if value is not None else None
+    
+    return {
+        'latency_ms': setting('latency_ms', float, 0),
+        'jitter_ms': setting('jitter_ms', float, 0),
+        'failure_rate': setting('failure_rate', float, 0),
+        'seed': setting('seed', int, None)
+    }
+
+@st.cache_resource(show_spinner=False)
+def get_fake_firestore_client():
+    """One fake Firestore per server process so data survives reruns like the real one"""
+    import fake_firestore
+    
+    settings = fake_firestore_settings()
+    return fake_firestore.FakeClient(**settings)
+
+def cost_meter_settings():
+    """Optional [cost_meter] secrets: usage_dir and read/write/delete prices per 100k operations"""
+    try:
+        settings = dict(st.secrets.get('cost_meter', {}))
+    except Exception:
+        settings = {}
+    pricing = {kind: float(settings.get(kind + '_price', price)) for kind, price in cost_meter.DEFAULT_PRICING.items()}
+    return settings.get('usage_dir'), pricing
+
+# Set at import so operations flushed before an admin opens the meter land in usage_dir
+cost_meter.configure(usage_dir=cost_meter_settings()[0])
+
+def email_report_settings():
+    """Optional [email_reports] secrets (schedule, SMTP server, recipients); see email_reports.py"""
+    try:
+        settings = st.secrets.get('email_reports', {})
+        settings = {key: (dict(value) if key == 'recipients' else value) for key, value in settings.items()}
+    except Exception:
+        settings = {}
+    return settings
+
+def write_behind_settings():
+    """[storage] write_behind and journal_path, overridable with BUNGA_WRITE_BEHIND=1 and
+    BUNGA_JOURNAL_PATH; see write_journal.py"""
+    try:
+        settings = dict(st.secrets.get('storage', {}))
+    except Exception:
+        settings = {}
+    enabled = os.environ.get('BUNGA_WRITE_BEHIND')
+    return {
+        'enabled': enabled == '1' if enabled else bool(settings.get('write_behind', False)),
+        'journal_path': os.environ.get('BUNGA_JOURNAL_PATH') or settings.get('journal_path', WRITE_JOURNAL_PATH)
+    }
+
+def disk_cache_settings():
+    """[storage] disk_cache and disk_cache_dir, overridable with BUNGA_DISK_CACHE=1 and
+    BUNGA_DISK_CACHE_DIR; see disk_cache.py"""
+    try:
+        settings = dict(st.secrets.get('storage', {}))
+    except Exception:
+        settings = {}
+    enabled = os.environ.get('BUNGA_DISK_CACHE')
+    return {
+        'enabled': enabled == '1' if enabled else bool(settings.get('disk_cache', False)),
+        'directory': os.environ.get('BUNGA_DISK_CACHE_DIR') or settings.get('disk_cache_dir', DISK_CACHE_DIR)
+    }
+
+def archive_settings():
+    """[storage] archive_after_months, overridable with BUNGA_ARCHIVE_AFTER_MONTHS: how old a
+    closed flower day or harvest batch must be before it moves to its season archive"""
+    try:
+        settings = dict(st.secrets.get('storage', {}))
+    except Exception:
+        settings = {}
+    return int(os.environ.get('BUNGA_ARCHIVE_AFTER_MONTHS') or settings.get('archive_after_months', ARCHIVE_AFTER_MONTHS))
+
 # Firebase connection - Fixed version
 def connect_to_firebase():
+    backend = storage_backend()
+    if backend == 'local':
+        initialize_session_storage()
+        return None
+    
+    # NEW: Local fake with configurable latency/failures to reproduce slow connections
+    if backend == 'fake':
+        client = get_fake_firestore_client()
+        settings = fake_firestore_settings()
+        client.configure(settings['latency_ms'], settings['jitter_ms'], settings['failure_rate'])
+        return perf_profiler.instrument_client(client)
+    
     try:
+        # Check credentials before importing firebase_admin so session-storage
+        # deployments never load it
+        if 'firebase_credentials' not in st.secrets:
+            st.error("Firebase credentials not found in secrets")
+            initialize_session_storage()
+            return None
+        
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+        
         if not firebase_admin._apps:
-            if 'firebase_credentials' in st.secrets:
-                firebase_secrets = dict(st.secrets["firebase_credentials"])
-                
-                if 'private_key' in firebase_secrets:
-                    firebase_secrets['private_key'] = firebase_secrets['private_key'].replace('\\n', '\n')
-                
-                cred = credentials.Certificate(firebase_secrets)
-                firebase_admin.initialize_app(cred)
-                
-                db = firestore.client()
-                test_collection = db.collection('test')
-                test_collection.limit(1).get()
-                
-                return db
-            else:
-                st.error("Firebase credentials not found in secrets")
-                initialize_session_storage()
-                return None
+            firebase_secrets = dict(st.secrets["firebase_credentials"])
+            
+            if 'private_key' in firebase_secrets:
+                firebase_secrets['private_key'] = firebase_secrets['private_key'].replace('\\n', '\n')
+            
+            cred = credentials.Certificate(firebase_secrets)
+            firebase_admin.initialize_app(cred)
+            
+            db = firestore.client()
+            test_collection = db.collection('test')
+            test_collection.limit(1).get()
+            
+            # The client is always instrumented for cost metering; spans stay opt-in
+            return perf_profiler.instrument_client(db)
         else:
-            return firestore.client()
+            return perf_profiler.instrument_client(firestore.client())
     except Exception as e:
         st.error("Firebase connection error: " + str(e))
         st.error("Falling back to session storage...")
         initialize_session_storage()
         return None
 
-def initialize_session_storage():
-    if 'users' not in st.session_state:
-        st.session_state.users = {
+@st.cache_resource(show_spinner=False)
+def get_local_store():
+    """Fallback storage used when Firebase is unavailable.
+    Kept once per server process so sessions share it instead of each holding a copy."""
+    return {
+        'lock': threading.Lock(),
+        'users': {
             "admin": {
                 "password": hashlib.sha256("admin".encode()).hexdigest(),
                 "role": "admin"
             }
-        }
-    
-    if 'farm_data' not in st.session_state:
-        st.session_state.farm_data = {}
+        },
+        'farm_data': {},
+        # Local storage is always written by save_data in the current schema
+        'farm_data_schema_version': SCHEMA_VERSION,
+        'harvest_data': {},
+        'revenue_data': {},
+        'summaries': {},
+        'archives': {}
+    }
+
+def initialize_session_storage():
+    return get_local_store()
 
 def get_users_collection():
     db = connect_to_firebase()
     if db:
         try:
             users = db.collection('users')
-            try:
-                users.limit(1).get()
-            except:
-                pass
             return users
         except Exception as e:
             st.error("Error accessing users collection: " + str(e))
@@ -164,10 +370,6 @@ def get_farm_data_collection():
     if db:
         try:
             farm_data = db.collection('farm_data')
-            try:
-                farm_data.limit(1).get()
-            except:
-                pass
             return farm_data
         except Exception as e:
             st.error("Error accessing farm_data collection: " + str(e))
@@ -179,10 +381,6 @@ def get_revenue_data_collection():
     if db:
         try:
             revenue_data = db.collection('revenue_data')
-            try:
-                revenue_data.limit(1).get()
-            except:
-                pass
             return revenue_data
         except Exception as e:
             st.error("Error accessing revenue_data collection: " + str(e))
@@ -194,16 +392,45 @@ def get_harvest_data_collection():
     if db:
         try:
             harvest_data = db.collection('harvest_data')
-            try:
-                harvest_data.limit(1).get()
-            except:
-                pass
             return harvest_data
         except Exception as e:
             st.error("Error accessing harvest_data collection: " + str(e))
             return None
     return None
 
+def get_user_summaries_collection():
+    db = connect_to_firebase()
+    if db:
+        try:
+            user_summaries = db.collection('user_summaries')
+            return user_summaries
+        except Exception as e:
+            st.error("Error accessing user_summaries collection: " + str(e))
+            return None
+    return None
+
+def get_deleted_records_collection():
+    db = connect_to_firebase()
+    if db:
+        try:
+            deleted_records = db.collection('deleted_records')
+            return deleted_records
+        except Exception as e:
+            st.error("Error accessing deleted_records collection: " + str(e))
+            return None
+    return None
+
+def get_archives_collection():
+    db = connect_to_firebase()
+    if db:
+        try:
+            archives = db.collection('archives')
+            return archives
+        except Exception as e:
+            st.error("Error accessing archives collection: " + str(e))
+            return None
+    return None
+
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -219,7 +446,7 @@ def add_user(username, password, role="user"):
                 "username": username,
                 "password": hash_password(password),
                 "role": role,
-                "created_at": firestore.SERVER_TIMESTAMP
+                "created_at": server_timestamp()
             }
             
             users.document(username).set(user_data)
@@ -228,18 +455,18 @@ def add_user(username, password, role="user"):
             st.error("Error adding user to Firebase: " + str(e))
             pass
     
-    if 'users' not in st.session_state:
-        initialize_session_storage()
+    store = get_local_store()
+    with store['lock']:
+        if username in store['users']:
+            return False
         
-    if username in st.session_state.users:
-        return False
-    
-    st.session_state.users[username] = {
-        "password": hash_password(password),
-        "role": role
-    }
+        store['users'][username] = {
+            "password": hash_password(password),
+            "role": role
+        }
     return True
 
+@traced
 def verify_user(username, password):
     users = get_users_collection()
     if users:
@@ -254,76 +481,362 @@ def verify_user(username, password):
             st.error("Error verifying user from Firebase: " + str(e))
             pass
     
-    if 'users' not in st.session_state:
-        initialize_session_storage()
-        
-    if username in st.session_state.users and st.session_state.users[username]["password"] == hash_password(password):
-        return st.session_state.users[username]["role"]
+    store = get_local_store()
+    if username in store['users'] and store['users'][username]["password"] == hash_password(password):
+        return store['users'][username]["role"]
     return None
 
+def normalize_farm_columns(df):
+    """Rename OLD_FARM_COLUMNS and back-fill missing farm columns on a loaded DataFrame"""
+    for old_col, new_col in zip(OLD_FARM_COLUMNS, FARM_COLUMNS):
+        if old_col in df.columns and new_col not in df.columns:
+            df[new_col] = df[old_col]
+            df = df.drop(old_col, axis=1)
+    
+    for col in FARM_COLUMNS:
+        if col not in df.columns:
+            df[col] = 0
+    
+    return df
+
+def migrate_farm_record_v1(record):
+    """Migration 1: rename legacy farm columns and back-fill missing ones.
+    Returns the migrated record, or None if the record is already current."""
+    migrated = dict(record)
+    
+    for old_col, new_col in zip(OLD_FARM_COLUMNS, FARM_COLUMNS):
+        if old_col in migrated:
+            if new_col not in migrated:
+                migrated[new_col] = migrated[old_col]
+            del migrated[old_col]
+    
+    for col in FARM_COLUMNS:
+        if col not in migrated:
+            migrated[col] = 0
+    
+    return migrated if migrated != record else None
+
+# Ordered list of (version, description, migrate function)
+SCHEMA_MIGRATIONS = [
+    (1, "Rename legacy farm columns and back-fill missing farm columns", migrate_farm_record_v1),
+]
+
+def apply_schema_migrations(record, from_version):
+    """Apply every migration newer than from_version. Returns the migrated record or None if unchanged."""
+    migrated = None
+    for version, _, migrate in SCHEMA_MIGRATIONS:
+        if version > from_version:
+            result = migrate(migrated if migrated is not None else record)
+            if result is not None:
+                migrated = result
+    return migrated
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_schema_version():
+    """Read the recorded farm_data schema version (cached per process, 0 if never migrated)"""
+    db = connect_to_firebase()
+    if db:
+        try:
+            meta_doc = db.collection(SCHEMA_META_COLLECTION).document(SCHEMA_META_DOCUMENT).get()
+            if meta_doc.exists:
+                return int((meta_doc.to_dict() or {}).get('version', 0))
+        except Exception:
+            pass
+    return 0
+
+def run_schema_migrations(dry_run=False, batch_size=MIGRATION_BATCH_SIZE):
+    """Rewrite legacy farm_data documents once, in batches.
+    
+    Progress is recorded after every committed batch so an interrupted run resumes
+    where it stopped. With dry_run=True nothing is written and the report lists what
+    would change.
+    """
+    report = {
+        'dry_run': dry_run,
+        'from_version': 0,
+        'to_version': SCHEMA_VERSION,
+        'scanned': 0,
+        'changed': 0,
+        'batches': 0,
+        'resumed_after': None,
+        'samples': []
+    }
+    
+    db = connect_to_firebase()
+    if db:
+        meta_ref = db.collection(SCHEMA_META_COLLECTION).document(SCHEMA_META_DOCUMENT)
+        meta_doc = meta_ref.get()
+        meta = (meta_doc.to_dict() or {}) if meta_doc.exists else {}
+        from_version = int(meta.get('version', 0))
+        report['from_version'] = from_version
+        
+        if from_version >= SCHEMA_VERSION:
+            return report
+        
+        farm_data = db.collection('farm_data')
+        cursor = None if dry_run else meta.get('resume_after')
+        report['resumed_after'] = cursor
+        
+        while True:
+            query = farm_data.order_by('__name__').limit(batch_size)
+            if cursor:
+                query = query.start_after({'__name__': cursor})
+            docs = list(query.get())
+            if not docs:
+                break
+            
+            batch = db.batch()
+            for doc in docs:
+                report['scanned'] += 1
+                doc_data = doc.to_dict() or {}
+                migrated = apply_schema_migrations(doc_data, from_version)
+                if migrated is None:
+                    continue
+                
+                report['changed'] += 1
+                if len(report['samples']) < 5:
+                    report['samples'].append({
+                        'document_id': doc.id,
+                        'removed': sorted(set(doc_data) - set(migrated)),
+                        'added': sorted(set(migrated) - set(doc_data))
+                    })
+                if not dry_run:
+                    batch.set(doc.reference, stamp_record(migrated))
+            
+            cursor = docs[-1].id
+            report['batches'] += 1
+            if not dry_run:
+                batch.set(meta_ref, {'version': from_version, 'resume_after': cursor}, merge=True)
+                batch.commit()
+            
+            if len(docs) < batch_size:
+                break
+        
+        if not dry_run:
+            meta_ref.set({
+                'version': SCHEMA_VERSION,
+                'resume_after': None,
+                'migrated_at': datetime.now().isoformat()
+            })
+            load_schema_version.clear()
+        return report
+    
+    store = get_local_store()
+    from_version = store['farm_data_schema_version']
+    report['from_version'] = from_version
+    if from_version >= SCHEMA_VERSION:
+        return report
+    
+    # Held throughout, so days saved meanwhile are not replaced by their unmigrated copies
+    with store['lock']:
+        for username, records in list(store['farm_data'].items()):
+            migrated_records = []
+            for record in records:
+                report['scanned'] += 1
+                migrated = apply_schema_migrations(record, from_version)
+                if migrated is None:
+                    migrated_records.append(record)
+                    continue
+                report['changed'] += 1
+                if len(report['samples']) < 5:
+                    report['samples'].append({
+                        'document_id': username,
+                        'removed': sorted(set(record) - set(migrated)),
+                        'added': sorted(set(migrated) - set(record))
+                    })
+                migrated_records.append(migrated)
+            if not dry_run:
+                store['farm_data'][username] = migrated_records
+        if not dry_run:
+            store['farm_data_schema_version'] = SCHEMA_VERSION
+    
+    report['batches'] = 1
+    return report
+
+@st.cache_resource(show_spinner=False)
+def get_disk_cache():
+    """The on-disk document cache, or None when it is off, pyarrow is missing or there is no Firestore"""
+    settings = disk_cache_settings()
+    if not settings['enabled'] or connect_to_firebase() is None:
+        return None
+    if not disk_cache.pyarrow_available():
+        logging.getLogger(__name__).warning("Disk cache needs pyarrow; loading without it")
+        return None
+    return disk_cache.DiskCache(settings['directory'])
+
+def server_timestamp():
+    """Firestore's commit-time sentinel for the backend in use"""
+    if storage_backend() == 'fake':
+        from fake_firestore import SERVER_TIMESTAMP
+        return SERVER_TIMESTAMP
+    from firebase_admin import firestore
+    return firestore.SERVER_TIMESTAMP
+
+def stamp_record(record):
+    """record as written to Firestore: with RECORD_STAMP_FIELD set to the commit time"""
+    return dict(record, **{RECORD_STAMP_FIELD: server_timestamp()})
+
+def document_record(doc):
+    """A loaded document's data without the commit-time stamp, which is bookkeeping only"""
+    data = doc.to_dict() or {}
+    data.pop(RECORD_STAMP_FIELD, None)
+    return data
+
+def delete_record(writer, reference, key, username):
+    """Delete a farm, harvest or estimate document through writer (a batch or transaction,
+    or None to delete at once). With the disk cache on it also leaves a stamped tombstone,
+    so disk caches drop it without listing the user's documents again (see
+    fetch_user_documents); without it nothing reads tombstones."""
+    if get_disk_cache() is None:
+        if writer is None:
+            reference.delete()
+        else:
+            writer.delete(reference)
+        return
+    
+    tombstone = get_deleted_records_collection().document(key + '_' + reference.id)
+    data = stamp_record({
+        'username': username,
+        'collection': key,
+        'document_id': reference.id,
+        'expire_at': datetime.now(timezone.utc) + timedelta(days=TOMBSTONE_TTL_DAYS)
+    })
+    if writer is None:
+        reference.delete()
+        tombstone.set(data)
+    else:
+        writer.delete(reference)
+        writer.set(tombstone, data)
+
+def write_chunks(writes, limit=WRITE_BATCH_SIZE - 1):
+    """[('set' | 'delete', value)] split into commit-sized chunks. A delete counts twice (it
+    may also write a tombstone) and one write per batch is left for the summary."""
+    chunks = []
+    size = limit
+    for kind, value in writes:
+        cost = 2 if kind == 'delete' else 1
+        if size + cost > limit:
+            chunks.append([])
+            size = 0
+        chunks[-1].append((kind, value))
+        size += cost
+    return chunks
+
+def fetch_user_documents(username, key, collection):
+    """{document id: data} for the user's documents in collection.
+    
+    With the disk cache on, the cached documents are brought up to date by fetching only
+    those stamped after the cache's high-water mark and the tombstones of documents deleted
+    since. A cache older than the tombstones' lifetime is loaded again in full. At most once
+    per DISK_CACHE_COUNT_SECONDS the documents are also counted; if the count differs
+    (documents changed outside the app, or deleted without a tombstone), the cache is
+    dropped and everything is loaded again.
+    Needs composite indexes on (username, updated_at) for each collection and on
+    (username, collection, updated_at) for deleted_records."""
+    cache = get_disk_cache()
+    user_docs = collection.where("username", "==", username)
+    documents, high_water, counted_at = cache.read(username, key) if cache else (None, None, None)
+    now = datetime.now(timezone.utc)
+    
+    # Tombstones of deletes since then may have expired
+    if high_water is not None and now - high_water > timedelta(days=TOMBSTONE_TTL_DAYS):
+        high_water = None
+    
+    if high_water is not None:
+        changed = user_docs.where(RECORD_STAMP_FIELD, ">", high_water).get()
+        removed = get_deleted_records_collection().where("username", "==", username).where(
+            "collection", "==", key).where(RECORD_STAMP_FIELD, ">", high_water).get()
+        # Applied in commit order, so a day deleted and entered again (same document id) stays
+        updates = [(doc.update_time, doc.id, document_record(doc)) for doc in changed]
+        updates += [(doc.update_time, doc.get('document_id'), None) for doc in removed]
+        for _, doc_id, data in sorted(updates, key=lambda update: update[0]):
+            if data is None:
+                documents.pop(doc_id, None)
+            else:
+                documents[doc_id] = data
+        fetched = list(changed) + list(removed)
+        if counted_at is None or (now - counted_at).total_seconds() > DISK_CACHE_COUNT_SECONDS:
+            if user_docs.count().get()[0][0].value != len(documents):
+                high_water = None
+            counted_at = now
+    
+    if high_water is None:
+        fetched = user_docs.get()
+        documents = {doc.id: document_record(doc) for doc in fetched}
+        counted_at = now
+    
+    if cache:
+        update_times = [doc.update_time for doc in fetched if doc.update_time is not None]
+        if update_times:
+            high_water = max(update_times + ([high_water] if high_water else []))
+        try:
+            cache.write(username, key, documents, high_water, counted_at)
+        except Exception:
+            logging.getLogger(__name__).warning("Could not write disk cache for %s", username, exc_info=True)
+    return {doc_id: data for doc_id, data in documents.items() if data}
+
+def farm_frame_from_records(records):
+    """Farm DataFrame from stored farm_data documents"""
+    if not records:
+        return pd.DataFrame(columns=['Date'] + FARM_COLUMNS)
+    
+    df = pd.DataFrame(records)
+    
+    if 'document_id' in df.columns:
+        df = df.drop('document_id', axis=1)
+    
+    if 'username' in df.columns:
+        df = df.drop('username', axis=1)
+    
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'])
+    
+    # Migrated documents already use FARM_COLUMNS, so skip the per-load fix-ups
+    if load_schema_version() < SCHEMA_VERSION:
+        df = normalize_farm_columns(df)
+    
+    return df
+
+@traced
 def load_data(username):
     farm_data = get_farm_data_collection()
     if farm_data:
         try:
-            user_data_docs = farm_data.where("username", "==", username).get()
+            user_data_docs = fetch_user_documents(username, 'farm_data', farm_data)
             
             if not user_data_docs:
                 return pd.DataFrame(columns=['Date'] + FARM_COLUMNS)
             
             records = []
-            for doc in user_data_docs:
-                doc_data = doc.to_dict()
-                if doc_data:
-                    records.append(doc_data)
-            
-            if not records:
-                return pd.DataFrame(columns=['Date'] + FARM_COLUMNS)
-            
-            df = pd.DataFrame(records)
-            
-            if 'document_id' in df.columns:
-                df = df.drop('document_id', axis=1)
-            
-            if 'username' in df.columns:
-                df = df.drop('username', axis=1)
-            
-            if 'Date' in df.columns:
-                df['Date'] = pd.to_datetime(df['Date'])
-            
-            for old_col, new_col in zip(OLD_FARM_COLUMNS, FARM_COLUMNS):
-                if old_col in df.columns and new_col not in df.columns:
-                    df[new_col] = df[old_col]
-                    df = df.drop(old_col, axis=1)
-            
-            for col in FARM_COLUMNS:
-                if col not in df.columns:
-                    df[col] = 0
+            doc_ids = {}
+            for doc_id, doc_data in user_data_docs.items():
+                records.append(doc_data)
+                if 'Date' in doc_data:
+                    doc_ids[farm_date_key(doc_data['Date'])] = doc_id
             
-            return df
+            # Remember which document holds each day so bulk saves can write without a query
+            set_farm_doc_ids(username, doc_ids)
+            return farm_frame_from_records(records)
         except Exception as e:
             st.error("Error loading data from Firebase: " + str(e))
-            pass
+            note_failed_load(username, 'farm_data')
     
-    if 'farm_data' not in st.session_state:
-        initialize_session_storage()
+    store = get_local_store()
+    if username in store['farm_data']:
+        df = pd.DataFrame(store['farm_data'][username])
         
-    if username in st.session_state.farm_data:
-        df = pd.DataFrame(st.session_state.farm_data[username])
+        if df.empty:
+            return pd.DataFrame(columns=['Date'] + FARM_COLUMNS)
         
-        for old_col, new_col in zip(OLD_FARM_COLUMNS, FARM_COLUMNS):
-            if old_col in df.columns and new_col not in df.columns:
-                df[new_col] = df[old_col]
-                df = df.drop(old_col, axis=1)
-        
-        for col in FARM_COLUMNS:
-            if col not in df.columns:
-                df[col] = 0
+        if store['farm_data_schema_version'] < SCHEMA_VERSION:
+            df = normalize_farm_columns(df)
         
         if not df.empty and 'Date' in df.columns:
             df['Date'] = pd.to_datetime(df['Date'])
         return df
     return pd.DataFrame(columns=['Date'] + FARM_COLUMNS)
 
+@traced
 def save_data(df, username):
     farm_data = get_farm_data_collection()
     if farm_data:
@@ -360,9 +873,9 @@ def save_data(df, username):
                 
                 if record_date in existing_dates:
                     doc_id = existing_dates[record_date]
-                    farm_data.document(doc_id).set(record)
+                    farm_data.document(doc_id).set(stamp_record(record))
                 else:
-                    farm_data.add(record)
+                    farm_data.add(stamp_record(record))
             
             dates_to_delete = set(existing_dates.keys()) - current_dates
             
@@ -370,146 +883,1477 @@ def save_data(df, username):
                 for date_to_delete in dates_to_delete:
                     if date_to_delete in existing_dates:
                         doc_id = existing_dates[date_to_delete]
-                        farm_data.document(doc_id).delete()
+                        delete_record(None, farm_data.document(doc_id), 'farm_data', username)
             
+            # New documents got auto ids; the next bulk save re-reads the index
+            _user_cache_entry(username).pop('farm_doc_ids', None)
+            write_user_summary(username, 'farm_data', df)
+            set_cached_user_data(username, 'farm_data', compact_farm_frame(df))
             return True
         except Exception as e:
             st.error("Error saving data to Firebase: " + str(e))
             pass
     
-    if 'farm_data' not in st.session_state:
-        initialize_session_storage()
-        
-    st.session_state.farm_data[username] = df.to_dict('records')
+    store = get_local_store()
+    with store['lock']:
+        store['farm_data'][username] = df.to_dict('records')
+    write_user_summary(username, 'farm_data', df)
+    set_cached_user_data(username, 'farm_data', compact_farm_frame(df))
     return True
 
+@traced
 def load_harvest_data(username):
     harvest_data = get_harvest_data_collection()
     if harvest_data:
         try:
-            user_harvest_docs = harvest_data.where("username", "==", username).get()
+            user_harvest_docs = fetch_user_documents(username, 'harvest_data', harvest_data)
             harvests = []
-            for doc in user_harvest_docs:
-                doc_data = doc.to_dict()
-                if doc_data:
-                    harvests.append(doc_data)
+            doc_ids = {}
+            for doc_id, doc_data in user_harvest_docs.items():
+                harvests.append(doc_data)
+                doc_ids[doc_data.get('id')] = doc_id
+            
+            # Record id -> document id, so commit_harvest_changes can update single records
+            _user_cache_entry(username)['harvest_doc_ids'] = doc_ids
             return harvests
         except Exception as e:
             st.error("Error loading harvest data from Firebase: " + str(e))
+            note_failed_load(username, 'harvest_data')
     
-    if 'harvest_data' not in st.session_state:
-        st.session_state.harvest_data = []
-    return [h for h in st.session_state.harvest_data if h.get('username') == username]
-
-def save_harvest_data(harvests, username):
-    harvest_data = get_harvest_data_collection()
-    if harvest_data:
-        try:
-            existing_docs = harvest_data.where("username", "==", username).get()
-            for doc in existing_docs:
-                doc.reference.delete()
-            
-            for harvest in harvests:
-                harvest['username'] = username
-                harvest_data.add(harvest)
-            return True
-        except Exception as e:
-            st.error("Error saving harvest data to Firebase: " + str(e))
-    
-    if 'harvest_data' not in st.session_state:
-        st.session_state.harvest_data = []
-    
-    st.session_state.harvest_data = [
-        h for h in st.session_state.harvest_data if h.get('username') != username
-    ]
-    
-    for harvest in harvests:
-        harvest['username'] = username
-        st.session_state.harvest_data.append(harvest)
-    
-    return True
+    return list(get_local_store()['harvest_data'].get(username, []))
 
+@traced
 def load_revenue_data(username):
     revenue_data = get_revenue_data_collection()
     if revenue_data:
         try:
-            user_revenue_docs = revenue_data.where("username", "==", username).get()
-            transactions = []
-            for doc in user_revenue_docs:
-                doc_data = doc.to_dict()
-                if doc_data:
-                    transactions.append(doc_data)
-            return transactions
+            user_revenue_docs = fetch_user_documents(username, 'revenue_data', revenue_data)
+            return list(user_revenue_docs.values())
         except Exception as e:
             st.error("Error loading revenue data from Firebase: " + str(e))
+            note_failed_load(username, 'revenue_data')
+    
+    return list(get_local_store()['revenue_data'].get(username, []))
+
+def transact_revenue_changes(username, revenue_data, touched, upserts, deleted_ids, expected_revs, known_ids):
+    """Apply estimate changes in a transaction reading only the touched documents and the
+    summary. Returns the touched estimates after the change."""
+    user_summaries = get_user_summaries_collection()
+    
+    def run(transaction):
+        current = []
+        references = {}
+        for start in range(0, len(touched), FIRESTORE_IN_LIMIT):
+            query = revenue_data.where("username", "==", username).where("id", "in", touched[start:start + FIRESTORE_IN_LIMIT])
+            for doc in transaction.get(query):
+                data = document_record(doc)
+                current.append(data)
+                references[data.get('id')] = doc.reference
+        summary_reference = user_summaries.document(username)
+        summary_doc = next(iter(transaction.get_all([summary_reference])))
+        
+        updated = apply_record_changes(current, upserts, deleted_ids, expected_revs, known_ids)
+        for record in updated:
+            transaction.set(references.get(record['id']) or revenue_data.document(), stamp_record(record))
+        for record_id in deleted_ids:
+            if record_id in references:
+                delete_record(transaction, references[record_id], 'revenue_data', username)
+        stage_summary_delta(transaction, summary_reference, summary_doc, 'revenue_data', current, updated)
+        return updated
     
-    return [t for t in st.session_state.revenue_transactions if t.get('username') == username]
+    return run_transaction(run)
 
-def save_revenue_data(transactions, username):
+@traced
+def commit_revenue_changes(username, upserts=(), deleted_ids=(), expected_revs=None):
+    """Insert/replace estimates (matched on 'id') and delete others in a transaction that reads
+    and writes only those documents and the summary, so estimates saved on other devices
+    are kept.
+    expected_revs ({id: rev}) makes a delete fail if the estimate was edited elsewhere."""
+    expected_revs = expected_revs or {}
+    upserts = [dict(record, username=username) for record in upserts]
+    deleted_ids = set(deleted_ids)
+    touched = sorted({record['id'] for record in upserts} | deleted_ids)
+    # A saved estimate has a rev; deriving this from the touched records alone spares the
+    # paged history view from downloading every estimate just to save one
+    known_ids = {record['id'] for record in upserts if record.get('rev', 0) > 0}
+    
+    write_behind = get_write_behind()
+    if write_behind:
+        # The optimistic copy shown until the flusher catches up needs the full list
+        cached = get_cached_revenue_data(username)
+        try:
+            transactions = apply_record_changes(cached, upserts, deleted_ids, expected_revs, known_ids)
+        except ConcurrentEditError as e:
+            report_concurrent_edit(username, 'revenue_data', e)
+            return False
+        write_behind.journal.append(username, 'revenue_data', {
+            'upserts': upserts, 'deleted_ids': sorted(deleted_ids), 'expected_revs': expected_revs,
+            'known_ids': [record['id'] for record in upserts if record['id'] in known_ids]
+        }, touched)
+        cache_pending_save(username, 'revenue_data', transactions)
+        write_behind.notify()
+        return True
+    
     revenue_data = get_revenue_data_collection()
     if revenue_data:
         try:
-            existing_docs = revenue_data.where("username", "==", username).get()
-            for doc in existing_docs:
-                doc.reference.delete()
-            
-            for transaction in transactions:
-                transaction['username'] = username
-                revenue_data.add(transaction)
+            updated = transact_revenue_changes(username, revenue_data, touched, upserts, deleted_ids, expected_revs, known_ids)
+            entry = _user_cache_entry(username)
+            if 'revenue_data' in entry:
+                transactions = merge_fresh_records(entry['revenue_data'], updated, lambda transaction: transaction.get('id') in deleted_ids)
+                set_cached_user_data(username, 'revenue_data', transactions)
+            else:
+                # Nothing cached to patch; history pages are keyed on the version
+                entry['version'] += 1
+                entry.pop('summary', None)
             return True
+        except ConcurrentEditError as e:
+            report_concurrent_edit(username, 'revenue_data', e)
+            return False
         except Exception as e:
             st.error("Error saving revenue data to Firebase: " + str(e))
+            return False
     
-    st.session_state.revenue_transactions = [
-        t for t in st.session_state.revenue_transactions if t.get('username') != username
-    ]
-    
-    for transaction in transactions:
-        transaction['username'] = username
-        st.session_state.revenue_transactions.append(transaction)
-    
+    store = get_local_store()
+    try:
+        with store['lock']:
+            current = list(store['revenue_data'].get(username, []))
+            transactions = apply_record_changes(current, upserts, deleted_ids, expected_revs, known_ids)
+            store['revenue_data'][username] = list(transactions)
+    except ConcurrentEditError as e:
+        report_concurrent_edit(username, 'revenue_data', e)
+        return False
+    write_user_summary(username, 'revenue_data', transactions)
+    set_cached_user_data(username, 'revenue_data', transactions)
     return True
 
-def add_data(date, farm_1, farm_2, farm_3, farm_4, confirmed=False):
-    if not confirmed:
-        return "confirm", {
-            'date': date,
-            'farm_data': {
-                FARM_COLUMNS[0]: farm_1,
-                FARM_COLUMNS[1]: farm_2,
-                FARM_COLUMNS[2]: farm_3,
-                FARM_COLUMNS[3]: farm_4
-            }
-        }
+def compact_farm_frame(df):
+    """Downcast farm counts to int32 (and parse Date once) so a user's frame takes half the memory"""
+    if df.empty:
+        return df
     
-    try:
-        new_row = pd.DataFrame({
-            'Date': [pd.Timestamp(date)],
-            FARM_COLUMNS[0]: [int(farm_1)],
-            FARM_COLUMNS[1]: [int(farm_2)],
-            FARM_COLUMNS[2]: [int(farm_3)],
-            FARM_COLUMNS[3]: [int(farm_4)]
-        })
-        
-        if not st.session_state.current_user_data.empty:
-            existing_dates = pd.to_datetime(st.session_state.current_user_data['Date']).dt.date
-            new_date = pd.Timestamp(date).date()
-            if new_date in existing_dates.values:
-                st.error("Data for " + str(date) + " already exists. Please edit the existing entry or choose a different date.")
-                return "error", None
-        
-        st.session_state.current_user_data = pd.concat([st.session_state.current_user_data, new_row], ignore_index=True)
-        st.session_state.current_user_data = st.session_state.current_user_data.sort_values(by='Date').reset_index(drop=True)
-        
-        if save_data(st.session_state.current_user_data, st.session_state.username):
-            st.session_state.needs_rerun = True
-            return "success", None
+    date_ok = 'Date' not in df.columns or pd.api.types.is_datetime64_any_dtype(df['Date'])
+    if date_ok and all(df[col].dtype == np.int32 for col in FARM_COLUMNS if col in df.columns):
+        return df
+    
+    df = df.copy()
+    if not date_ok:
+        df['Date'] = pd.to_datetime(df['Date'])
+    for col in FARM_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(np.int32)
+    return df
+
+def intern_record_keys(value):
+    """Intern dict keys of loaded records so thousands of nested dicts share one copy of each key"""
+    if isinstance(value, dict):
+        return {sys.intern(k) if isinstance(k, str) else k: intern_record_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [intern_record_keys(v) for v in value]
+    return value
+
+@st.cache_resource(show_spinner=False)
+def get_shared_user_cache():
+    """Process-wide read-only cache of loaded user data, shared by every session of the same user"""
+    return {'lock': threading.Lock(), 'users': {}}
+
+def _user_cache_entry(username):
+    cache = get_shared_user_cache()
+    with cache['lock']:
+        return cache['users'].setdefault(username, {'version': 0, 'loaded_at': {}})
+
+def set_cached_user_data(username, key, value):
+    """Replace one dataset in the shared cache after a successful save"""
+    entry = _user_cache_entry(username)
+    if key != 'farm_data':
+        value = intern_record_keys(list(value))
+    entry[key] = value
+    entry['loaded_at'][key] = time.time()
+    entry['version'] += 1
+    # The save rewrote the summary document; the header reads it again
+    entry.pop('summary', None)
+
+def note_failed_load(username, key):
+    """Called by a loader falling back to the local store because Firestore failed, so the
+    fallback is shown for this run but not cached for every session until the TTL ends"""
+    _user_cache_entry(username).setdefault('failed_loads', set()).add(key)
+
+def _get_cached_user_data(username, key, loader):
+    entry = _user_cache_entry(username)
+    loaded_at = entry['loaded_at'].get(key, 0)
+    # Datasets kept current by a live sync listener never expire
+    expired = key not in entry.get('live', ()) and time.time() - loaded_at > USER_CACHE_TTL_SECONDS
+    if expired and has_pending_writes(username, key):
+        # Reloading now would hide saves still waiting in the write-behind journal
+        expired = False
+    if key not in entry or expired:
+        failed_loads = entry.setdefault('failed_loads', set())
+        failed_loads.discard(key)
+        value = loader(username)
+        if key in failed_loads:
+            return value
+        if key == 'farm_data':
+            value = compact_farm_frame(value)
         else:
-            return "error", None
-            
-    except Exception as e:
-        st.error("Error adding data: " + str(e))
-        return "error", None
+            value = intern_record_keys(value)
+        # Records may have moved to the archive since the index was read
+        entry.pop('archive_index', None)
+        entry[key] = value
+        entry['loaded_at'][key] = time.time()
+        entry['version'] += 1
+    return entry[key]
+
+def get_cached_derived(username, key, name, builder):
+    """builder(dataset) for one cached dataset, rebuilt only when that dataset is replaced
+    (saved or reloaded), so reruns reuse derived tables instead of recomputing them"""
+    loaders = {'farm_data': load_data, 'harvest_data': load_harvest_data, 'revenue_data': load_revenue_data}
+    source = _get_cached_user_data(username, key, loaders[key])
+    derived = _user_cache_entry(username).setdefault('derived', {})
+    cached = derived.get(name)
+    if cached is None or cached[0] is not source:
+        cached = (source, builder(source))
+        derived[name] = cached
+    return cached[1]
+
+def get_cached_farm_data(username):
+    """Shared flower DataFrame for a user. Treat as read-only; copy before modifying."""
+    return _get_cached_user_data(username, 'farm_data', load_data)
+
+def get_cached_harvest_data(username):
+    # Shallow copy so callers can append without touching the shared list
+    return list(_get_cached_user_data(username, 'harvest_data', load_harvest_data))
+
+def get_cached_revenue_data(username):
+    return list(_get_cached_user_data(username, 'revenue_data', load_revenue_data))
+
+def history_sort_key(record, order_field):
+    return (str(record.get(order_field) or ''), str(record.get('id') or ''))
+
+def fetch_history_page(username, key, order_field, limit, cursor=None):
+    """Up to limit of the user's harvest or estimate records after cursor, newest first by
+    order_field (ties by id). Returns (records, cursor of the next page or None at the end).
+    
+    Sliced from the shared cache when the dataset is loaded (after a save, with live sync, or
+    for harvest entry); otherwise one Firestore query with start_after reads just this page.
+    Needs a composite index on (username, order_field desc, id desc); Firestore leaves out
+    records without order_field, which only the cache lists."""
+    collections = {'harvest_data': get_harvest_data_collection, 'revenue_data': get_revenue_data_collection}
+    collection = None if key in _user_cache_entry(username) else collections[key]()
+    if collection:
+        try:
+            query = collection.where("username", "==", username).order_by(
+                order_field, direction='DESCENDING').order_by('id', direction='DESCENDING')
+            if cursor:
+                query = query.start_after({order_field: cursor[0], 'id': cursor[1]})
+            records = [document_record(doc) for doc in query.limit(limit + 1).get()]
+            if len(records) > limit:
+                return records[:limit], history_sort_key(records[limit - 1], order_field)
+            return records, None
+        except Exception as e:
+            st.error("Error loading history from Firebase: " + str(e))
+    
+    def build(records):
+        ordered = sorted(records, key=lambda record: history_sort_key(record, order_field))
+        return ordered, [history_sort_key(record, order_field) for record in ordered]
+    
+    ordered, keys = get_cached_derived(username, key, 'history_' + order_field, build)
+    end = bisect.bisect_left(keys, tuple(cursor)) if cursor else len(ordered)
+    start = max(0, end - limit)
+    return ordered[start:end][::-1], (keys[start] if start > 0 else None)
+
+def summarize_dataset(key, value):
+    """The summary document fields maintained for one dataset (farm frame or record list)"""
+    if key == 'farm_data':
+        if value.empty:
+            return {'farm_days': 0, 'first_day': None, 'last_day': None, 'total_bunga': 0,
+                    'farm_totals': {col: 0 for col in FARM_COLUMNS}, 'monthly_bunga': {}}
+        counts = value.reindex(columns=FARM_COLUMNS).apply(pd.to_numeric, errors='coerce').fillna(0)
+        dates = pd.to_datetime(value['Date'])
+        daily_bunga = counts.sum(axis=1)
+        monthly = daily_bunga.groupby(dates.dt.strftime('%Y-%m')).sum()
+        return {
+            'farm_days': len(value),
+            'first_day': dates.min().strftime('%Y-%m-%d'),
+            'last_day': dates.max().strftime('%Y-%m-%d'),
+            'total_bunga': int(daily_bunga.sum()),
+            'farm_totals': {col: int(counts[col].sum()) for col in FARM_COLUMNS},
+            'monthly_bunga': {month: int(total) for month, total in monthly.items()}
+        }
+    if key == 'harvest_data':
+        return {
+            'harvest_count': len(value),
+            'harvested_bakul': float(sum(h.get('equivalent_bakul', h.get('total_harvest_bakul', 0)) for h in value)),
+            # Sums, so averages over all harvests need no record list
+            'harvest_days_total': float(sum(h.get('days_to_harvest', 0) for h in value)),
+            'harvest_efficiency_total': float(sum(h.get('harvest_efficiency', 0) for h in value))
+        }
+    return {
+        'estimate_count': len(value),
+        'estimated_revenue': float(sum(e.get('total_revenue', 0) for e in value))
+    }
+
+def combine_summaries(summaries):
+    """One dataset's summary fields added up over several summaries (hot records and archived
+    seasons): counts and totals summed, maps summed per key, first/last day kept as the range"""
+    combined = {}
+    for summary in summaries:
+        for field, value in summary.items():
+            current = combined.get(field)
+            if current is None:
+                combined[field] = dict(value) if isinstance(value, dict) else value
+            elif value is None:
+                continue
+            elif isinstance(value, dict):
+                combined[field] = {k: current.get(k, 0) + value.get(k, 0) for k in dict.fromkeys(list(current) + list(value))}
+            elif field == 'first_day':
+                combined[field] = min(current, value)
+            elif field == 'last_day':
+                combined[field] = max(current, value)
+            else:
+                combined[field] = current + value
+    return combined
+
+def summarize_user_dataset(username, key, value):
+    """summarize_dataset for the user's hot records plus their archived seasons, so totals
+    rebuilt from the loaded data still cover the whole history"""
+    fields = summarize_dataset(key, value)
+    seasons = get_archive_index(username).get(key, {})
+    if seasons:
+        fields = combine_summaries([fields] + [info['summary'] for _, info in sorted(seasons.items())])
+    return fields
+
+# A dataset's fields are present in the summary once it has been summarized. The newest
+# field is the marker, so documents written before it was added are backfilled once.
+SUMMARY_MARKERS = {'farm_data': 'farm_days', 'harvest_data': 'harvest_efficiency_total', 'revenue_data': 'estimate_count'}
+
+def write_user_summary(username, key, value, batch=None):
+    """Replace one dataset's fields in the user's summary document. Pass the save's write
+    batch so the totals commit atomically with the data they describe."""
+    return write_summary_fields(username, summarize_user_dataset(username, key, value), batch)
+
+def write_summary_fields(username, fields, batch=None):
+    fields = dict(fields, username=username, updated_at=datetime.now().isoformat())
+    user_summaries = get_user_summaries_collection()
+    if user_summaries:
+        reference = user_summaries.document(username)
+        # Merge on the top-level fields so nested maps are replaced, not merged with stale months
+        if batch is not None:
+            batch.set(reference, fields, merge=list(fields))
+        else:
+            reference.set(fields, merge=list(fields))
+    else:
+        store = get_local_store()
+        with store['lock']:
+            store['summaries'][username] = dict(store['summaries'].get(username, {}), **fields)
+    return fields
+
+def read_user_summary(username):
+    """The stored summary document, or {} if none has been written yet"""
+    user_summaries = get_user_summaries_collection()
+    if user_summaries:
+        try:
+            return user_summaries.document(username).get().to_dict() or {}
+        except Exception as e:
+            st.error("Error loading summary from Firebase: " + str(e))
+    return dict(get_local_store()['summaries'].get(username, {}))
+
+def load_all_summaries():
+    """Every user's summary document in one query"""
+    user_summaries = get_user_summaries_collection()
+    if user_summaries:
+        try:
+            return {doc.id: doc.to_dict() or {} for doc in user_summaries.get()}
+        except Exception as e:
+            st.error("Error loading summaries from Firebase: " + str(e))
+    return {username: dict(summary) for username, summary in get_local_store()['summaries'].items()}
+
+def backfill_user_summary(username, summary):
+    """Add the fields of datasets missing from summary, built once from the full data
+    (for users whose history predates summary documents)"""
+    loaders = {'farm_data': get_cached_farm_data, 'harvest_data': get_cached_harvest_data, 'revenue_data': get_cached_revenue_data}
+    summary = dict(summary)
+    for key, marker in SUMMARY_MARKERS.items():
+        if marker not in summary:
+            try:
+                summary.update(write_user_summary(username, key, loaders[key](username)))
+            except Exception as e:
+                st.error("Error saving summary: " + str(e))
+                summary.update(summarize_user_dataset(username, key, loaders[key](username)))
+    return summary
+
+def get_user_summary(username):
+    """Headline totals for a user from one small document read, cached with the user's data"""
+    entry = _user_cache_entry(username)
+    expired = 'summary' not in entry.get('live', ()) and time.time() - entry['loaded_at'].get('summary', 0) > USER_CACHE_TTL_SECONDS
+    if 'summary' not in entry or expired:
+        summary = read_user_summary(username)
+        if any(marker not in summary for marker in SUMMARY_MARKERS.values()):
+            summary = backfill_user_summary(username, summary)
+        entry['summary'] = summary
+        entry['loaded_at']['summary'] = time.time()
+    return entry['summary']
+
+def archive_record_key(key, record):
+    """What identifies an archived record: its day for farm data, its id for harvests"""
+    return farm_date_key(record['Date']) if key == 'farm_data' else record.get('id')
+
+def archive_season(key, record):
+    """Season a record is archived under: the year its flowers were counted, so a batch's
+    flower day and harvests share one archive"""
+    return str(pd.Timestamp(record['Date'] if key == 'farm_data' else record['flower_date']).year)
+
+def archive_json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def pack_archive(records):
+    return zlib.compress(json.dumps(records, default=archive_json_value, separators=(',', ':')).encode('utf-8'), 9)
+
+def unpack_archive(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+def archive_cutoff(after_months, today=None):
+    """'YYYY-MM-DD' before which closed flower days and batches are archived"""
+    return (pd.Timestamp(today or datetime.now().date()) - pd.DateOffset(months=after_months)).strftime('%Y-%m-%d')
+
+def closed_season_records(farm_records, harvests, cutoff):
+    """Positions of the farm days and harvests to archive: flower dates before cutoff whose
+    batch is closed, i.e. marked completed, fully harvested or last harvested before cutoff.
+    Flower days without harvests are closed once past cutoff; batches still being harvested
+    stay hot with their flower day."""
+    batches = {batch['flower_date']: batch for batch in summarize_harvests_by_flower_date(harvests)}
+    
+    def closed(flower_date):
+        batch = batches.get(flower_date)
+        return flower_date < cutoff and (batch is None or batch['is_marked_completed']
+                                         or batch['total_harvested_bakul'] >= batch['expected_bakul']
+                                         or batch['last_harvest_date'] < cutoff)
+    
+    farm_positions = [i for i, record in enumerate(farm_records) if 'Date' in record and closed(farm_date_key(record['Date']))]
+    harvest_positions = [i for i, harvest in enumerate(harvests) if harvest.get('flower_date') and closed(harvest['flower_date'])]
+    return farm_positions, harvest_positions
+
+def archive_part_id(key, season, part):
+    return key + '_' + season + '_' + str(part)
+
+def read_archive_index(username):
+    """{dataset key: {season: {'first', 'last', 'count', 'parts', 'summary', 'archived_at'}}}
+    for the user's archived seasons, or {} if nothing has been archived"""
+    archives = get_archives_collection()
+    if archives:
+        try:
+            return archives.document(username).get().to_dict() or {}
+        except Exception as e:
+            st.error("Error loading archive index from Firebase: " + str(e))
+            return {}
+    return dict(get_local_store()['archives'].get(username, {}).get('index', {}))
+
+def get_archive_index(username):
+    """The user's archive index from one small document read, cached with their data"""
+    entry = _user_cache_entry(username)
+    if 'archive_index' not in entry or time.time() - entry['loaded_at'].get('archive_index', 0) > USER_CACHE_TTL_SECONDS:
+        entry['archive_index'] = read_archive_index(username)
+        entry['loaded_at']['archive_index'] = time.time()
+    return entry['archive_index']
+
+def read_archive_season(username, key, season, parts):
+    """Every record of one archived season, decompressed"""
+    archives = get_archives_collection()
+    records = []
+    for part in range(parts):
+        part_id = archive_part_id(key, season, part)
+        if archives:
+            data = archives.document(username).collection('seasons').document(part_id).get().to_dict() or {}
+        else:
+            data = get_local_store()['archives'].get(username, {}).get('seasons', {}).get(part_id, {})
+        if data.get('records'):
+            records.extend(unpack_archive(data['records']))
+    return records
+
+def write_archive_season(username, key, season, records):
+    """Write one season's records as compressed parts; returns its index entry"""
+    field = ARCHIVE_DATE_FIELDS[key]
+    records = sorted(records, key=lambda record: str(record.get(field) or ''))
+    dates = [str(record.get(field) or '')[:10] for record in records if record.get(field)]
+    archived_at = datetime.now().isoformat()
+    archives = get_archives_collection()
+    
+    parts = [records[start:start + ARCHIVE_PART_RECORDS] for start in range(0, len(records), ARCHIVE_PART_RECORDS)]
+    for part, part_records in enumerate(parts):
+        data = {'username': username, 'collection': key, 'season': season, 'part': part,
+                'count': len(part_records), 'records': pack_archive(part_records), 'archived_at': archived_at}
+        if archives:
+            archives.document(username).collection('seasons').document(archive_part_id(key, season, part)).set(data)
+        else:
+            store = get_local_store()
+            with store['lock']:
+                user_archives = store['archives'].setdefault(username, {'index': {}, 'seasons': {}})
+                user_archives['seasons'][archive_part_id(key, season, part)] = data
+    
+    value = farm_frame_from_records(records) if key == 'farm_data' else records
+    info = {
+        'first': min(dates, default=season + '-01-01'),
+        'last': max(dates, default=season + '-12-31'),
+        'count': len(records),
+        'parts': len(parts),
+        'summary': summarize_dataset(key, value),
+        'archived_at': archived_at
+    }
+    if key == 'farm_data':
+        # Open batches keep their flower days hot inside the range, so saves check exact days
+        info['days'] = sorted(set(dates))
+    return info
+
+def write_archive_index(username, index):
+    archives = get_archives_collection()
+    if archives:
+        archives.document(username).set(index)
+    else:
+        store = get_local_store()
+        with store['lock']:
+            store['archives'].setdefault(username, {'index': {}, 'seasons': {}})['index'] = index
+
+def archived_farm_days(username, date_keys):
+    """The given 'YYYY-MM-DD' days that were moved to a season archive. Entering one again
+    would count it twice, since totals add the archived seasons to the hot records."""
+    archived = set()
+    for info in get_archive_index(username).get('farm_data', {}).values():
+        archived.update(info.get('days', ()))
+    return sorted(set(date_keys) & archived)
+
+def archive_user_seasons(username, cutoff, dry_run=False):
+    """Move the user's closed flower days and harvest batches from before cutoff into their
+    season archives. Returns {dataset key: records archived (or to archive, with dry_run)}.
+    
+    Archives are written before the hot documents are deleted, and re-archiving a season
+    merges by day or id, so a run interrupted in between is finished by the next one.
+    The summary document is untouched: its totals already cover the archived records."""
+    farm_data = get_farm_data_collection()
+    harvest_data = get_harvest_data_collection()
+    collections = {'farm_data': farm_data, 'harvest_data': harvest_data}
+    if farm_data and harvest_data:
+        hot = {key: list(fetch_user_documents(username, key, collection).items()) for key, collection in collections.items()}
+    else:
+        store = get_local_store()
+        hot = {key: list(enumerate(store[key].get(username, []))) for key in ARCHIVE_DATE_FIELDS}
+    
+    farm_positions, harvest_positions = closed_season_records(
+        [record for _, record in hot['farm_data']], [record for _, record in hot['harvest_data']], cutoff)
+    moving = {
+        'farm_data': [hot['farm_data'][i] for i in farm_positions],
+        'harvest_data': [hot['harvest_data'][i] for i in harvest_positions]
+    }
+    counts = {key: len(items) for key, items in moving.items()}
+    if dry_run or not any(counts.values()):
+        return counts
+    
+    index = read_archive_index(username)
+    for key, items in moving.items():
+        by_season = {}
+        for _, record in items:
+            by_season.setdefault(archive_season(key, record), []).append(record)
+        seasons = dict(index.get(key, {}))
+        for season, records in by_season.items():
+            info = seasons.get(season)
+            merged = {archive_record_key(key, record): record for record in
+                      (read_archive_season(username, key, season, info['parts']) if info else [])}
+            merged.update((archive_record_key(key, record), record) for record in records)
+            seasons[season] = write_archive_season(username, key, season, list(merged.values()))
+        index[key] = seasons
+    index.update(username=username, updated_at=datetime.now().isoformat())
+    write_archive_index(username, index)
+    
+    if farm_data and harvest_data:
+        db = connect_to_firebase()
+        for key, items in moving.items():
+            for chunk in write_chunks([('delete', doc_id) for doc_id, _ in items]):
+                batch = db.batch()
+                for _, doc_id in chunk:
+                    delete_record(batch, collections[key].document(doc_id), key, username)
+                batch.commit()
+    else:
+        store = get_local_store()
+        with store['lock']:
+            for key, items in moving.items():
+                archived_keys = {archive_record_key(key, record) for _, record in items}
+                store[key][username] = [record for record in store[key].get(username, [])
+                                        if archive_record_key(key, record) not in archived_keys]
+    
+    # Sessions reload the smaller hot datasets; totals and the summary stay the same
+    entry = _user_cache_entry(username)
+    for name in ('farm_data', 'harvest_data', 'farm_doc_ids', 'harvest_doc_ids'):
+        entry.pop(name, None)
+    entry['archive_index'] = index
+    entry['loaded_at']['archive_index'] = time.time()
+    entry['version'] += 1
+    return counts
+
+def run_season_archival(dry_run=False):
+    """Archive every user's closed seasons (see archive_user_seasons). With dry_run=True
+    nothing is written and the report counts what would move."""
+    after_months = archive_settings()
+    report = {
+        'dry_run': dry_run,
+        'after_months': after_months,
+        'cutoff': archive_cutoff(after_months),
+        'users': 0,
+        'farm_data': 0,
+        'harvest_data': 0,
+        'errors': {}
+    }
+    for username in list_usernames():
+        try:
+            counts = archive_user_seasons(username, report['cutoff'], dry_run)
+        except Exception as e:
+            report['errors'][username] = str(e)
+            continue
+        if any(counts.values()):
+            report['users'] += 1
+        for key, count in counts.items():
+            report[key] += count
+    return report
+
+def load_archived_records(username, key, start_date=None, end_date=None):
+    """Archived records of key from the seasons overlapping start_date..end_date (all when
+    None). Each season is read and decompressed once, then kept with the user's data."""
+    seasons = get_archive_index(username).get(key, {})
+    loaded = _user_cache_entry(username).setdefault('archived', {})
+    records = []
+    for season, info in sorted(seasons.items()):
+        if (start_date and info['last'] < start_date.isoformat()) or (end_date and info['first'] > end_date.isoformat()):
+            continue
+        cache_key = (key, season, info['archived_at'])
+        if cache_key not in loaded:
+            try:
+                loaded[cache_key] = read_archive_season(username, key, season, info['parts'])
+            except Exception as e:
+                st.error("Error loading archived season " + season + ": " + str(e))
+                continue
+        records.extend(loaded[cache_key])
+    return records
+
+def archived_range(username, key):
+    """(first, last) 'YYYY-MM-DD' covered by the user's archived seasons of key, or None"""
+    seasons = get_archive_index(username).get(key, {})
+    if not seasons:
+        return None
+    return min(info['first'] for info in seasons.values()), max(info['last'] for info in seasons.values())
+
+def archived_count(username, key):
+    return sum(info['count'] for info in get_archive_index(username).get(key, {}).values())
+
+def farm_data_with_archive(username, farm_df, start_date, end_date):
+    """farm_df plus the archived days of seasons overlapping start_date..end_date; days
+    entered again after archival come from farm_df"""
+    hot_days = set(farm_df['Date'].dt.strftime('%Y-%m-%d')) if not farm_df.empty else set()
+    archived = [record for record in load_archived_records(username, 'farm_data', start_date, end_date)
+                if farm_date_key(record['Date']) not in hot_days]
+    if not archived:
+        return farm_df
+    archived_df = compact_farm_frame(farm_frame_from_records(archived))
+    if farm_df.empty:
+        return archived_df
+    return pd.concat([archived_df, farm_df], ignore_index=True).sort_values('Date', ignore_index=True)
+
+def harvests_with_archive(username, start_date, end_date):
+    """The cached harvests plus archived ones harvested in seasons overlapping the range"""
+    harvests = get_cached_harvest_data(username)
+    hot_ids = {harvest.get('id') for harvest in harvests}
+    return [harvest for harvest in load_archived_records(username, 'harvest_data', start_date, end_date)
+            if harvest.get('id') not in hot_ids] + harvests
+
+class ConcurrentEditError(Exception):
+    """Records were changed or deleted on another device after this session read them"""
+    
+    def __init__(self, record_ids):
+        super().__init__(str(len(record_ids)) + " record(s) changed on another device")
+        self.record_ids = list(record_ids)
+
+def apply_record_changes(current, upserts, deleted_ids, expected_revs, known_ids):
+    """current with upserts (matched on 'id') replaced or appended and deleted_ids removed.
+    
+    Every record carries a 'rev' that each edit bumps. An upsert whose rev differs from the
+    stored record's, a delete whose expected_revs entry does, or an upsert of a record this
+    session knew (known_ids) that is gone raises ConcurrentEditError instead of overwriting
+    another device's change."""
+    stored = {record.get('id'): record for record in current}
+    conflicts = []
+    for record in upserts:
+        if record['id'] in stored:
+            if stored[record['id']].get('rev', 0) != record.get('rev', 0):
+                conflicts.append(record['id'])
+        elif record['id'] in known_ids:
+            conflicts.append(record['id'])
+    for record_id in deleted_ids:
+        if record_id in stored and record_id in expected_revs and stored[record_id].get('rev', 0) != expected_revs[record_id]:
+            conflicts.append(record_id)
+    if conflicts:
+        raise ConcurrentEditError(conflicts)
+    
+    upsert_by_id = {record['id']: dict(record, rev=record.get('rev', 0) + 1) for record in upserts}
+    updated = []
+    for record in current:
+        if record.get('id') not in deleted_ids:
+            updated.append(upsert_by_id.pop(record.get('id'), record))
+    updated.extend(upsert_by_id.values())
+    return updated
+
+def merge_fresh_records(cached, fresh, reread):
+    """cached with the records a transaction re-read (and changed) swapped in. Cached records
+    with reread(record) true that are missing from fresh were deleted, here or elsewhere."""
+    fresh_by_id = {record.get('id'): record for record in fresh}
+    merged = []
+    for record in cached:
+        if record.get('id') in fresh_by_id:
+            merged.append(fresh_by_id.pop(record.get('id')))
+        elif not reread(record):
+            merged.append(record)
+    merged.extend(fresh_by_id.values())
+    return merged
+
+def run_transaction(func):
+    """func(transaction) in a Firestore transaction, re-run from the start (re-reading only
+    what it reads) when another write to those documents commits first"""
+    db = connect_to_firebase()
+    if storage_backend() == 'fake':
+        from fake_firestore import transactional
+    else:
+        from firebase_admin import firestore
+        transactional = firestore.transactional
+    return transactional(func)(db.transaction())
+
+def stage_summary_delta(transaction, reference, snapshot, key, before, after, day_range=None):
+    """Adjust the summary's fields for key by the change from before to after records, in the
+    transaction making the change. Summaries not built yet are left to backfill_user_summary.
+    
+    Counts, totals and per-farm/per-month maps move by the difference; the farm day range
+    widens to new days. A delta cannot tell which day follows a deleted first or last day,
+    so day_range ((first, last) as the saving session sees them) is used then."""
+    summary = snapshot.to_dict() if snapshot.exists else None
+    if not summary or SUMMARY_MARKERS[key] not in summary:
+        return
+    old = summarize_dataset(key, before)
+    new = summarize_dataset(key, after)
+    fields = {}
+    for field, value in new.items():
+        if field in ('first_day', 'last_day'):
+            continue
+        # Rounded only to drop float noise; totals are rounded for display
+        if isinstance(value, dict):
+            stored = summary.get(field) or {}
+            fields[field] = {k: round(stored.get(k, 0) + value.get(k, 0) - old[field].get(k, 0), 6)
+                             for k in dict.fromkeys(list(stored) + list(value))}
+        else:
+            fields[field] = round(summary.get(field, 0) + value - old[field], 6)
+    if key == 'farm_data':
+        removed = set(pd.to_datetime(before['Date']).dt.strftime('%Y-%m-%d')) - set(pd.to_datetime(after['Date']).dt.strftime('%Y-%m-%d'))
+        for field, pick, position in (('first_day', min, 0), ('last_day', max, 1)):
+            if summary.get(field) in removed:
+                fields[field] = day_range[position] if day_range else summary.get(field)
+            else:
+                fields[field] = pick([day for day in (summary.get(field), new[field]) if day], default=None)
+        if not fields['farm_days']:
+            fields['first_day'] = fields['last_day'] = None
+    fields['updated_at'] = datetime.now().isoformat()
+    transaction.set(reference, fields, merge=list(fields))
+
+@st.cache_resource(show_spinner=False)
+def get_write_behind():
+    """The process-wide write-behind queue, or None when saves go straight to Firestore.
+    Started once; entries journaled before a restart are sent on its first pass."""
+    settings = write_behind_settings()
+    if not settings['enabled'] or connect_to_firebase() is None:
+        return None
+    journal = write_journal.WriteJournal(settings['journal_path'])
+    return write_journal.WriteBehindQueue(journal, apply_journal_entry, (ConcurrentEditError,), drop_conflicted_dataset).start()
+
+def apply_journal_entry(entry):
+    """Send one write-behind journal entry to Firestore (called on the flusher thread)"""
+    username = entry['username']
+    payload = entry['payload']
+    collections = {'farm_data': get_farm_data_collection, 'harvest_data': get_harvest_data_collection, 'revenue_data': get_revenue_data_collection}
+    collection = collections[entry['kind']]()
+    if not collection:
+        raise RuntimeError("Firestore is unavailable")
+    
+    try:
+        if entry['kind'] == 'farm_data':
+            persist_farm_changes(username, collection, payload['records'], payload['deleted'], payload.get('day_range'))
+        elif entry['kind'] == 'harvest_data':
+            persist = transact_harvest_changes if payload['transaction'] else persist_harvest_changes
+            _, doc_ids = persist(
+                username, collection, set(payload['flower_dates']), payload['upserts'], set(payload['deleted_ids']),
+                payload['expected_revs'], set(payload['known_ids'])
+            )
+            cached_doc_ids = _user_cache_entry(username).get('harvest_doc_ids')
+            if cached_doc_ids is not None:
+                cached_doc_ids.update(doc_ids)
+                for record_id in payload['deleted_ids']:
+                    cached_doc_ids.pop(record_id, None)
+        else:
+            touched = sorted({record['id'] for record in payload['upserts']} | set(payload['deleted_ids']))
+            # Entries journaled before deletes carried expected revs have none
+            transact_revenue_changes(username, collection, touched, payload['upserts'], set(payload['deleted_ids']),
+                                     payload.get('expected_revs', {}), set(payload['known_ids']))
+    except Exception:
+        # Ids of a partly applied entry are unknown; re-read them before the retry
+        _user_cache_entry(username).pop('farm_doc_ids' if entry['kind'] == 'farm_data' else 'harvest_doc_ids', None)
+        raise
+
+def drop_conflicted_dataset(entry):
+    """A journaled save lost to another device's change: reload that dataset from Firestore"""
+    cache_entry = _user_cache_entry(entry['username'])
+    cache_entry.pop(entry['kind'], None)
+    cache_entry.pop('summary', None)
+    cache_entry['version'] += 1
+
+def has_pending_writes(username, key):
+    write_behind = get_write_behind()
+    return bool(write_behind) and write_behind.journal.has_pending(username, key)
+
+def cache_pending_save(username, key, value):
+    """Show a journaled save at once: replace the cached dataset and patch the cached summary"""
+    summary = _user_cache_entry(username).get('summary')
+    set_cached_user_data(username, key, value)
+    if summary is not None:
+        entry = _user_cache_entry(username)
+        entry['summary'] = dict(summary, **summarize_user_dataset(username, key, value))
+        entry['loaded_at']['summary'] = time.time()
+
+def report_concurrent_edit(username, key, error):
+    """Explain why nothing was saved and drop the stale dataset so the page shows the latest"""
+    st.error("❌ Not saved: " + str(error) + " since you opened it. The latest data is shown; please review and try again.")
+    entry = _user_cache_entry(username)
+    entry.pop(key, None)
+    entry['version'] += 1
+
+def live_sync_enabled():
+    """[storage] live_sync = true (or BUNGA_LIVE_SYNC=1) keeps signed-in users' data current
+    with Firestore snapshot listeners instead of TTL reloads"""
+    if os.environ.get('BUNGA_LIVE_SYNC'):
+        return os.environ['BUNGA_LIVE_SYNC'] == '1'
+    try:
+        return bool(st.secrets.get('storage', {}).get('live_sync', False))
+    except Exception:
+        return False
+
+@st.cache_resource(show_spinner=False)
+def get_live_listeners():
+    """username -> snapshot listeners, started once per user for the whole server process"""
+    return {'lock': threading.Lock(), 'users': {}}
+
+def same_dataset(key, cached, value):
+    """Whether a listener-built dataset matches the cached one (e.g. the echo of this process's own save)"""
+    if key != 'farm_data':
+        return cached == value
+    if len(cached) != len(value):
+        return False
+    cached = cached.sort_values('Date')
+    value = value.sort_values('Date')
+    return bool((cached['Date'].to_numpy() == value['Date'].to_numpy()).all()
+                and (cached[FARM_COLUMNS].to_numpy() == value[FARM_COLUMNS].to_numpy()).all())
+
+def apply_live_changes(username, key, documents, changes):
+    """Apply a listener's document changes to documents (doc id -> data) and publish the
+    rebuilt dataset to the shared cache. Only changed documents come over the network."""
+    entry = _user_cache_entry(username)
+    for change in changes:
+        if change.type.name == 'REMOVED':
+            documents.pop(change.document.id, None)
+            # Possibly archived; the index is read again before totals are rebuilt
+            entry.pop('archive_index', None)
+        else:
+            documents[change.document.id] = document_record(change.document)
+    
+    records = list(documents.values())
+    if key == 'farm_data':
+        value = compact_farm_frame(farm_frame_from_records(records))
+        set_farm_doc_ids(username, {farm_date_key(data['Date']): doc_id for doc_id, data in documents.items() if 'Date' in data})
+    else:
+        value = intern_record_keys(records)
+        if key == 'harvest_data':
+            entry['harvest_doc_ids'] = {data.get('id'): doc_id for doc_id, data in documents.items()}
+    
+    if has_pending_writes(username, key):
+        # Keep the optimistic copy from cache_pending_save; without the live flag the TTL
+        # reloads the dataset once the journal drains, unless a later snapshot comes first
+        entry.get('live', set()).discard(key)
+        return
+    entry.setdefault('live', set()).add(key)
+    entry['loaded_at'][key] = time.time()
+    if key in entry and same_dataset(key, entry[key], value):
+        return
+    entry[key] = value
+    entry['version'] += 1
+
+def apply_live_summary(username, snapshots):
+    entry = _user_cache_entry(username)
+    summary = snapshots[0].to_dict() if snapshots and snapshots[0].exists else None
+    if any(has_pending_writes(username, key) for key in SUMMARY_MARKERS):
+        # The cached summary already includes journaled saves Firestore has not seen yet
+        entry.get('live', set()).discard('summary')
+        return
+    if summary and all(marker in summary for marker in SUMMARY_MARKERS.values()):
+        entry['summary'] = summary
+        entry['loaded_at']['summary'] = time.time()
+        entry.setdefault('live', set()).add('summary')
+    else:
+        entry.pop('summary', None)
+
+def live_listener(username, apply, loaded):
+    """on_snapshot callback running apply(snapshots, changes) on the listener thread"""
+    def on_snapshot(snapshots, changes, read_time):
+        try:
+            apply(snapshots, changes)
+        except Exception:
+            logging.getLogger(__name__).exception("Live sync update for %s failed", username)
+        finally:
+            loaded.set()
+    return on_snapshot
+
+def start_live_sync(username):
+    """Listen to the user's farm, harvest and revenue documents and summary, once per process.
+    Waits for the initial snapshots, which fill the shared cache in place of the first load.
+    Returns False when live sync is unavailable (no Firestore connection)."""
+    listeners = get_live_listeners()
+    with listeners['lock']:
+        if username in listeners['users']:
+            return True
+        
+        collections = {
+            'farm_data': get_farm_data_collection(),
+            'harvest_data': get_harvest_data_collection(),
+            'revenue_data': get_revenue_data_collection()
+        }
+        user_summaries = get_user_summaries_collection()
+        if not all(collections.values()) or not user_summaries:
+            return False
+        
+        watches = []
+        ready = []
+        try:
+            for key, collection in collections.items():
+                documents = {}
+                loaded = threading.Event()
+                apply = lambda snapshots, changes, key=key, documents=documents: apply_live_changes(username, key, documents, changes)
+                watches.append(collection.where("username", "==", username).on_snapshot(live_listener(username, apply, loaded)))
+                ready.append(loaded)
+            
+            loaded = threading.Event()
+            apply = lambda snapshots, changes: apply_live_summary(username, snapshots)
+            watches.append(user_summaries.document(username).on_snapshot(live_listener(username, apply, loaded)))
+            ready.append(loaded)
+        except Exception as e:
+            for watch in watches:
+                watch.unsubscribe()
+            st.error("Error starting live sync: " + str(e))
+            return False
+        listeners['users'][username] = watches
+    
+    for loaded in ready:
+        loaded.wait(LIVE_SYNC_START_TIMEOUT_SECONDS)
+    return True
+
+@st.fragment(run_every=LIVE_SYNC_POLL_SECONDS)
+def live_sync_monitor(username):
+    """Rerun the page when a listener applies another device's changes. Only the cache's
+    version counter is checked, so polling costs no Firestore reads."""
+    version = get_data_version(username)
+    seen = st.session_state.get('live_sync_version')
+    st.session_state.live_sync_version = version
+    if seen is not None and version != seen:
+        st.rerun()
+
+def estimate_memory_bytes(value, seen=None):
+    """Rough deep size of session values (DataFrames, nested dicts and lists)"""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_memory_bytes(k, seen) + estimate_memory_bytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_memory_bytes(v, seen) for v in value)
+    return size
+
+def session_memory_report(username):
+    """Bytes held only by this session vs. bytes in the shared per-user cache"""
+    entry = _user_cache_entry(username)
+    shared_seen = set()
+    shared_bytes = sum(
+        estimate_memory_bytes(entry[key], shared_seen)
+        for key in ('farm_data', 'harvest_data', 'revenue_data') if key in entry
+    )
+    
+    # Anything reachable from the shared cache is not counted against the session
+    session_bytes = 0
+    session_seen = set(shared_seen)
+    for key in list(st.session_state.keys()):
+        session_bytes += estimate_memory_bytes(st.session_state[key], session_seen)
+    
+    return {'session_bytes': session_bytes, 'shared_bytes': shared_bytes}
+
+def add_data(date, farm_1, farm_2, farm_3, farm_4, confirmed=False):
+    if not confirmed:
+        return "confirm", {
+            'date': date,
+            'farm_data': {
+                FARM_COLUMNS[0]: farm_1,
+                FARM_COLUMNS[1]: farm_2,
+                FARM_COLUMNS[2]: farm_3,
+                FARM_COLUMNS[3]: farm_4
+            }
+        }
+    
+    try:
+        new_row = pd.DataFrame({
+            'Date': [pd.Timestamp(date)],
+            FARM_COLUMNS[0]: [int(farm_1)],
+            FARM_COLUMNS[1]: [int(farm_2)],
+            FARM_COLUMNS[2]: [int(farm_3)],
+            FARM_COLUMNS[3]: [int(farm_4)]
+        })
+        
+        if not st.session_state.current_user_data.empty:
+            existing_dates = pd.to_datetime(st.session_state.current_user_data['Date']).dt.date
+            new_date = pd.Timestamp(date).date()
+            if new_date in existing_dates.values:
+                st.error("Data for " + str(date) + " already exists. Please edit the existing entry or choose a different date.")
+                return "error", None
+        
+        if archived_farm_days(st.session_state.username, [farm_date_key(date)]):
+            st.error("Data for " + str(date) + " was archived with its season and cannot be entered again.")
+            return "error", None
+        
+        updated_data = pd.concat([st.session_state.current_user_data, new_row], ignore_index=True)
+        st.session_state.current_user_data = compact_farm_frame(updated_data.sort_values(by='Date').reset_index(drop=True))
+        
+        # FIXED: save_data re-queried and rewrote every day; only the new day is written
+        if save_farm_changes(st.session_state.username, st.session_state.current_user_data, new_row, []):
+            st.session_state.needs_rerun = True
+            return "success", None
+        else:
+            return "error", None
+            
+    except Exception as e:
+        st.error("Error adding data: " + str(e))
+        return "error", None
+
+def farm_date_key(value):
+    """'YYYY-MM-DD' for a stored or edited Date value"""
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+def farm_doc_id(username, date_key):
+    # Deterministic ids let a bulk save create new days without looking anything up
+    return username.replace('/', '_') + "_" + date_key
+
+def set_farm_doc_ids(username, doc_ids):
+    _user_cache_entry(username)['farm_doc_ids'] = doc_ids
+
+def get_farm_doc_ids(username, farm_data):
+    """Date key -> document id for a user's farm_data; queried only if load_data has not indexed them"""
+    entry = _user_cache_entry(username)
+    if 'farm_doc_ids' not in entry:
+        doc_ids = {}
+        for doc in farm_data.where("username", "==", username).get():
+            doc_data = doc.to_dict() or {}
+            if 'Date' in doc_data:
+                doc_ids[farm_date_key(doc_data['Date'])] = doc.id
+        entry['farm_doc_ids'] = doc_ids
+    return entry['farm_doc_ids']
+
+def prepare_farm_rows(df):
+    """Edited grid rows as datetime Date + numeric farm columns. Fully blank rows
+    (e.g. an added row left empty) are dropped and blank counts read as 0."""
+    rows = df[['Date'] + FARM_COLUMNS].dropna(how='all').copy()
+    rows['Date'] = pd.to_datetime(rows['Date'], errors='coerce').dt.normalize()
+    for col in FARM_COLUMNS:
+        rows[col] = pd.to_numeric(rows[col], errors='coerce').fillna(0)
+    return rows
+
+def validate_farm_rows(rows):
+    """Errors that block saving: rows without a date, duplicate dates, negative counts"""
+    errors = []
+    
+    missing_date = rows['Date'].isna()
+    if missing_date.any():
+        errors.append(str(int(missing_date.sum())) + " row(s) have no date")
+    
+    dated = rows.loc[~missing_date, 'Date']
+    duplicated = dated[dated.duplicated(keep=False)]
+    if not duplicated.empty:
+        errors.append("Duplicate dates: " + ', '.join(sorted(duplicated.dt.strftime('%Y-%m-%d').unique())))
+    
+    negative = (rows[FARM_COLUMNS] < 0).any(axis=1) & ~missing_date
+    if negative.any():
+        errors.append("Negative bunga counts on: " + ', '.join(sorted(rows.loc[negative, 'Date'].dt.strftime('%Y-%m-%d').unique())))
+    
+    return errors
+
+def diff_farm_data(current_df, rows):
+    """Rows that are new or changed compared with current_df, and the dates removed from it"""
+    current = prepare_farm_rows(current_df) if not current_df.empty else rows.iloc[0:0]
+    merged = current.merge(rows, on='Date', how='outer', suffixes=('_old', ''), indicator=True)
+    
+    old_values = merged[[col + '_old' for col in FARM_COLUMNS]].to_numpy()
+    new_values = merged[FARM_COLUMNS].to_numpy()
+    changed = (merged['_merge'] == 'both') & (old_values != new_values).any(axis=1)
+    
+    upserts = merged.loc[(merged['_merge'] == 'right_only') | changed, ['Date'] + FARM_COLUMNS]
+    upserts = upserts.astype({col: 'int64' for col in FARM_COLUMNS}).reset_index(drop=True)
+    deleted_dates = list(merged.loc[merged['_merge'] == 'left_only', 'Date'])
+    return upserts, deleted_dates
+
+def flag_outliers(upserts, reference_df):
+    """Dates whose count for any farm is above BULK_OUTLIER_FACTOR x that farm's median day"""
+    if upserts.empty or reference_df.empty:
+        return []
+    medians = reference_df[FARM_COLUMNS].where(reference_df[FARM_COLUMNS] > 0).median()
+    limits = (medians * BULK_OUTLIER_FACTOR).fillna(np.inf)
+    outliers = (upserts[FARM_COLUMNS] > limits).any(axis=1)
+    return list(upserts.loc[outliers, 'Date'].dt.strftime('%Y-%m-%d'))
+
+def farm_day_range(username, df):
+    """(first, last) 'YYYY-MM-DD' over the frame's days and the user's archived seasons"""
+    seasons = get_archive_index(username).get('farm_data', {}).values()
+    days = [info[edge] for info in seasons for edge in ('first', 'last')]
+    if not df.empty:
+        dates = pd.to_datetime(df['Date'])
+        days += [dates.min().strftime('%Y-%m-%d'), dates.max().strftime('%Y-%m-%d')]
+    return (min(days), max(days)) if days else None
+
+def persist_farm_changes(username, farm_data, records, deleted_keys, day_range=None, progress=None):
+    """Write farm_data records and delete days in transactions of up to WRITE_BATCH_SIZE writes.
+    Each reads the days it writes and the summary and adjusts the summary by the change (see
+    stage_summary_delta), so totals saved meanwhile by other sessions are kept."""
+    doc_ids = get_farm_doc_ids(username, farm_data)
+    user_summaries = get_user_summaries_collection()
+    writes = [('set', record) for record in records] + [('delete', date_key) for date_key in deleted_keys]
+    
+    done = 0
+    for chunk in write_chunks(writes):
+        references = {}
+        for kind, value in chunk:
+            date_key = value['Date'][:10] if kind == 'set' else value
+            references[date_key] = farm_data.document(doc_ids.get(date_key) or farm_doc_id(username, date_key))
+        
+        def run(transaction, chunk=chunk, references=references):
+            summary_reference = user_summaries.document(username)
+            snapshots = {snapshot.reference.path: snapshot for snapshot in
+                         transaction.get_all(list(references.values()) + [summary_reference])}
+            before = {date_key: document_record(snapshots[reference.path])
+                      for date_key, reference in references.items() if snapshots[reference.path].exists}
+            after = dict(before)
+            for kind, value in chunk:
+                if kind == 'set':
+                    date_key = value['Date'][:10]
+                    transaction.set(references[date_key], stamp_record(value))
+                    after[date_key] = value
+                elif value in before:
+                    delete_record(transaction, references[value], 'farm_data', username)
+                    after.pop(value)
+            stage_summary_delta(transaction, summary_reference, snapshots[summary_reference.path], 'farm_data',
+                                farm_frame_from_records(list(before.values())), farm_frame_from_records(list(after.values())), day_range)
+        
+        run_transaction(run)
+        for kind, value in chunk:
+            if kind == 'set':
+                doc_ids[value['Date'][:10]] = references[value['Date'][:10]].id
+            else:
+                doc_ids.pop(value, None)
+        done += len(chunk)
+        if progress:
+            progress(done, len(writes))
+
+@traced
+def save_farm_changes(username, updated_df, upserts, deleted_dates, progress=None):
+    """Persist only the changed days: one batched commit (per WRITE_BATCH_SIZE writes)
+    instead of save_data's query plus one write per day. progress(done, total) is
+    called after each commit. With write-behind on, the change is journaled instead."""
+    records = upserts.assign(Date=upserts['Date'].dt.strftime('%Y-%m-%dT%H:%M:%S'), username=username).to_dict('records')
+    deleted_keys = [farm_date_key(date) for date in deleted_dates]
+    archived = archived_farm_days(username, [record['Date'][:10] for record in records])
+    if archived:
+        st.error("❌ Not saved: these days were archived with their season and cannot be entered again: "
+                 + ', '.join(archived[:20]) + (" ..." if len(archived) > 20 else ""))
+        return False
+    
+    write_behind = get_write_behind()
+    if write_behind:
+        write_behind.journal.append(username, 'farm_data', {
+            'records': records, 'deleted': deleted_keys, 'day_range': farm_day_range(username, updated_df)
+        }, [record['Date'][:10] for record in records] + deleted_keys)
+        cache_pending_save(username, 'farm_data', compact_farm_frame(updated_df))
+        write_behind.notify()
+        return True
+    
+    farm_data = get_farm_data_collection()
+    if farm_data:
+        try:
+            persist_farm_changes(username, farm_data, records, deleted_keys, farm_day_range(username, updated_df), progress)
+            set_cached_user_data(username, 'farm_data', compact_farm_frame(updated_df))
+            return True
+        except Exception as e:
+            st.error("Error saving changes to Firebase: " + str(e))
+            # Ids of a partly applied save are unknown; re-read them next time
+            _user_cache_entry(username).pop('farm_doc_ids', None)
+            return False
+    
+    store = get_local_store()
+    upserted = {farm_date_key(record['Date']): record for record in upserts.to_dict('records')}
+    replaced = set(deleted_keys) | set(upserted)
+    with store['lock']:
+        # Sessions share the local store, so apply the changed days to it rather than replace it
+        stored = [record for record in store['farm_data'].get(username, []) if farm_date_key(record['Date']) not in replaced]
+        stored += upserted.values()
+        store['farm_data'][username] = stored
+    stored_df = pd.DataFrame(stored, columns=['Date'] + FARM_COLUMNS)
+    stored_df['Date'] = pd.to_datetime(stored_df['Date'])
+    stored_df = stored_df.sort_values('Date', ignore_index=True)
+    write_user_summary(username, 'farm_data', stored_df)
+    set_cached_user_data(username, 'farm_data', compact_farm_frame(stored_df))
+    return True
+
+def _import_header_key(name):
+    return ' '.join(str(name).replace('_', ' ').lower().split())
+
+def farm_import_aliases():
+    """Spreadsheet header -> canonical column, including OLD_FARM_COLUMNS and bare farm names"""
+    aliases = {key: 'Date' for key in ('date', 'tarikh', 'flower date', 'planting date')}
+    for letter, old_col, new_col in zip('abcd', OLD_FARM_COLUMNS, FARM_COLUMNS):
+        for name in (new_col, old_col, new_col.split(': ', 1)[1], letter):
+            aliases[_import_header_key(name)] = new_col
+    return aliases
+
+def map_import_columns(df, aliases):
+    """Rename known headers to canonical columns (case, spaces and underscores ignored) and drop the rest"""
+    renamed = {}
+    for col in df.columns:
+        canonical = aliases.get(_import_header_key(col))
+        if canonical and canonical not in renamed.values():
+            renamed[col] = canonical
+    return df[list(renamed)].rename(columns=renamed)
+
+def parse_import_dates(values):
+    """Parse a column of dates with the first IMPORT_DATE_FORMATS entry that reads every
+    non-blank value; unreadable dates become NaT"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.tz_localize(None).dt.normalize() if values.dt.tz is not None else values.dt.normalize()
+    
+    text = values.astype('string').str.strip()
+    filled = text.notna() & (text != '')
+    for date_format in IMPORT_DATE_FORMATS:
+        parsed = pd.to_datetime(text, format=date_format, errors='coerce')
+        if parsed[filled].notna().all():
+            return parsed.dt.normalize()
+    return pd.to_datetime(text, errors='coerce', dayfirst=True, format='mixed').dt.normalize()
+
+def iter_import_chunks(source, file_name, chunk_rows=IMPORT_CHUNK_ROWS):
+    """DataFrames of at most chunk_rows rows, read lazily from a CSV or Parquet file"""
+    if file_name.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq  # Installed with Streamlit; only needed for Parquet imports
+        for record_batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield record_batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows, thousands=',', skipinitialspace=True)
+
+def read_farm_import(source, file_name, on_chunk=None):
+    """Stream a spreadsheet of daily counts into Date + FARM_COLUMNS rows.
+    Returns (rows, errors) where errors lists values that could not be read."""
+    aliases = farm_import_aliases()
+    parts = []
+    unreadable = 0
+    total = 0
+    
+    for chunk in iter_import_chunks(source, file_name):
+        chunk = map_import_columns(chunk, aliases)
+        if 'Date' not in chunk.columns or not any(col in chunk.columns for col in FARM_COLUMNS):
+            raise ValueError("Expected a date column and farm columns (" + ', '.join(FARM_COLUMNS) + " or " + ', '.join(OLD_FARM_COLUMNS) + ")")
+        
+        rows = pd.DataFrame({'Date': parse_import_dates(chunk['Date'])})
+        for col in FARM_COLUMNS:
+            values = chunk[col] if col in chunk.columns else pd.Series(0, index=chunk.index)
+            numbers = pd.to_numeric(values, errors='coerce')
+            unreadable += int((numbers.isna() & values.notna()).sum())
+            rows[col] = numbers.fillna(0)
+        parts.append(rows)
+        
+        total += len(rows)
+        if on_chunk:
+            on_chunk(total)
+    
+    rows = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['Date'] + FARM_COLUMNS)
+    errors = [str(unreadable) + " bunga count(s) are not numbers"] if unreadable else []
+    return rows, errors
+
+def plan_farm_import(current_df, rows):
+    """Split validated import rows into new days and days already stored with different
+    counts (conflicts, with the stored counts alongside). Also returns how many days are identical."""
+    rows = rows.astype({col: 'int64' for col in FARM_COLUMNS})
+    if current_df.empty:
+        return rows.reset_index(drop=True), rows.iloc[0:0], 0
+    
+    current = prepare_farm_rows(current_df).astype({col: 'int64' for col in FARM_COLUMNS})
+    merged = rows.merge(current, on='Date', how='left', suffixes=('', ' (stored)'), indicator=True)
+    stored = (merged['_merge'] == 'both').to_numpy()
+    differs = stored & (merged[FARM_COLUMNS].to_numpy() != merged[[col + ' (stored)' for col in FARM_COLUMNS]].to_numpy()).any(axis=1)
+    
+    new_rows = rows[~stored].reset_index(drop=True)
+    conflicts = merged.loc[differs].drop(columns='_merge').reset_index(drop=True)
+    return new_rows, conflicts, int((stored & ~differs).sum())
+
+def merge_farm_import(current_df, upserts):
+    """The user's farm frame with imported days added or replaced"""
+    if current_df.empty:
+        combined = upserts
+    else:
+        current = current_df[['Date'] + FARM_COLUMNS].assign(Date=pd.to_datetime(current_df['Date']))
+        combined = pd.concat([current, upserts], ignore_index=True)
+    combined = combined.drop_duplicates('Date', keep='last').sort_values('Date').reset_index(drop=True)
+    return compact_farm_frame(combined)
+
+def get_data_version(username):
+    """Bumped whenever one of the user's cached datasets is saved or reloaded"""
+    return _user_cache_entry(username)['version']
+
+def write_csv_chunks(df, buffer, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write df to a binary buffer as CSV, EXPORT_CHUNK_ROWS rows at a time, so no
+    full-size text copy of a long history is held next to the bytes"""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        buffer.write(df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode('utf-8'))
+    return buffer
+
+def records_frame(records):
+    """Harvest or estimate records as a flat table; nested values are written as JSON text"""
+    df = pd.json_normalize(records, sep=' ', max_level=1)
+    df = df.drop(columns=['username'], errors='ignore')
+    for col in df.columns:
+        if df[col].map(lambda value: isinstance(value, (dict, list))).any():
+            df[col] = df[col].map(lambda value: json.dumps(value) if isinstance(value, (dict, list)) else value)
+    return df
+
+def excel_engine():
+    """Installed Excel writer, or None. openpyxl/xlsxwriter are optional; without one the
+    workbook download is not offered."""
+    for module in ('openpyxl', 'xlsxwriter'):
+        if importlib.util.find_spec(module) is not None:
+            return module
+    return None
+
+def render_export(fmt, sheets):
+    """File bytes for {sheet name: DataFrame}: the first sheet for csv/parquet, all sheets for xlsx"""
+    buffer = io.BytesIO()
+    first = next(iter(sheets.values()))
+    if fmt == 'csv':
+        write_csv_chunks(first, buffer)
+    elif fmt == 'parquet':
+        first.to_parquet(buffer, index=False)
+    else:
+        with pd.ExcelWriter(buffer, engine=excel_engine()) as writer:
+            for name, frame in sheets.items():
+                frame.to_excel(writer, sheet_name=name, index=False)
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=EXPORT_CACHE_ENTRIES, show_spinner=False)
+def cached_export(cache_key, fmt, _build_sheets):
+    """render_export cached per cache_key (user, data version, view); _build_sheets runs only on a miss"""
+    return render_export(fmt, _build_sheets())
+
+def export_buttons(label, file_stem, cache_key, build_sheets, formats=('csv', 'parquet'), key=None):
+    """One download button per format. Files are generated only when clicked (on a
+    Streamlit worker thread) and cached per data version, so reruns build nothing."""
+    formats = [fmt for fmt in formats if fmt != 'xlsx' or excel_engine()]
+    if not formats:
+        return
+    columns = st.columns(len(formats))
+    for column, fmt in zip(columns, formats):
+        name, extension, mime = EXPORT_FORMATS[fmt]
+        with column:
+            st.download_button(
+                label=label + " (" + name + ")",
+                data=lambda fmt=fmt: cached_export(cache_key, fmt, build_sheets),
+                file_name=file_stem + extension,
+                mime=mime,
+                key=(key or file_stem) + "_" + fmt,
+                on_click="ignore"
+            )
+
+def build_email_report(username, start_date, end_date):
+    """Production, harvest and revenue summary for start_date..end_date from the shared
+    per-user cache, with the period's data attached. Runs on report worker threads."""
+    farm_df = get_cached_farm_data(username)
+    harvests = get_cached_harvest_data(username)
+    estimates = get_cached_revenue_data(username)
+    days = (end_date - start_date).days + 1
+    
+    dates = pd.to_datetime(farm_df['Date']).dt.date if not farm_df.empty else pd.Series(dtype=object)
+    period_df = farm_df[(dates >= start_date) & (dates <= end_date)] if not farm_df.empty else farm_df
+    previous_start = start_date - timedelta(days=days)
+    previous_df = farm_df[(dates >= previous_start) & (dates < start_date)] if not farm_df.empty else farm_df
+    
+    period_key = (start_date.isoformat(), end_date.isoformat())
+    period_harvests = [h for h in harvests if period_key[0] <= h.get('harvest_date', '') <= period_key[1]]
+    period_estimates = [e for e in estimates if period_key[0] <= str(e.get('date', ''))[:10] <= period_key[1]]
+    
+    total_bunga = int(period_df[FARM_COLUMNS].sum().sum()) if not period_df.empty else 0
+    previous_bunga = int(previous_df[FARM_COLUMNS].sum().sum()) if not previous_df.empty else 0
+    change = format_percentage((total_bunga - previous_bunga) / previous_bunga * 100) if previous_bunga else "n/a"
+    
+    lines = [
+        "Bunga di Kebun report for " + username,
+        "Period: " + start_date.isoformat() + " to " + end_date.isoformat(),
+        "",
+        "PRODUCTION",
+        "Total bunga: " + format_number(total_bunga) + " (" + format_number(total_bunga / 40) + " bakul), previous period " + format_number(previous_bunga) + " (" + change + ")"
+    ]
+    for col in FARM_COLUMNS:
+        farm_bunga = int(period_df[col].sum()) if not period_df.empty else 0
+        lines.append("  " + col + ": " + format_number(farm_bunga) + " bunga")
+    
+    harvested = sum(h.get('equivalent_bakul', h.get('total_harvest_bakul', 0)) for h in period_harvests)
+    lines += ["", "HARVEST", "Harvests recorded: " + str(len(period_harvests)) + ", " + "{:,.1f}".format(harvested) + " bakul"]
+    if not farm_df.empty:
+        recent = farm_df[(dates > end_date - timedelta(days=60)) & (dates <= end_date)]
+        batches = flower_batch_frame(recent, harvests) if not recent.empty else None
+        if batches is not None:
+            started = batches[(batches['harvest_count'] > 0) & ~batches['is_marked_completed'] & (batches['remaining_bakul'] > 0)]
+            lines.append("Batches still being harvested: " + str(len(started)) + ", " + "{:,.1f}".format(started['remaining_bakul'].sum()) + " bakul remaining")
+    
+    revenue = sum(e.get('total_revenue', 0) for e in period_estimates)
+    estimated_bakul = sum(e.get('total_bakul', 0) for e in period_estimates)
+    lines += ["", "REVENUE ESTIMATES", "Estimates saved: " + str(len(period_estimates)) + ", " + format_number(estimated_bakul) + " bakul, " + format_currency(revenue)]
+    
+    stem = username + "_" + start_date.isoformat() + "_to_" + end_date.isoformat()
+    sheets = {
+        'Flower Data': period_df[['Date'] + FARM_COLUMNS] if not period_df.empty else pd.DataFrame(columns=['Date'] + FARM_COLUMNS),
+        'Harvests': records_frame(period_harvests),
+        'Estimates': records_frame(period_estimates)
+    }
+    attachments = [(stem + "_flowers.csv", render_export('csv', sheets), "text/csv")]
+    if excel_engine():
+        attachments.append((stem + ".xlsx", render_export('xlsx', sheets), EXPORT_FORMATS['xlsx'][2]))
+    
+    return {
+        'subject': "Bunga di Kebun report " + start_date.isoformat() + " to " + end_date.isoformat(),
+        'body': "\n".join(lines) + "\n",
+        'attachments': attachments
+    }
+
+@st.cache_resource(show_spinner=False)
+def get_report_scheduler():
+    """The process-wide report worker, started once if [email_reports] enabled is set"""
+    settings = email_report_settings()
+    if not settings.get('enabled'):
+        return None
+    return email_reports.ReportScheduler(settings, build_email_report).start()
 
 def login_page():
     st.title("🌷 Bunga di Kebun - Login")
@@ -529,7 +2373,7 @@ def login_page():
                         st.session_state.logged_in = True
                         st.session_state.username = username
                         st.session_state.role = role
-                        st.session_state.current_user_data = load_data(username)
+                        st.session_state.current_user_data = get_cached_farm_data(username)
                         
                         st.success("Welcome back, " + username + "!")
                         st.rerun()
@@ -559,10 +2403,141 @@ def login_page():
     st.markdown("---")
     st.info("New user? Please register an account to get started.")
 
-def revenue_estimate_tab():
-    """Revenue estimation interface with flexible bakul and buyer distribution"""
-    st.header("💰 Revenue Estimate")
+def sort_revenue_transactions(transactions):
+    """Newest saved estimate first (falls back to estimate date)"""
+    # FIXED: Sort transactions by created_at (saved time) in descending order (newest first)
+    try:
+        return sorted(
+            transactions, 
+            key=lambda x: x.get('created_at', '1900-01-01T00:00:00'), 
+            reverse=True
+        )
+    except:
+        # Fallback to sorting by date if created_at is not available
+        return sorted(
+            transactions, 
+            key=lambda x: x.get('date', '1900-01-01'), 
+            reverse=True
+        )
+
+def build_revenue_history_rows(sorted_transactions):
+    """Rows for the Revenue Estimate History summary table"""
+    summary_data = []
+    for transaction in sorted_transactions:
+        # Safely get revenue with fallback
+        try:
+            revenue_amount = transaction.get('total_revenue', 0)
+            if revenue_amount is None:
+                revenue_amount = 0
+            revenue_formatted = "{:,.2f}".format(float(revenue_amount))
+        except (ValueError, TypeError):
+            revenue_formatted = "0.00"
+        
+        # Safely get other fields
+        transaction_date = transaction.get('date', 'Unknown')
+        transaction_id = transaction.get('id', 'Unknown')
+        total_bakul = transaction.get('total_bakul', 0)
+        
+        # Show methods used (new feature)
+        dist_method = transaction.get('distribution_method', 'N/A')
+        buyer_method = transaction.get('buyer_method', 'N/A')
+        methods = f"{dist_method[:3]}/{buyer_method[:3]}"  # Abbreviated
+        
+        # Safely get buyers list
+        buyers_list = transaction.get('selected_buyers', [])
+        if isinstance(buyers_list, list):
+            buyers_str = ', '.join(buyers_list)
+        else:
+            buyers_str = str(buyers_list)
+        
+        # FIXED: Handle Malaysia timezone for display
+        created_at = transaction.get('created_at', 'Unknown')
+        if created_at != 'Unknown':
+            try:
+                # Parse ISO timestamp and convert to Malaysia time if needed
+                if '+' in created_at or created_at.endswith('Z'):
+                    # Already has timezone info
+                    created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                    # Convert to Malaysia timezone
+                    malaysia_tz = timezone(timedelta(hours=8))
+                    created_dt = created_dt.astimezone(malaysia_tz)
+                    created_str = created_dt.strftime('%Y-%m-%d %H:%M')
+                else:
+                    # Assume it's already Malaysia time
+                    if len(created_at) >= 19:
+                        created_str = created_at[:16].replace('T', ' ')
+                    elif len(created_at) >= 10:
+                        created_str = created_at[:10]
+                    else:
+                        created_str = created_at
+            except:
+                # Fallback formatting
+                if len(created_at) >= 19:
+                    created_str = created_at[:16].replace('T', ' ')
+                elif len(created_at) >= 10:
+                    created_str = created_at[:10]
+                else:
+                    created_str = 'Unknown'
+        else:
+            created_str = 'Unknown'
+        
+        summary_data.append({
+            'Estimate Date': transaction_date,
+            'ID': transaction_id,
+            'Total Bakul': total_bakul,
+            'Methods': methods,
+            'Buyers': buyers_str,
+            'Total Revenue (RM)': revenue_formatted,
+            'Saved At': created_str
+        })
+    
+    return summary_data
+
+def build_revenue_history_options(sorted_transactions):
+    """Selectbox labels for the Detailed View, in the same order as sorted_transactions"""
+    transaction_options = []
+    for x in range(len(sorted_transactions)):
+        transaction = sorted_transactions[x]
+        
+        # FIXED: Handle Malaysia timezone for dropdown display - NO "Unknown time"
+        created_at = transaction.get('created_at', 'Unknown')
+        if created_at != 'Unknown':
+            try:
+                # Parse ISO timestamp and convert to Malaysia time if needed
+                if '+' in created_at or created_at.endswith('Z'):
+                    # Already has timezone info
+                    created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                    # Convert to Malaysia timezone
+                    malaysia_tz = timezone(timedelta(hours=8))
+                    created_dt = created_dt.astimezone(malaysia_tz)
+                    created_display = created_dt.strftime('%Y-%m-%d %H:%M:%S')
+                    # Create option text with creation time
+                    option_text = f"{transaction['date']} - {transaction['id']} (Saved: {created_display})"
+                else:
+                    # Assume it's already Malaysia time
+                    if len(created_at) >= 19:
+                        created_display = created_at[:19].replace('T', ' ')
+                        # Create option text with creation time
+                        option_text = f"{transaction['date']} - {transaction['id']} (Saved: {created_display})"
+                    else:
+                        # FIXED: Don't show "Unknown time" - just show without saved time
+                        option_text = f"{transaction['date']} - {transaction['id']}"
+            except:
+                # FIXED: Fallback - don't show "Unknown time"
+                option_text = f"{transaction['date']} - {transaction['id']}"
+        else:
+            # FIXED: No saved time available - don't show "Unknown time"
+            option_text = f"{transaction['date']} - {transaction['id']}"
+        
+        transaction_options.append(option_text)
     
+    return transaction_options
+
+@st.fragment
+@traced
+def revenue_calculator():
+    """Steps 1-5, Live Revenue Breakdown and Save. Runs as a fragment, so editing an input
+    reruns only this function; saving reruns the whole app to refresh the History tab."""
     # Initialize all variables at the very beginning
     buyer_distribution = {}
     buyer_bakul_allocation = {}
@@ -571,538 +2546,515 @@ def revenue_estimate_tab():
     allocation_valid = False
     selected_buyers = []
     
-    user_transactions = load_revenue_data(st.session_state.username)
+    st.subheader("Revenue Estimation Calculator")
     
-    price_entry_tab, history_tab = st.tabs(["Price Entry", "History"])
+    # STEP 1: Buyer Selection
+    st.subheader("Step 1: Select Buyers")
     
-    with price_entry_tab:
-        st.subheader("Revenue Estimation Calculator")
-        
-        # STEP 1: Buyer Selection
-        st.subheader("Step 1: Select Buyers")
+    buyer_selection_cols = st.columns(len(BUYERS))
+    selected_buyers = []  # Reset the list each time
+    
+    for i, buyer in enumerate(BUYERS):
+        with buyer_selection_cols[i]:
+            if st.checkbox("Include " + buyer, key="select_" + buyer):
+                selected_buyers.append(buyer)
+    
+    # Initialize dictionaries immediately after buyer selection
+    if selected_buyers:
+        default_buyer_percentage = 100.0 / len(selected_buyers)
+        for buyer in selected_buyers:
+            if buyer not in buyer_distribution:
+                buyer_distribution[buyer] = default_buyer_percentage
+            if buyer not in buyer_bakul_allocation:
+                buyer_bakul_allocation[buyer] = {size: 0 for size in FRUIT_SIZES}
+    
+    if selected_buyers:
+        st.success("✅ Selected buyers: " + ', '.join(selected_buyers))
+    else:
+        st.warning("⚠️ Please select at least one buyer")
+    
+    st.markdown("---")
+    
+    # STEP 2: Basic inputs
+    st.subheader("Step 2: Basic Information")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        estimate_date = st.date_input("Estimate Date", datetime.now().date())
+    with col2:
+        # Only show total bakul input if using percentage method
+        if 'bakul_method' not in st.session_state:
+            st.session_state.bakul_method = "percentage"
         
-        buyer_selection_cols = st.columns(len(BUYERS))
-        selected_buyers = []  # Reset the list each time
+        if st.session_state.bakul_method == "percentage":
+            total_bakul = st.number_input("Total Bakul", min_value=0, value=100, step=1)
+        else:
+            total_bakul = 0  # Will be calculated from individual inputs
+    
+    # STEP 3: Fruit Size Distribution with toggle
+    st.subheader("Step 3: Fruit Size Distribution")
+    
+    # Toggle between percentage and direct bakul input
+    distribution_method = st.radio(
+        "Distribution Method:",
+        ["By Percentage", "By Bakul Count"],
+        key="dist_method",
+        horizontal=True,
+        help="Choose how to distribute fruit sizes"
+    )
+    
+    st.session_state.bakul_method = "percentage" if distribution_method == "By Percentage" else "direct"
+    
+    distribution_percentages = {}
+    bakul_per_size = {}
+    
+    if distribution_method == "By Percentage":
+        # Original percentage method
+        st.write("**Enter percentage for each fruit size:**")
+        dist_cols = st.columns(len(FRUIT_SIZES))
         
-        for i, buyer in enumerate(BUYERS):
-            with buyer_selection_cols[i]:
-                if st.checkbox("Include " + buyer, key="select_" + buyer):
-                    selected_buyers.append(buyer)
+        for i, size in enumerate(FRUIT_SIZES):
+            with dist_cols[i]:
+                distribution_percentages[size] = st.number_input(
+                    size + " (%)",
+                    min_value=0.0,
+                    max_value=100.0,
+                    value=float(DEFAULT_DISTRIBUTION[size]),
+                    step=0.1,
+                    key="dist_pct_" + size
+                )
         
-        # Initialize dictionaries immediately after buyer selection
-        if selected_buyers:
-            default_buyer_percentage = 100.0 / len(selected_buyers)
-            for buyer in selected_buyers:
-                if buyer not in buyer_distribution:
-                    buyer_distribution[buyer] = default_buyer_percentage
-                if buyer not in buyer_bakul_allocation:
-                    buyer_bakul_allocation[buyer] = {size: 0 for size in FRUIT_SIZES}
+        total_percentage = sum(distribution_percentages.values())
         
-        if selected_buyers:
-            st.success("✅ Selected buyers: " + ', '.join(selected_buyers))
+        if abs(total_percentage - 100.0) > 0.1:
+            st.error("❌ Fruit size distribution must total 100%. Current total: " + format_percentage(total_percentage))
+            bakul_per_size = {}
         else:
-            st.warning("⚠️ Please select at least one buyer")
-        
-        st.markdown("---")
-        
-        # STEP 2: Basic inputs
-        st.subheader("Step 2: Basic Information")
+            st.success("✅ Fruit size distribution: " + format_percentage(total_percentage))
+            bakul_per_size = calculate_bakul_distribution(total_bakul, distribution_percentages)
+    
+    else:
+        # Direct bakul count method
+        st.write("**Enter number of bakul for each fruit size:**")
+        dist_cols = st.columns(len(FRUIT_SIZES))
         
-        col1, col2 = st.columns(2)
+        for i, size in enumerate(FRUIT_SIZES):
+            with dist_cols[i]:
+                bakul_per_size[size] = st.number_input(
+                    size + " (bakul)",
+                    min_value=0,
+                    value=DEFAULT_DISTRIBUTION[size] if size != 'Reject' else 10,
+                    step=1,
+                    key="dist_bakul_" + size
+                )
         
-        with col1:
-            estimate_date = st.date_input("Estimate Date", datetime.now().date())
-        with col2:
-            # Only show total bakul input if using percentage method
-            if 'bakul_method' not in st.session_state:
-                st.session_state.bakul_method = "percentage"
-            
-            if st.session_state.bakul_method == "percentage":
-                total_bakul = st.number_input("Total Bakul", min_value=0, value=100, step=1)
-            else:
-                total_bakul = 0  # Will be calculated from individual inputs
+        # Calculate total bakul and percentages
+        total_bakul = sum(bakul_per_size.values())
         
-        # STEP 3: Fruit Size Distribution with toggle
-        st.subheader("Step 3: Fruit Size Distribution")
+        if total_bakul > 0:
+            for size in FRUIT_SIZES:
+                distribution_percentages[size] = (bakul_per_size[size] / total_bakul) * 100
+            st.success(f"✅ Total Bakul: {total_bakul}")
+        else:
+            st.error("❌ Total bakul must be greater than 0")
+    
+    # Display bakul distribution
+    if bakul_per_size and sum(bakul_per_size.values()) > 0:
+        st.write("**Bakul Distribution:**")
+        bakul_display_cols = st.columns(len(FRUIT_SIZES))
+        for i, size in enumerate(FRUIT_SIZES):
+            with bakul_display_cols[i]:
+                percentage = distribution_percentages.get(size, 0)
+                st.info(f"{size}: {bakul_per_size[size]} bakul ({percentage:.1f}%)")
+    
+
+    buyer_bakul_allocation = {}
+    total_buyer_percentage = 0
+    
+    if selected_buyers and bakul_per_size and sum(bakul_per_size.values()) > 0:
+        st.subheader("Step 4: Buyer Distribution")
         
-        # Toggle between percentage and direct bakul input
-        distribution_method = st.radio(
-            "Distribution Method:",
-            ["By Percentage", "By Bakul Count"],
-            key="dist_method",
+        # Toggle between percentage and direct bakul allocation
+        buyer_method = st.radio(
+            "Buyer Distribution Method:",
+            ["By Percentage", "By Bakul Allocation"],
+            key="buyer_method",
             horizontal=True,
-            help="Choose how to distribute fruit sizes"
+            help="Choose how to distribute bakul among buyers"
         )
         
-        st.session_state.bakul_method = "percentage" if distribution_method == "By Percentage" else "direct"
+        # Initialize buyer_distribution for all selected buyers with proper defaults
+        default_buyer_percentage = 100.0 / len(selected_buyers) if selected_buyers else 0
+        for buyer in selected_buyers:
+            if buyer not in buyer_distribution:
+                buyer_distribution[buyer] = default_buyer_percentage
+            if buyer not in buyer_bakul_allocation:
+                buyer_bakul_allocation[buyer] = {size: 0 for size in FRUIT_SIZES}
         
-        distribution_percentages = {}
-        bakul_per_size = {}
-        
-        if distribution_method == "By Percentage":
+        if buyer_method == "By Percentage":
             # Original percentage method
-            st.write("**Enter percentage for each fruit size:**")
-            dist_cols = st.columns(len(FRUIT_SIZES))
+            st.write("**Enter percentage for each buyer:**")
+            buyer_dist_cols = st.columns(len(selected_buyers))
             
-            for i, size in enumerate(FRUIT_SIZES):
-                with dist_cols[i]:
-                    distribution_percentages[size] = st.number_input(
-                        size + " (%)",
+            for i, buyer in enumerate(selected_buyers):
+                with buyer_dist_cols[i]:
+                    # Use the initialized value as default
+                    current_value = buyer_distribution.get(buyer, default_buyer_percentage)
+                    buyer_distribution[buyer] = st.number_input(
+                        buyer + " (%)",
                         min_value=0.0,
                         max_value=100.0,
-                        value=float(DEFAULT_DISTRIBUTION[size]),
+                        value=current_value,
                         step=0.1,
-                        key="dist_pct_" + size
+                        key="buyer_dist_pct_" + buyer
                     )
             
-            total_percentage = sum(distribution_percentages.values())
+            total_buyer_percentage = sum(buyer_distribution.values()) if buyer_distribution else 0
             
-            if abs(total_percentage - 100.0) > 0.1:
-                st.error("❌ Fruit size distribution must total 100%. Current total: " + format_percentage(total_percentage))
-                bakul_per_size = {}
+            if abs(total_buyer_percentage - 100.0) > 0.1:
+                st.error("❌ Buyer distribution must total 100%. Current total: " + format_percentage(total_buyer_percentage))
             else:
-                st.success("✅ Fruit size distribution: " + format_percentage(total_percentage))
-                bakul_per_size = calculate_bakul_distribution(total_bakul, distribution_percentages)
+                st.success("✅ Buyer distribution: " + format_percentage(total_buyer_percentage))
+                
+                # Calculate buyer bakul allocation from percentages
+                for buyer in selected_buyers:
+                    if buyer not in buyer_bakul_allocation:
+                        buyer_bakul_allocation[buyer] = {}
+                    for size in FRUIT_SIZES:
+                        buyer_percentage = buyer_distribution.get(buyer, 0)
+                        buyer_bakul_count = int(bakul_per_size[size] * buyer_percentage / 100)
+                        buyer_bakul_allocation[buyer][size] = buyer_bakul_count
         
         else:
-            # Direct bakul count method
-            st.write("**Enter number of bakul for each fruit size:**")
-            dist_cols = st.columns(len(FRUIT_SIZES))
-            
-            for i, size in enumerate(FRUIT_SIZES):
-                with dist_cols[i]:
-                    bakul_per_size[size] = st.number_input(
-                        size + " (bakul)",
-                        min_value=0,
-                        value=DEFAULT_DISTRIBUTION[size] if size != 'Reject' else 10,
-                        step=1,
-                        key="dist_bakul_" + size
-                    )
-            
-            # Calculate total bakul and percentages
-            total_bakul = sum(bakul_per_size.values())
-            
-            if total_bakul > 0:
-                for size in FRUIT_SIZES:
-                    distribution_percentages[size] = (bakul_per_size[size] / total_bakul) * 100
-                st.success(f"✅ Total Bakul: {total_bakul}")
-            else:
-                st.error("❌ Total bakul must be greater than 0")
-        
-        # Display bakul distribution
-        if bakul_per_size and sum(bakul_per_size.values()) > 0:
-            st.write("**Bakul Distribution:**")
-            bakul_display_cols = st.columns(len(FRUIT_SIZES))
-            for i, size in enumerate(FRUIT_SIZES):
-                with bakul_display_cols[i]:
-                    percentage = distribution_percentages.get(size, 0)
-                    st.info(f"{size}: {bakul_per_size[size]} bakul ({percentage:.1f}%)")
-        
-
-        buyer_bakul_allocation = {}
-        total_buyer_percentage = 0
-        
-        if selected_buyers and bakul_per_size and sum(bakul_per_size.values()) > 0:
-            st.subheader("Step 4: Buyer Distribution")
+            # Direct bakul allocation method
+            st.write("**Enter bakul allocation for each buyer by fruit size:**")
             
-            # Toggle between percentage and direct bakul allocation
-            buyer_method = st.radio(
-                "Buyer Distribution Method:",
-                ["By Percentage", "By Bakul Allocation"],
-                key="buyer_method",
-                horizontal=True,
-                help="Choose how to distribute bakul among buyers"
-            )
-            
-            # Initialize buyer_distribution for all selected buyers with proper defaults
-            default_buyer_percentage = 100.0 / len(selected_buyers) if selected_buyers else 0
+            # Initialize buyer allocation for all selected buyers
             for buyer in selected_buyers:
-                if buyer not in buyer_distribution:
-                    buyer_distribution[buyer] = default_buyer_percentage
                 if buyer not in buyer_bakul_allocation:
                     buyer_bakul_allocation[buyer] = {size: 0 for size in FRUIT_SIZES}
             
-            if buyer_method == "By Percentage":
-                # Original percentage method
-                st.write("**Enter percentage for each buyer:**")
-                buyer_dist_cols = st.columns(len(selected_buyers))
+            # Create input grid: Buyers as columns, Fruit sizes as rows
+            st.write("**Allocation Grid:**")
+            
+            for size in FRUIT_SIZES:
+                st.write(f"**{size}** (Available: {bakul_per_size[size]} bakul)")
+                
+                size_cols = st.columns(len(selected_buyers) + 1)  # +1 for total column
                 
+                size_total = 0
                 for i, buyer in enumerate(selected_buyers):
-                    with buyer_dist_cols[i]:
-                        # Use the initialized value as default
-                        current_value = buyer_distribution.get(buyer, default_buyer_percentage)
-                        buyer_distribution[buyer] = st.number_input(
-                            buyer + " (%)",
-                            min_value=0.0,
-                            max_value=100.0,
-                            value=current_value,
-                            step=0.1,
-                            key="buyer_dist_pct_" + buyer
+                    with size_cols[i]:
+                        default_allocation = bakul_per_size[size] // len(selected_buyers)
+                        buyer_bakul_allocation[buyer][size] = st.number_input(
+                            f"{buyer}",
+                            min_value=0,
+                            value=default_allocation,
+                            step=1,
+                            key=f"buyer_alloc_{buyer}_{size}"
                         )
+                        size_total += buyer_bakul_allocation[buyer][size]
                 
-                total_buyer_percentage = sum(buyer_distribution.values()) if buyer_distribution else 0
-                
-                if abs(total_buyer_percentage - 100.0) > 0.1:
-                    st.error("❌ Buyer distribution must total 100%. Current total: " + format_percentage(total_buyer_percentage))
-                else:
-                    st.success("✅ Buyer distribution: " + format_percentage(total_buyer_percentage))
-                    
-                    # Calculate buyer bakul allocation from percentages
-                    for buyer in selected_buyers:
-                        if buyer not in buyer_bakul_allocation:
-                            buyer_bakul_allocation[buyer] = {}
-                        for size in FRUIT_SIZES:
-                            buyer_percentage = buyer_distribution.get(buyer, 0)
-                            buyer_bakul_count = int(bakul_per_size[size] * buyer_percentage / 100)
-                            buyer_bakul_allocation[buyer][size] = buyer_bakul_count
+                # Show total and validation
+                with size_cols[-1]:
+                    if size_total == bakul_per_size[size]:
+                        st.success(f"✅ Total: {size_total}")
+                    elif size_total < bakul_per_size[size]:
+                        st.warning(f"⚠️ Total: {size_total} (Short: {bakul_per_size[size] - size_total})")
+                    else:
+                        st.error(f"❌ Total: {size_total} (Over: {size_total - bakul_per_size[size]})")
             
-            else:
-                # Direct bakul allocation method
-                st.write("**Enter bakul allocation for each buyer by fruit size:**")
+            # Validate total allocation
+            allocation_valid = True
+            for size in FRUIT_SIZES:
+                size_total = sum(buyer_bakul_allocation[buyer][size] for buyer in selected_buyers)
+                if size_total != bakul_per_size[size]:
+                    allocation_valid = False
+                    break
+            
+            if allocation_valid:
+                st.success("✅ All bakul properly allocated to buyers!")
                 
-                # Initialize buyer allocation for all selected buyers
+                # Calculate buyer percentages for display
+                total_all_bakul = sum(bakul_per_size.values())
                 for buyer in selected_buyers:
-                    if buyer not in buyer_bakul_allocation:
-                        buyer_bakul_allocation[buyer] = {size: 0 for size in FRUIT_SIZES}
-                
-                # Create input grid: Buyers as columns, Fruit sizes as rows
-                st.write("**Allocation Grid:**")
+                    if buyer in buyer_bakul_allocation:
+                        buyer_total = sum(buyer_bakul_allocation[buyer][size] for size in FRUIT_SIZES)
+                        buyer_distribution[buyer] = (buyer_total / total_all_bakul) * 100 if total_all_bakul > 0 else 0
+                    else:
+                        buyer_distribution[buyer] = 0
                 
-                for size in FRUIT_SIZES:
-                    st.write(f"**{size}** (Available: {bakul_per_size[size]} bakul)")
-                    
-                    size_cols = st.columns(len(selected_buyers) + 1)  # +1 for total column
-                    
-                    size_total = 0
-                    for i, buyer in enumerate(selected_buyers):
-                        with size_cols[i]:
-                            default_allocation = bakul_per_size[size] // len(selected_buyers)
-                            buyer_bakul_allocation[buyer][size] = st.number_input(
-                                f"{buyer}",
-                                min_value=0,
-                                value=default_allocation,
-                                step=1,
-                                key=f"buyer_alloc_{buyer}_{size}"
-                            )
-                            size_total += buyer_bakul_allocation[buyer][size]
-                    
-                    # Show total and validation
-                    with size_cols[-1]:
-                        if size_total == bakul_per_size[size]:
-                            st.success(f"✅ Total: {size_total}")
-                        elif size_total < bakul_per_size[size]:
-                            st.warning(f"⚠️ Total: {size_total} (Short: {bakul_per_size[size] - size_total})")
-                        else:
-                            st.error(f"❌ Total: {size_total} (Over: {size_total - bakul_per_size[size]})")
-                
-                # Validate total allocation
-                allocation_valid = True
-                for size in FRUIT_SIZES:
-                    size_total = sum(buyer_bakul_allocation[buyer][size] for buyer in selected_buyers)
-                    if size_total != bakul_per_size[size]:
-                        allocation_valid = False
-                        break
-                
-                if allocation_valid:
-                    st.success("✅ All bakul properly allocated to buyers!")
-                    
-                    # Calculate buyer percentages for display
-                    total_all_bakul = sum(bakul_per_size.values())
-                    for buyer in selected_buyers:
-                        if buyer in buyer_bakul_allocation:
-                            buyer_total = sum(buyer_bakul_allocation[buyer][size] for size in FRUIT_SIZES)
-                            buyer_distribution[buyer] = (buyer_total / total_all_bakul) * 100 if total_all_bakul > 0 else 0
-                        else:
-                            buyer_distribution[buyer] = 0
-                    
-                    total_buyer_percentage = 100.0  # Should be 100% if properly allocated
-                else:
-                    st.error("❌ Bakul allocation doesn't match fruit size distribution. Please adjust the numbers.")
+                total_buyer_percentage = 100.0  # Should be 100% if properly allocated
+            else:
+                st.error("❌ Bakul allocation doesn't match fruit size distribution. Please adjust the numbers.")
+    
+    # STEP 5: Pricing Section
+    buyer_prices = {}
+    if selected_buyers:
+        st.subheader("Step 5: Pricing (RM per kg)")
         
-        # STEP 5: Pricing Section
-        buyer_prices = {}
-        if selected_buyers:
-            st.subheader("Step 5: Pricing (RM per kg)")
+        for buyer in selected_buyers:
+            buyer_prices[buyer] = {}
+            st.write("**💼 " + buyer + "**")
             
-            for buyer in selected_buyers:
-                buyer_prices[buyer] = {}
-                st.write("**💼 " + buyer + "**")
-                
-                price_cols = st.columns(len(FRUIT_SIZES))
-                for i, size in enumerate(FRUIT_SIZES):
-                    with price_cols[i]:
-                        buyer_prices[buyer][size] = st.number_input(
-                            size,
-                            min_value=0.00,
-                            value=2.50,
-                            step=0.01,
-                            format="%.2f",
-                            key="price_" + buyer + "_" + size
-                        )
-        
-        # REAL-TIME REVENUE CALCULATION AND DISPLAY
-        total_revenue = 0
-        revenue_breakdown = {}
-        
-        # Check if all conditions are met for calculation
-        bakul_valid = bakul_per_size and sum(bakul_per_size.values()) > 0
-        
-        # Ensure buyer_method is properly defined
-        if 'buyer_method' not in locals():
-            buyer_method = "By Percentage"
+            price_cols = st.columns(len(FRUIT_SIZES))
+            for i, size in enumerate(FRUIT_SIZES):
+                with price_cols[i]:
+                    buyer_prices[buyer][size] = st.number_input(
+                        size,
+                        min_value=0.00,
+                        value=2.50,
+                        step=0.01,
+                        format="%.2f",
+                        key="price_" + buyer + "_" + size
+                    )
+    
+    # REAL-TIME REVENUE CALCULATION AND DISPLAY
+    total_revenue = 0
+    revenue_breakdown = {}
+    
+    # Check if all conditions are met for calculation
+    bakul_valid = bakul_per_size and sum(bakul_per_size.values()) > 0
+    
+    # Ensure buyer_method is properly defined
+    if 'buyer_method' not in locals():
+        buyer_method = "By Percentage"
+    
+    if buyer_method == "By Percentage":
+        buyer_valid = abs(total_buyer_percentage - 100.0) < 0.1 if total_buyer_percentage > 0 else False
+    else:
+        # For direct allocation, check if allocation is valid
+        buyer_valid = allocation_valid
+    
+    can_calculate = (bakul_valid and buyer_valid and len(selected_buyers) > 0 and 
+                    buyer_bakul_allocation and 
+                    all(buyer in buyer_bakul_allocation for buyer in selected_buyers))
+    
+    if can_calculate:
+        # Calculate revenue in real-time
+        for buyer in selected_buyers:
+            if buyer not in buyer_bakul_allocation:
+                continue  # Skip if buyer allocation not properly set
+                
+            buyer_revenue = 0
+            revenue_breakdown[buyer] = {}
+            
+            for size in FRUIT_SIZES:
+                bakul_count = buyer_bakul_allocation[buyer].get(size, 0)
+                kg_total = bakul_count * BAKUL_TO_KG
+                price_per_kg = buyer_prices.get(buyer, {}).get(size, 0) if buyer_prices else 0
+                revenue = kg_total * price_per_kg
+                
+                buyer_revenue += revenue
+                revenue_breakdown[buyer][size] = {
+                    'bakul': bakul_count,
+                    'kg': kg_total,
+                    'price': price_per_kg,
+                    'revenue': revenue
+                }
+            
+            total_revenue += buyer_revenue
         
-        if buyer_method == "By Percentage":
-            buyer_valid = abs(total_buyer_percentage - 100.0) < 0.1 if total_buyer_percentage > 0 else False
-        else:
-            # For direct allocation, check if allocation is valid
-            buyer_valid = allocation_valid
+        # REAL-TIME DISPLAY of revenue breakdown
+        st.markdown("---")
+        st.subheader("💰 Live Revenue Breakdown")
         
-        can_calculate = (bakul_valid and buyer_valid and len(selected_buyers) > 0 and 
-                        buyer_bakul_allocation and 
-                        all(buyer in buyer_bakul_allocation for buyer in selected_buyers))
+        # Create columns for better layout
+        breakdown_col, summary_col = st.columns([2, 1])
         
-        if can_calculate:
-            # Calculate revenue in real-time
+        with breakdown_col:
             for buyer in selected_buyers:
-                if buyer not in buyer_bakul_allocation:
-                    continue  # Skip if buyer allocation not properly set
-                    
-                buyer_revenue = 0
-                revenue_breakdown[buyer] = {}
-                
-                for size in FRUIT_SIZES:
-                    bakul_count = buyer_bakul_allocation[buyer].get(size, 0)
-                    kg_total = bakul_count * BAKUL_TO_KG
-                    price_per_kg = buyer_prices.get(buyer, {}).get(size, 0) if buyer_prices else 0
-                    revenue = kg_total * price_per_kg
-                    
-                    buyer_revenue += revenue
-                    revenue_breakdown[buyer][size] = {
-                        'bakul': bakul_count,
-                        'kg': kg_total,
-                        'price': price_per_kg,
-                        'revenue': revenue
-                    }
+                buyer_total = sum(revenue_breakdown[buyer][size]['revenue'] for size in FRUIT_SIZES)
                 
-                total_revenue += buyer_revenue
+                # Use expander for each buyer to save space
+                with st.expander("**" + buyer + " - " + format_currency(buyer_total) + "**", expanded=True):
+                    for size in FRUIT_SIZES:
+                        details = revenue_breakdown[buyer][size]
+                        if details['bakul'] > 0:  # Only show sizes with bakul allocation
+                            detail_text = "• {}: {} bakul × {}kg × {} = {}".format(
+                                size, 
+                                details['bakul'], 
+                                BAKUL_TO_KG, 
+                                format_currency(details['price']), 
+                                format_currency(details['revenue'])
+                            )
+                            st.write(detail_text)
+        
+        with summary_col:
+            st.markdown("### 🎯 Revenue Summary")
+            st.metric(
+                label="Total Estimated Revenue", 
+                value=format_currency(total_revenue),
+                help="Updates automatically as you change prices"
+            )
             
-            # REAL-TIME DISPLAY of revenue breakdown
-            st.markdown("---")
-            st.subheader("💰 Live Revenue Breakdown")
+            # Additional summary metrics
+            st.metric(
+                label="Total Bakul", 
+                value=str(total_bakul)
+            )
+            
+            st.metric(
+                label="Revenue per Bakul", 
+                value=format_currency(total_revenue / total_bakul if total_bakul > 0 else 0)
+            )
+    
+    # SAVE ESTIMATE FORM
+    st.markdown("---")
+    st.subheader("Save This Estimate")
+    
+    with st.form("save_estimate_form"):
+        st.write("**Current Configuration Summary:**")
+        if can_calculate:
+            st.success("✅ Ready to save - Total Revenue: " + format_currency(total_revenue))
             
-            # Create columns for better layout
-            breakdown_col, summary_col = st.columns([2, 1])
+            col_summary = st.columns(3)
+            with col_summary[0]:
+                st.write("**Buyers:** " + ', '.join(selected_buyers))
+            with col_summary[1]:
+                st.write("**Total Bakul:** " + str(total_bakul))
+            with col_summary[2]:
+                st.write("**Date:** " + str(estimate_date))
             
-            with breakdown_col:
-                for buyer in selected_buyers:
-                    buyer_total = sum(revenue_breakdown[buyer][size]['revenue'] for size in FRUIT_SIZES)
-                    
-                    # Use expander for each buyer to save space
-                    with st.expander("**" + buyer + " - " + format_currency(buyer_total) + "**", expanded=True):
-                        for size in FRUIT_SIZES:
-                            details = revenue_breakdown[buyer][size]
-                            if details['bakul'] > 0:  # Only show sizes with bakul allocation
-                                detail_text = "• {}: {} bakul × {}kg × {} = {}".format(
-                                    size, 
-                                    details['bakul'], 
-                                    BAKUL_TO_KG, 
-                                    format_currency(details['price']), 
-                                    format_currency(details['revenue'])
-                                )
-                                st.write(detail_text)
-            
-            with summary_col:
-                st.markdown("### 🎯 Revenue Summary")
-                st.metric(
-                    label="Total Estimated Revenue", 
-                    value=format_currency(total_revenue),
-                    help="Updates automatically as you change prices"
-                )
-                
-                # Additional summary metrics
-                st.metric(
-                    label="Total Bakul", 
-                    value=str(total_bakul)
-                )
-                
-                st.metric(
-                    label="Revenue per Bakul", 
-                    value=format_currency(total_revenue / total_bakul if total_bakul > 0 else 0)
-                )
-        
-        # SAVE ESTIMATE FORM
-        st.markdown("---")
-        st.subheader("Save This Estimate")
-        
-        with st.form("save_estimate_form"):
-            st.write("**Current Configuration Summary:**")
-            if can_calculate:
-                st.success("✅ Ready to save - Total Revenue: " + format_currency(total_revenue))
-                
-                col_summary = st.columns(3)
-                with col_summary[0]:
-                    st.write("**Buyers:** " + ', '.join(selected_buyers))
-                with col_summary[1]:
-                    st.write("**Total Bakul:** " + str(total_bakul))
-                with col_summary[2]:
-                    st.write("**Date:** " + str(estimate_date))
-                
-                # Show distribution methods used
-                current_distribution_method = distribution_method if 'distribution_method' in locals() else "By Percentage"
+            # Show distribution methods used
+            current_distribution_method = distribution_method if 'distribution_method' in locals() else "By Percentage"
+            current_buyer_method = buyer_method if 'buyer_method' in locals() else "By Percentage"
+            st.info(f"🔧 Fruit Size: {current_distribution_method} | Buyer: {current_buyer_method}")
+        else:
+            if not bakul_valid:
+                st.error("❌ Fix fruit size distribution")
+            elif not buyer_valid:
+                # Check buyer_method exists before using it
                 current_buyer_method = buyer_method if 'buyer_method' in locals() else "By Percentage"
-                st.info(f"🔧 Fruit Size: {current_distribution_method} | Buyer: {current_buyer_method}")
-            else:
-                if not bakul_valid:
-                    st.error("❌ Fix fruit size distribution")
-                elif not buyer_valid:
-                    # Check buyer_method exists before using it
-                    current_buyer_method = buyer_method if 'buyer_method' in locals() else "By Percentage"
-                    if current_buyer_method == "By Percentage":
-                        st.error("❌ Fix buyer distribution (must total 100%)")
-                    else:
-                        st.error("❌ Fix bakul allocation (must match fruit size totals)")
-                elif not selected_buyers:
-                    st.error("❌ Select at least one buyer")
+                if current_buyer_method == "By Percentage":
+                    st.error("❌ Fix buyer distribution (must total 100%)")
                 else:
-                    st.warning("⚠️ Complete all steps above to save estimate")
-            
-            submitted = st.form_submit_button("💾 Save Estimate", disabled=not can_calculate)
-            
-            if submitted and can_calculate:
-                # FIXED: Save with Malaysia timezone
-                from datetime import timezone, timedelta
-                malaysia_tz = timezone(timedelta(hours=8))
-                malaysia_time = datetime.now(malaysia_tz)
-                
-                estimate = {
-                    'id': generate_estimate_id(estimate_date, total_bakul, st.session_state.username),
-                    'date': estimate_date.isoformat(),
-                    'total_bakul': total_bakul,
-                    'distribution_method': distribution_method if 'distribution_method' in locals() else "By Percentage",
-                    'buyer_method': buyer_method if 'buyer_method' in locals() else "By Percentage",
-                    'distribution_percentages': distribution_percentages,
-                    'bakul_per_size': bakul_per_size,
-                    'selected_buyers': selected_buyers,
-                    'buyer_distribution': buyer_distribution,
-                    'buyer_bakul_allocation': buyer_bakul_allocation,
-                    'buyer_prices': buyer_prices,
-                    'revenue_breakdown': revenue_breakdown,
-                    'total_revenue': total_revenue,
-                    'created_at': malaysia_time.isoformat()  # FIXED: Use Malaysia timezone
-                }
-                
-                user_transactions.append(estimate)
-                
-                if save_revenue_data(user_transactions, st.session_state.username):
-                    st.success("✅ Revenue estimate saved successfully!")
-                    st.rerun()
-                else:
-                    st.error("❌ Failed to save estimate")
-    
-    with history_tab:
-        st.subheader("Revenue Estimate History")
-        
-        if not user_transactions:
-            st.info("No revenue estimates found. Create your first estimate in the Price Entry tab.")
-            return
+                    st.error("❌ Fix bakul allocation (must match fruit size totals)")
+            elif not selected_buyers:
+                st.error("❌ Select at least one buyer")
+            else:
+                st.warning("⚠️ Complete all steps above to save estimate")
         
-        # FIXED: Sort transactions by created_at (saved time) in descending order (newest first)
-        try:
-            sorted_transactions = sorted(
-                user_transactions, 
-                key=lambda x: x.get('created_at', '1900-01-01T00:00:00'), 
-                reverse=True
-            )
-        except:
-            # Fallback to sorting by date if created_at is not available
-            sorted_transactions = sorted(
-                user_transactions, 
-                key=lambda x: x.get('date', '1900-01-01'), 
-                reverse=True
-            )
+        submitted = st.form_submit_button("💾 Save Estimate", disabled=not can_calculate)
         
-        # Display summary table
-        summary_data = []
-        for transaction in sorted_transactions:
-            # Safely get revenue with fallback
-            try:
-                revenue_amount = transaction.get('total_revenue', 0)
-                if revenue_amount is None:
-                    revenue_amount = 0
-                revenue_formatted = "{:,.2f}".format(float(revenue_amount))
-            except (ValueError, TypeError):
-                revenue_formatted = "0.00"
-            
-            # Safely get other fields
-            transaction_date = transaction.get('date', 'Unknown')
-            transaction_id = transaction.get('id', 'Unknown')
-            total_bakul = transaction.get('total_bakul', 0)
-            
-            # Show methods used (new feature)
-            dist_method = transaction.get('distribution_method', 'N/A')
-            buyer_method = transaction.get('buyer_method', 'N/A')
-            methods = f"{dist_method[:3]}/{buyer_method[:3]}"  # Abbreviated
-            
-            # Safely get buyers list
-            buyers_list = transaction.get('selected_buyers', [])
-            if isinstance(buyers_list, list):
-                buyers_str = ', '.join(buyers_list)
-            else:
-                buyers_str = str(buyers_list)
+        if submitted and can_calculate:
+            # FIXED: Save with Malaysia timezone
+            from datetime import timezone, timedelta
+            malaysia_tz = timezone(timedelta(hours=8))
+            malaysia_time = datetime.now(malaysia_tz)
             
-            # FIXED: Handle Malaysia timezone for display
-            created_at = transaction.get('created_at', 'Unknown')
-            if created_at != 'Unknown':
-                try:
-                    # Parse ISO timestamp and convert to Malaysia time if needed
-                    if '+' in created_at or created_at.endswith('Z'):
-                        # Already has timezone info
-                        created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        # Convert to Malaysia timezone
-                        malaysia_tz = timezone(timedelta(hours=8))
-                        created_dt = created_dt.astimezone(malaysia_tz)
-                        created_str = created_dt.strftime('%Y-%m-%d %H:%M')
-                    else:
-                        # Assume it's already Malaysia time
-                        if len(created_at) >= 19:
-                            created_str = created_at[:16].replace('T', ' ')
-                        elif len(created_at) >= 10:
-                            created_str = created_at[:10]
-                        else:
-                            created_str = created_at
-                except:
-                    # Fallback formatting
-                    if len(created_at) >= 19:
-                        created_str = created_at[:16].replace('T', ' ')
-                    elif len(created_at) >= 10:
-                        created_str = created_at[:10]
-                    else:
-                        created_str = 'Unknown'
+            estimate = {
+                'id': generate_estimate_id(estimate_date, total_bakul, st.session_state.username),
+                'date': estimate_date.isoformat(),
+                'total_bakul': total_bakul,
+                'distribution_method': distribution_method if 'distribution_method' in locals() else "By Percentage",
+                'buyer_method': buyer_method if 'buyer_method' in locals() else "By Percentage",
+                'distribution_percentages': distribution_percentages,
+                'bakul_per_size': bakul_per_size,
+                'selected_buyers': selected_buyers,
+                'buyer_distribution': buyer_distribution,
+                'buyer_bakul_allocation': buyer_bakul_allocation,
+                'buyer_prices': buyer_prices,
+                'revenue_breakdown': revenue_breakdown,
+                'total_revenue': total_revenue,
+                'created_at': malaysia_time.isoformat()  # FIXED: Use Malaysia timezone
+            }
+            
+            if commit_revenue_changes(st.session_state.username, upserts=[estimate]):
+                st.success("✅ Revenue estimate saved successfully!")
+                st.rerun()
             else:
-                created_str = 'Unknown'
-            
-            summary_data.append({
-                'Estimate Date': transaction_date,
-                'ID': transaction_id,
-                'Total Bakul': total_bakul,
-                'Methods': methods,
-                'Buyers': buyers_str,
-                'Total Revenue (RM)': revenue_formatted,
-                'Saved At': created_str
-            })
-        
-        summary_df = pd.DataFrame(summary_data)
-        st.dataframe(summary_df, use_container_width=True, hide_index=True)
-        
-        # FIXED: Detailed View Section - REMOVE "Unknown time" from dropdown
-        st.subheader("Detailed View")
+                st.error("❌ Failed to save estimate")
+
+def history_pager(state_key, username, key, order_field):
+    """Records a paginated history view has loaded so far (newest first), with a rows-per-page
+    control. Loaded pages survive reruns; after a save or reload as many are fetched again."""
+    page_size = st.selectbox("Rows per page", HISTORY_PAGE_SIZES, key=state_key + "_page_size")
+    version = get_data_version(username)
+    state = st.session_state.get(state_key)
+    if not state or state['page_size'] != page_size or state['version'] != version:
+        limit = len(state['records']) if state and state['page_size'] == page_size else page_size
+        records, cursor = fetch_history_page(username, key, order_field, max(limit, page_size))
+        state = {'username': username, 'key': key, 'order_field': order_field, 'page_size': page_size,
+                 'version': version, 'records': records, 'cursor': cursor}
+        st.session_state[state_key] = state
+    return state['records']
+
+def load_more_history(state_key):
+    """Fetch the next page before the rerun renders the table"""
+    state = st.session_state[state_key]
+    records, cursor = fetch_history_page(state['username'], state['key'], state['order_field'], state['page_size'], state['cursor'])
+    state['records'] = state['records'] + records
+    state['cursor'] = cursor
+
+def history_load_more(state_key, total):
+    state = st.session_state[state_key]
+    st.caption("Showing " + format_number(len(state['records'])) + " of " + format_number(total))
+    if state['cursor'] is not None:
+        st.button("⬇️ Load more", key=state_key + "_more", on_click=load_more_history, args=(state_key,))
+
+@traced
+def revenue_history_section():
+    st.subheader("Revenue Estimate History")
+    
+    # Totals come from the summary document; only the listed pages of estimates are loaded
+    summary = get_user_summary(st.session_state.username)
+    estimate_count = summary.get('estimate_count', 0)
+    if not estimate_count:
+        st.info("No revenue estimates found. Create your first estimate in the Price Entry tab.")
+        return
+    
+    metric_cols = st.columns(3)
+    metric_cols[0].metric("Estimates", format_number(estimate_count))
+    metric_cols[1].metric("Total Estimated Revenue", format_currency(summary.get('estimated_revenue', 0)))
+    metric_cols[2].metric("Average per Estimate", format_currency(summary.get('estimated_revenue', 0) / estimate_count))
+    
+    sorted_transactions = history_pager('revenue_history_pages', st.session_state.username, 'revenue_data', 'created_at')
+    if not sorted_transactions:
+        st.info("No revenue estimates found. Create your first estimate in the Price Entry tab.")
+        return
+    transaction_options = build_revenue_history_options(sorted_transactions)
+    
+    # Display summary table
+    sync_status = pending_sync_notice(st.session_state.username, 'revenue_data', lambda record_id: record_id)
+    summary_df = pd.DataFrame(build_revenue_history_rows(sorted_transactions))
+    if sync_status:
+        summary_df = summary_df.assign(Sync=[SYNC_ICONS.get(sync_status.get(t.get('id')), '') for t in sorted_transactions])
+    st.dataframe(summary_df, use_container_width=True, hide_index=True)
+    history_load_more('revenue_history_pages', estimate_count)
+    
+    # FIXED: Detailed View Section - REMOVE "Unknown time" from dropdown
+    st.subheader("Detailed View")
+    
+    selected_transaction_idx = st.selectbox(
+        "Select estimate to view details (sorted by save time - newest first)",
+        range(len(sorted_transactions)),
+        format_func=lambda x: transaction_options[x]
+    )
+    
+    selected_transaction = sorted_transactions[selected_transaction_idx]
+    
+    # Validate transaction data
+    missing_keys = validate_estimate_data(selected_transaction)
+    
+    if missing_keys:
+        st.error("❌ Selected estimate is missing data: " + ', '.join(missing_keys))
+        st.info("This estimate might be from an older version.")
+    else:
+        # Display detailed breakdown
+        col1, col2 = st.columns(2)
         
-        transaction_options = []
-        for x in range(len(sorted_transactions)):
-            transaction = sorted_transactions[x]
+        with col1:
+            st.write("**Estimate Details:**")
+            st.write("- Date: " + selected_transaction['date'])
+            st.write("- ID: " + selected_transaction['id'])
+            st.write("- Total Bakul: " + str(selected_transaction['total_bakul']))
+            st.write("- Total Revenue: " + format_currency(selected_transaction['total_revenue']))
+            st.write("- Buyers: " + ', '.join(selected_transaction['selected_buyers']))
             
-            # FIXED: Handle Malaysia timezone for dropdown display - NO "Unknown time"
-            created_at = transaction.get('created_at', 'Unknown')
+            # FIXED: Show creation time in Malaysia timezone - only if available
+            created_at = selected_transaction.get('created_at', 'Unknown')
             if created_at != 'Unknown':
                 try:
                     # Parse ISO timestamp and convert to Malaysia time if needed
@@ -1113,127 +3065,675 @@ def revenue_estimate_tab():
                         malaysia_tz = timezone(timedelta(hours=8))
                         created_dt = created_dt.astimezone(malaysia_tz)
                         created_display = created_dt.strftime('%Y-%m-%d %H:%M:%S')
-                        # Create option text with creation time
-                        option_text = f"{transaction['date']} - {transaction['id']} (Saved: {created_display})"
                     else:
                         # Assume it's already Malaysia time
                         if len(created_at) >= 19:
                             created_display = created_at[:19].replace('T', ' ')
-                            # Create option text with creation time
-                            option_text = f"{transaction['date']} - {transaction['id']} (Saved: {created_display})"
                         else:
-                            # FIXED: Don't show "Unknown time" - just show without saved time
-                            option_text = f"{transaction['date']} - {transaction['id']}"
+                            created_display = created_at
+                    st.write("- **Saved At: " + created_display + " (MY)**")
                 except:
-                    # FIXED: Fallback - don't show "Unknown time"
-                    option_text = f"{transaction['date']} - {transaction['id']}"
-            else:
-                # FIXED: No saved time available - don't show "Unknown time"
-                option_text = f"{transaction['date']} - {transaction['id']}"
+                    # Don't show anything if parsing fails
+                    pass
+            
+            # Show methods used (if available)
+            if 'distribution_method' in selected_transaction:
+                st.write("- Fruit Size Method: " + selected_transaction['distribution_method'])
+            if 'buyer_method' in selected_transaction:
+                st.write("- Buyer Method: " + selected_transaction['buyer_method'])
             
-            transaction_options.append(option_text)
+            # FIXED: Fruit Size Distribution in correct order (600, 500, 400, 300, Reject)
+            st.write("**Fruit Size Distribution:**")
+            size_order = ['>600g', '>500g', '>400g', '>300g', 'Reject']
+            for size in size_order:
+                if size in selected_transaction['distribution_percentages']:
+                    percentage = selected_transaction['distribution_percentages'][size]
+                    bakul_count = selected_transaction['bakul_per_size'][size]
+                    st.write("- " + size + ": " + format_percentage(percentage) + " (" + str(bakul_count) + " bakul)")
         
-        selected_transaction_idx = st.selectbox(
-            "Select estimate to view details (sorted by save time - newest first)",
-            range(len(sorted_transactions)),
-            format_func=lambda x: transaction_options[x]
-        )
+        with col2:
+            st.write("**Revenue Breakdown by Buyer:**")
+            
+            for buyer in selected_transaction['selected_buyers']:
+                buyer_total = 0
+                buyer_total_bakul = 0  # FIXED: Track total bakul for each buyer
+                st.write("**" + buyer + ":**")
+                
+                # FIXED: Display in correct order (600, 500, 400, 300, Reject)
+                size_order = ['>600g', '>500g', '>400g', '>300g', 'Reject']
+                for size in size_order:
+                    bakul_count = selected_transaction['buyer_bakul_allocation'][buyer][size]
+                    price = selected_transaction['buyer_prices'][buyer][size]
+                    revenue = bakul_count * BAKUL_TO_KG * price
+                    buyer_total += revenue
+                    buyer_total_bakul += bakul_count  # FIXED: Add to total bakul count
+                    
+                    if bakul_count > 0:  # Only show non-zero allocations
+                        detail_text = "  {}: {} bakul × {} = {}".format(
+                            size, bakul_count, format_currency(price), format_currency(revenue)
+                        )
+                        st.write(detail_text)
+                
+                # FIXED: Show subtotal with bakul count in brackets
+                st.write("  **Subtotal: " + format_currency(buyer_total) + " (" + str(buyer_total_bakul) + " bakul)**")
+                st.write("")
+    
+    # Delete functionality
+    st.subheader("Delete Estimate")
+    if st.button("🗑️ Delete Selected Estimate", type="secondary"):
+        if commit_revenue_changes(st.session_state.username, deleted_ids=[selected_transaction['id']],
+                                  expected_revs={selected_transaction['id']: selected_transaction.get('rev', 0)}):
+            st.success("Estimate deleted successfully!")
+            st.rerun()
+        else:
+            st.error("Failed to delete estimate")
+
+@traced
+def revenue_estimate_tab():
+    """Revenue estimation interface with flexible bakul and buyer distribution"""
+    st.header("💰 Revenue Estimate")
+    
+    price_entry_tab, history_tab = st.tabs(["Price Entry", "History"])
+    
+    with price_entry_tab:
+        revenue_calculator()
+    
+    with history_tab:
+        revenue_history_section()
+
+def summarize_harvests_by_flower_date(harvests):
+    """One summary per flower batch (newest flower date first)"""
+    flower_date_summary = {}
+    for harvest in harvests:
+        flower_date = harvest.get('flower_date', 'Unknown')
+        if flower_date not in flower_date_summary:
+            flower_date_summary[flower_date] = {
+                'flower_date': flower_date,
+                'expected_bakul': harvest.get('flower_total_bakul', 0),
+                'total_bunga': harvest.get('flower_total_bunga', 0),
+                'total_harvested_bakul': 0,
+                'harvest_count': 0,
+                'first_harvest_date': harvest.get('harvest_date', ''),
+                'last_harvest_date': harvest.get('harvest_date', ''),
+                'days_to_first_harvest': harvest.get('days_to_harvest', 0),
+                'farm_breakdown': harvest.get('flower_farm_breakdown', {}),
+                'is_marked_completed': False
+            }
+        
+        if 'equivalent_bakul' in harvest:
+            flower_date_summary[flower_date]['total_harvested_bakul'] += harvest.get('equivalent_bakul', 0)
+        else:
+            flower_date_summary[flower_date]['total_harvested_bakul'] += harvest.get('total_harvest_bakul', 0)
         
-        selected_transaction = sorted_transactions[selected_transaction_idx]
+        flower_date_summary[flower_date]['harvest_count'] += 1
         
-        # Validate transaction data
-        missing_keys = validate_estimate_data(selected_transaction)
+        if harvest.get('marked_completed', False):
+            flower_date_summary[flower_date]['is_marked_completed'] = True
         
-        if missing_keys:
-            st.error("❌ Selected estimate is missing data: " + ', '.join(missing_keys))
-            st.info("This estimate might be from an older version.")
-        else:
-            # Display detailed breakdown
-            col1, col2 = st.columns(2)
+        harvest_date = harvest.get('harvest_date', '')
+        if harvest_date < flower_date_summary[flower_date]['first_harvest_date']:
+            flower_date_summary[flower_date]['first_harvest_date'] = harvest_date
+            flower_date_summary[flower_date]['days_to_first_harvest'] = harvest.get('days_to_harvest', 0)
+        if harvest_date > flower_date_summary[flower_date]['last_harvest_date']:
+            flower_date_summary[flower_date]['last_harvest_date'] = harvest_date
+    
+    summary_list = list(flower_date_summary.values())
+    summary_list = sorted(summary_list, key=lambda x: x['flower_date'], reverse=True)
+    
+    return summary_list
+
+def summarize_harvests_by_day(sorted_harvests):
+    """Daily harvested bakul with fruit size breakdown.
+    Returns (daily summaries keyed by harvest date, newest-first items, overall fruit size totals)."""
+    # Group harvests by harvest date and calculate daily totals
+    daily_harvest_summary = {}
+    fruit_size_totals = {size: 0 for size in HARVEST_FRUIT_SIZES}
+    
+    for harvest in sorted_harvests:
+        harvest_date = harvest.get('harvest_date', 'Unknown')
+        flower_date = harvest.get('flower_date', 'Unknown')
+        
+        # Initialize daily summary if not exists
+        if harvest_date not in daily_harvest_summary:
+            daily_harvest_summary[harvest_date] = {
+                'total_harvested_bakul': 0,
+                'flower_dates': [],
+                'harvest_sessions': [],
+                'fruit_size_totals': {size: 0 for size in HARVEST_FRUIT_SIZES}
+            }
+        
+        # Get harvest amounts
+        equivalent_bakul = harvest.get('equivalent_bakul', 0)
+        if equivalent_bakul == 0:
+            equivalent_bakul = harvest.get('total_harvest_bakul', 0)
+        
+        # Add to daily totals
+        daily_harvest_summary[harvest_date]['total_harvested_bakul'] += equivalent_bakul
+        
+        # Track flower dates for this harvest date
+        if flower_date not in daily_harvest_summary[harvest_date]['flower_dates']:
+            daily_harvest_summary[harvest_date]['flower_dates'].append(flower_date)
+        
+        # Store harvest session details
+        daily_harvest_summary[harvest_date]['harvest_sessions'].append({
+            'flower_date': flower_date,
+            'equivalent_bakul': equivalent_bakul,
+            'harvest_details': harvest
+        })
+        
+        # Calculate fruit size breakdown for this harvest
+        bakul_distribution = harvest.get('harvest_bakul_distribution', {})
+        kg_distribution = harvest.get('harvest_kg_distribution', {})
+        
+        for size in HARVEST_FRUIT_SIZES:
+            bakul_count = bakul_distribution.get(size, 0)
+            kg_count = kg_distribution.get(size, 0) if kg_distribution else 0
+            total_size_bakul = bakul_count + (kg_count / 15)
             
-            with col1:
-                st.write("**Estimate Details:**")
-                st.write("- Date: " + selected_transaction['date'])
-                st.write("- ID: " + selected_transaction['id'])
-                st.write("- Total Bakul: " + str(selected_transaction['total_bakul']))
-                st.write("- Total Revenue: " + format_currency(selected_transaction['total_revenue']))
-                st.write("- Buyers: " + ', '.join(selected_transaction['selected_buyers']))
-                
-                # FIXED: Show creation time in Malaysia timezone - only if available
-                created_at = selected_transaction.get('created_at', 'Unknown')
-                if created_at != 'Unknown':
-                    try:
-                        # Parse ISO timestamp and convert to Malaysia time if needed
-                        if '+' in created_at or created_at.endswith('Z'):
-                            # Already has timezone info
-                            created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                            # Convert to Malaysia timezone
-                            malaysia_tz = timezone(timedelta(hours=8))
-                            created_dt = created_dt.astimezone(malaysia_tz)
-                            created_display = created_dt.strftime('%Y-%m-%d %H:%M:%S')
-                        else:
-                            # Assume it's already Malaysia time
-                            if len(created_at) >= 19:
-                                created_display = created_at[:19].replace('T', ' ')
-                            else:
-                                created_display = created_at
-                        st.write("- **Saved At: " + created_display + " (MY)**")
-                    except:
-                        # Don't show anything if parsing fails
-                        pass
-                
-                # Show methods used (if available)
-                if 'distribution_method' in selected_transaction:
-                    st.write("- Fruit Size Method: " + selected_transaction['distribution_method'])
-                if 'buyer_method' in selected_transaction:
-                    st.write("- Buyer Method: " + selected_transaction['buyer_method'])
-                
-                # FIXED: Fruit Size Distribution in correct order (600, 500, 400, 300, Reject)
-                st.write("**Fruit Size Distribution:**")
-                size_order = ['>600g', '>500g', '>400g', '>300g', 'Reject']
-                for size in size_order:
-                    if size in selected_transaction['distribution_percentages']:
-                        percentage = selected_transaction['distribution_percentages'][size]
-                        bakul_count = selected_transaction['bakul_per_size'][size]
-                        st.write("- " + size + ": " + format_percentage(percentage) + " (" + str(bakul_count) + " bakul)")
+            # Add to daily fruit size totals
+            daily_harvest_summary[harvest_date]['fruit_size_totals'][size] += total_size_bakul
             
-            with col2:
-                st.write("**Revenue Breakdown by Buyer:**")
-                
-                for buyer in selected_transaction['selected_buyers']:
-                    buyer_total = 0
-                    buyer_total_bakul = 0  # FIXED: Track total bakul for each buyer
-                    st.write("**" + buyer + ":**")
-                    
-                    # FIXED: Display in correct order (600, 500, 400, 300, Reject)
-                    size_order = ['>600g', '>500g', '>400g', '>300g', 'Reject']
-                    for size in size_order:
-                        bakul_count = selected_transaction['buyer_bakul_allocation'][buyer][size]
-                        price = selected_transaction['buyer_prices'][buyer][size]
-                        revenue = bakul_count * BAKUL_TO_KG * price
-                        buyer_total += revenue
-                        buyer_total_bakul += bakul_count  # FIXED: Add to total bakul count
-                        
-                        if bakul_count > 0:  # Only show non-zero allocations
-                            detail_text = "  {}: {} bakul × {} = {}".format(
-                                size, bakul_count, format_currency(price), format_currency(revenue)
-                            )
-                            st.write(detail_text)
-                    
-                    # FIXED: Show subtotal with bakul count in brackets
-                    st.write("  **Subtotal: " + format_currency(buyer_total) + " (" + str(buyer_total_bakul) + " bakul)**")
-                    st.write("")
-        
-        # Delete functionality
-        st.subheader("Delete Estimate")
-        if st.button("🗑️ Delete Selected Estimate", type="secondary"):
-            updated_transactions = [t for t in user_transactions if t['id'] != selected_transaction['id']]
-            if save_revenue_data(updated_transactions, st.session_state.username):
-                st.success("Estimate deleted successfully!")
-                st.rerun()
+            # Add to overall fruit size totals
+            fruit_size_totals[size] += total_size_bakul
+    
+    # Sort daily summaries by harvest date (newest first)
+    sorted_daily_summaries = sorted(daily_harvest_summary.items(), key=lambda x: x[0], reverse=True)
+    
+    return daily_harvest_summary, sorted_daily_summaries, fruit_size_totals
+
+def flower_batch_frame(flowers_df, harvests):
+    """One row per flower batch with expected, harvested and remaining bakul (newest first)"""
+    batches = pd.DataFrame({
+        'flower_date': pd.to_datetime(flowers_df['Date']).dt.strftime('%Y-%m-%d'),
+        'total_bunga': flowers_df[FARM_COLUMNS].sum(axis=1).astype('int64')
+    })
+    batches['total_bakul'] = batches['total_bunga'] // 40
+    for col in FARM_COLUMNS:
+        batches[col] = flowers_df[col].astype('int64')
+    
+    harvest_df = pd.DataFrame({
+        'flower_date': [h.get('flower_date') for h in harvests],
+        'equivalent_bakul': [h.get('equivalent_bakul', h.get('total_harvest_bakul', 0)) for h in harvests],
+        'marked_completed': [bool(h.get('marked_completed', False)) for h in harvests]
+    })
+    totals = harvest_df.groupby('flower_date').agg(
+        harvested_bakul=('equivalent_bakul', 'sum'),
+        harvest_count=('equivalent_bakul', 'size'),
+        is_marked_completed=('marked_completed', 'any')
+    )
+    batches = batches.join(totals, on='flower_date')
+    batches['harvested_bakul'] = batches['harvested_bakul'].fillna(0.0)
+    batches['harvest_count'] = batches['harvest_count'].fillna(0).astype('int64')
+    batches['is_marked_completed'] = batches['is_marked_completed'].fillna(False).astype(bool)
+    batches['remaining_bakul'] = (batches['total_bakul'] - batches['harvested_bakul']).clip(lower=0)
+    return batches.sort_values('flower_date', ascending=False).reset_index(drop=True)
+
+def build_bulk_harvest_records(batches, entries, harvest_date, notes=""):
+    """Harvest records for every batch row with a non-zero entry, derived fields computed per column.
+    entries has '<size> bakul', '<size> kg', 'Completed' and optionally 'Notes' columns aligned with
+    batches; harvest_date is one date or one per row."""
+    bakul = entries[[size + " bakul" for size in HARVEST_FRUIT_SIZES]].fillna(0).astype('int64').to_numpy()
+    kg = entries[[size + " kg" for size in HARVEST_FRUIT_SIZES]].fillna(0.0).astype(float).to_numpy()
+    
+    total_harvest_bakul = bakul.sum(axis=1)
+    total_additional_kg = kg.sum(axis=1)
+    total_harvest_kg = total_harvest_bakul * BAKUL_TO_KG + total_additional_kg
+    equivalent_bakul = total_harvest_kg / BAKUL_TO_KG
+    total_bakul = batches['total_bakul'].to_numpy()
+    cumulative = batches['harvested_bakul'].to_numpy() + equivalent_bakul
+    efficiency = np.divide(equivalent_bakul * 100, total_bakul, out=np.zeros_like(equivalent_bakul), where=total_bakul > 0)
+    remaining = np.maximum(0, total_bakul - cumulative)
+    harvest_dates = pd.Series(pd.to_datetime(harvest_date), index=batches.index)
+    days_to_harvest = (harvest_dates - pd.to_datetime(batches['flower_date'])).dt.days.to_numpy()
+    harvest_keys = harvest_dates.dt.strftime('%Y-%m-%d').to_numpy()
+    if 'Notes' in entries.columns:
+        row_notes = entries['Notes'].fillna('').astype(str).str.strip().to_numpy()
+    else:
+        row_notes = np.full(len(entries), notes.strip() if notes else "", dtype=object)
+    
+    created_at = datetime.now()
+    records = []
+    for i in np.flatnonzero(equivalent_bakul > 0):
+        flower_date = batches['flower_date'].iat[i]
+        records.append({
+            # A seconds timestamp repeats when a batch gets two saves for one day within a second
+            'id': f"{flower_date}_{harvest_keys[i]}_{uuid.uuid4().hex}",
+            'flower_date': flower_date,
+            'harvest_date': harvest_keys[i],
+            'days_to_harvest': int(days_to_harvest[i]),
+            'flower_total_bunga': int(batches['total_bunga'].iat[i]),
+            'flower_total_bakul': int(total_bakul[i]),
+            'flower_farm_breakdown': {col: int(batches[col].iat[i]) for col in FARM_COLUMNS},
+            'harvest_bakul_distribution': dict(zip(HARVEST_FRUIT_SIZES, bakul[i].tolist())),
+            'harvest_kg_distribution': dict(zip(HARVEST_FRUIT_SIZES, kg[i].tolist())),
+            'total_harvest_bakul': int(total_harvest_bakul[i]),
+            'total_additional_kg': float(total_additional_kg[i]),
+            'total_harvest_kg': float(total_harvest_kg[i]),
+            'equivalent_bakul': float(equivalent_bakul[i]),
+            'harvest_efficiency': float(efficiency[i]),
+            'harvest_number': int(batches['harvest_count'].iat[i]) + 1,
+            'cumulative_harvested': float(cumulative[i]),
+            'remaining_after_harvest': float(remaining[i]),
+            'marked_completed': bool(entries['Completed'].iat[i]),
+            'notes': row_notes[i],
+            # Distinct per row, so same-day harvests keep the entered order when renumbered
+            'created_at': (created_at + timedelta(microseconds=int(i))).isoformat()
+        })
+    return records
+
+def recompute_harvest_derived(harvests, flower_dates):
+    """Derived-state engine for harvest records: renumber harvest_number and recompute
+    cumulative_harvested / remaining_after_harvest for the given flower batches, in
+    harvest_date order. Returns {position in harvests: changed fields} for records
+    whose stored values differ."""
+    positions = [i for i, h in enumerate(harvests) if h.get('flower_date') in flower_dates]
+    if not positions:
+        return {}
+    
+    batch_df = pd.DataFrame({
+        'flower_date': [harvests[i].get('flower_date') for i in positions],
+        'harvest_date': [harvests[i].get('harvest_date', '') for i in positions],
+        'created_at': [harvests[i].get('created_at', '') for i in positions],
+        'equivalent_bakul': [float(harvests[i].get('equivalent_bakul', harvests[i].get('total_harvest_bakul', 0))) for i in positions],
+        'flower_total_bakul': [float(harvests[i].get('flower_total_bakul', 0)) for i in positions],
+        'harvest_number': [harvests[i].get('harvest_number') for i in positions],
+        'cumulative_harvested': [harvests[i].get('cumulative_harvested') for i in positions],
+        'remaining_after_harvest': [harvests[i].get('remaining_after_harvest') for i in positions]
+    }, index=positions)
+    # Same-day harvests keep their existing relative order
+    batch_df['stored_number'] = pd.to_numeric(batch_df['harvest_number'], errors='coerce')
+    batch_df = batch_df.sort_values(['flower_date', 'harvest_date', 'created_at', 'stored_number'], kind='stable')
+    
+    by_batch = batch_df.groupby('flower_date', sort=False)
+    harvest_number = by_batch.cumcount() + 1
+    cumulative = by_batch['equivalent_bakul'].cumsum()
+    remaining = (batch_df['flower_total_bakul'] - cumulative).clip(lower=0)
+    
+    stored_cumulative = pd.to_numeric(batch_df['cumulative_harvested'], errors='coerce')
+    stored_remaining = pd.to_numeric(batch_df['remaining_after_harvest'], errors='coerce')
+    changed = (
+        (batch_df['stored_number'] != harvest_number)
+        | ~np.isclose(stored_cumulative, cumulative)
+        | ~np.isclose(stored_remaining, remaining)
+    )
+    
+    return {
+        position: {
+            'harvest_number': int(harvest_number[position]),
+            'cumulative_harvested': float(cumulative[position]),
+            'remaining_after_harvest': float(remaining[position])
+        }
+        for position in batch_df.index[changed]
+    }
+
+def derive_harvest_changes(current, upserts, deleted_ids, expected_revs, known_ids):
+    """Apply the changes to current (see apply_record_changes) and recompute derived fields
+    for the affected flower batches. Returns (updated records, records to write)."""
+    touched = {record['id'] for record in upserts} | set(deleted_ids)
+    # An edit may move a record to another batch; renumber the old one too
+    affected = {record['flower_date'] for record in upserts}
+    affected |= {harvest.get('flower_date') for harvest in current if harvest.get('id') in touched}
+    
+    updated = apply_record_changes(current, upserts, deleted_ids, expected_revs, known_ids)
+    changed_ids = {record['id'] for record in upserts}
+    for position, fields in recompute_harvest_derived(updated, affected).items():
+        updated[position] = dict(updated[position], **fields)
+        changed_ids.add(updated[position].get('id'))
+    return updated, [h for h in updated if h.get('id') in changed_ids]
+
+def read_harvest_batches(username, harvest_data, flower_dates, record_ids=(), get=None):
+    """The stored harvests of the given flower batches, plus the batches holding record_ids,
+    and their document references. Queried FIRESTORE_IN_LIMIT values at a time (through get,
+    e.g. transaction.get, if given)."""
+    get = get or (lambda query: query.get())
+    user_harvests = harvest_data.where("username", "==", username)
+    ids = sorted(record_ids, key=str)
+    values = set(flower_dates)
+    # A record being edited or deleted may sit in another batch (or have been moved there)
+    for start in range(0, len(ids), FIRESTORE_IN_LIMIT):
+        for doc in get(user_harvests.where("id", "in", ids[start:start + FIRESTORE_IN_LIMIT])):
+            values.add((doc.to_dict() or {}).get('flower_date'))
+    values = sorted(values, key=str)
+    current = []
+    references = {}
+    for start in range(0, len(values), FIRESTORE_IN_LIMIT):
+        query = user_harvests.where("flower_date", "in", values[start:start + FIRESTORE_IN_LIMIT])
+        for doc in get(query):
+            data = document_record(doc)
+            current.append(data)
+            references[data.get('id')] = doc.reference
+    return current, references
+
+def transact_harvest_changes(username, harvest_data, flower_dates, upserts, deleted_ids, expected_revs, known_ids):
+    """Apply harvest changes in a transaction that reads only the affected flower batches and
+    the summary. Returns (the batches' records after the change, record id -> document id)."""
+    user_summaries = get_user_summaries_collection()
+    # Records saved before revs existed look new, so every touched id is looked up
+    touched = {record['id'] for record in upserts} | set(deleted_ids)
+    
+    def run(transaction):
+        current, references = read_harvest_batches(username, harvest_data, flower_dates, touched, transaction.get)
+        summary_reference = user_summaries.document(username)
+        summary_doc = next(iter(transaction.get_all([summary_reference])))
+        
+        updated, to_write = derive_harvest_changes(current, upserts, deleted_ids, expected_revs, known_ids)
+        for record in to_write:
+            references.setdefault(record['id'], harvest_data.document())
+            transaction.set(references[record['id']], stamp_record(record))
+        for record_id in deleted_ids:
+            if record_id in references:
+                delete_record(transaction, references.pop(record_id), 'harvest_data', username)
+        stage_summary_delta(transaction, summary_reference, summary_doc, 'harvest_data', current, updated)
+        return updated, {record_id: reference.id for record_id, reference in references.items()}
+    
+    return run_transaction(run)
+
+def persist_harvest_changes(username, harvest_data, flower_dates, upserts, deleted_ids, expected_revs, known_ids, progress=None):
+    """Apply harvest changes too large for one transaction as a series of transactions of up to
+    TRANSACTION_MAX_RECORDS changes each, ordered by flower batch. Each re-reads and checks
+    everything it writes (see transact_harvest_changes); a ConcurrentEditError stops the save
+    with the earlier groups saved. progress(done, total) is called after each transaction.
+    Returns (the batches' records after the change, record id -> document id)."""
+    changes = [('set', record) for record in sorted(upserts, key=lambda record: (str(record['flower_date']), record['id']))]
+    changes += [('delete', record_id) for record_id in sorted(deleted_ids)]
+    updated = {}
+    doc_ids = {}
+    for start in range(0, len(changes), TRANSACTION_MAX_RECORDS):
+        group = changes[start:start + TRANSACTION_MAX_RECORDS]
+        group_upserts = [value for kind, value in group if kind == 'set']
+        group_deleted = {value for kind, value in group if kind == 'delete'}
+        group_updated, group_doc_ids = transact_harvest_changes(
+            username, harvest_data, {record['flower_date'] for record in group_upserts}, group_upserts,
+            group_deleted, expected_revs, known_ids
+        )
+        # Later groups re-read batches an earlier one renumbered; their copy is the latest
+        for record_id in group_deleted:
+            updated.pop(record_id, None)
+            doc_ids.pop(record_id, None)
+        updated.update((record.get('id'), record) for record in group_updated)
+        doc_ids.update(group_doc_ids)
+        if progress:
+            progress(start + len(group), len(changes))
+    return list(updated.values()), doc_ids
+
+@traced
+def commit_harvest_changes(username, upserts=(), deleted_ids=(), progress=None, expected_revs=None):
+    """Insert/replace harvest records (matched on 'id') and delete others, then recompute derived
+    fields for the affected flower batches only.
+    
+    Up to TRANSACTION_MAX_RECORDS changes run in a transaction that re-reads just the affected
+    batches and checks each record's rev, so saves from other devices are neither overwritten
+    nor numbered over. expected_revs ({id: rev}) guards deletes the same way. Larger saves
+    (bulk entry, imports) run as several such transactions (see persist_harvest_changes);
+    progress(done, total) is called after each one. With
+    write-behind on, the change is checked against the cache and journaled; the flusher
+    replays it the same way."""
+    upserts = [dict(record, username=username) for record in upserts]
+    deleted_ids = set(deleted_ids)
+    expected_revs = expected_revs or {}
+    # As for estimates: a saved harvest has a rev, and the transaction finds the batches of
+    # edited and deleted records by id, so saving does not need the whole history loaded
+    known_ids = {record['id'] for record in upserts if record.get('rev', 0) > 0}
+    touched = {record['id'] for record in upserts} | deleted_ids
+    flower_dates = {record['flower_date'] for record in upserts}
+    
+    write_behind = get_write_behind()
+    if write_behind:
+        # The optimistic copy shown until the flusher catches up needs the full list
+        cached = get_cached_harvest_data(username)
+        try:
+            updated_harvests, to_write = derive_harvest_changes(cached, upserts, deleted_ids, expected_revs, known_ids)
+        except ConcurrentEditError as e:
+            report_concurrent_edit(username, 'harvest_data', e)
+            return False
+        # Replayed against the stored batches, so the rev checks run against Firestore too
+        payload = {'transaction': len(touched) <= TRANSACTION_MAX_RECORDS, 'flower_dates': sorted(flower_dates, key=str),
+                   'upserts': upserts, 'deleted_ids': sorted(deleted_ids), 'expected_revs': expected_revs,
+                   'known_ids': sorted(known_ids)}
+        write_behind.journal.append(username, 'harvest_data', payload, touched)
+        cache_pending_save(username, 'harvest_data', updated_harvests)
+        write_behind.notify()
+        return True
+    
+    harvest_data = get_harvest_data_collection()
+    if harvest_data:
+        try:
+            if len(touched) <= TRANSACTION_MAX_RECORDS:
+                updated, doc_ids = transact_harvest_changes(username, harvest_data, flower_dates, upserts, deleted_ids, expected_revs, known_ids)
             else:
-                st.error("Failed to delete estimate")
+                updated, doc_ids = persist_harvest_changes(username, harvest_data, flower_dates, upserts, deleted_ids, expected_revs, known_ids, progress)
+            entry = _user_cache_entry(username)
+            if 'harvest_doc_ids' in entry:
+                entry['harvest_doc_ids'].update(doc_ids)
+                for record_id in deleted_ids:
+                    entry['harvest_doc_ids'].pop(record_id, None)
+            if 'harvest_data' in entry:
+                reread = flower_dates | {harvest.get('flower_date') for harvest in updated}
+                updated_harvests = merge_fresh_records(entry['harvest_data'], updated, lambda harvest: harvest.get('flower_date') in reread or harvest.get('id') in deleted_ids)
+                set_cached_user_data(username, 'harvest_data', updated_harvests)
+            else:
+                # Nothing cached to patch; history pages are keyed on the version
+                entry['version'] += 1
+                entry.pop('summary', None)
+            return True
+        except ConcurrentEditError as e:
+            report_concurrent_edit(username, 'harvest_data', e)
+            return False
+        except Exception as e:
+            st.error("Error saving harvest data to Firebase: " + str(e))
+            _user_cache_entry(username).pop('harvest_doc_ids', None)
+            return False
+    
+    store = get_local_store()
+    try:
+        with store['lock']:
+            # Sessions share the local store, so check revs against it rather than the cache
+            current = list(store['harvest_data'].get(username, []))
+            updated_harvests, _ = derive_harvest_changes(current, upserts, deleted_ids, expected_revs, known_ids)
+            store['harvest_data'][username] = list(updated_harvests)
+    except ConcurrentEditError as e:
+        report_concurrent_edit(username, 'harvest_data', e)
+        return False
+    write_user_summary(username, 'harvest_data', updated_harvests)
+    set_cached_user_data(username, 'harvest_data', updated_harvests)
+    return True
+
+def harvest_import_aliases():
+    """Spreadsheet header -> canonical harvest import column"""
+    aliases = {
+        'flower date': 'flower_date',
+        'planting date': 'flower_date',
+        'harvest date': 'harvest_date',
+        'notes': 'Notes',
+        'completed': 'Completed',
+        'marked completed': 'Completed'
+    }
+    for size in HARVEST_FRUIT_SIZES:
+        aliases[_import_header_key(size)] = size + " bakul"
+        aliases[_import_header_key(size + " bakul")] = size + " bakul"
+        aliases[_import_header_key(size + " kg")] = size + " kg"
+    return aliases
+
+def read_harvest_import(source, file_name, on_chunk=None):
+    """Stream a spreadsheet of harvests (flower date, harvest date, bakul/kg per size) into
+    rows shaped like the bulk harvest grid. Returns (rows, errors)."""
+    aliases = harvest_import_aliases()
+    amount_columns = [size + " bakul" for size in HARVEST_FRUIT_SIZES] + [size + " kg" for size in HARVEST_FRUIT_SIZES]
+    parts = []
+    unreadable = 0
+    total = 0
+    
+    for chunk in iter_import_chunks(source, file_name):
+        chunk = map_import_columns(chunk, aliases)
+        if 'flower_date' not in chunk.columns or 'harvest_date' not in chunk.columns:
+            raise ValueError("Expected 'Flower Date' and 'Harvest Date' columns")
+        
+        rows = pd.DataFrame({
+            'flower_date': parse_import_dates(chunk['flower_date']),
+            'harvest_date': parse_import_dates(chunk['harvest_date'])
+        })
+        for col in amount_columns:
+            values = chunk[col] if col in chunk.columns else pd.Series(0, index=chunk.index)
+            numbers = pd.to_numeric(values, errors='coerce')
+            unreadable += int((numbers.isna() & values.notna()).sum())
+            rows[col] = numbers.fillna(0)
+        
+        completed = chunk['Completed'] if 'Completed' in chunk.columns else pd.Series(False, index=chunk.index)
+        rows['Completed'] = completed.astype('string').str.strip().str.lower().isin(['true', 'yes', 'y', '1', 'x']).to_numpy()
+        rows['Notes'] = chunk['Notes'].fillna('').astype(str) if 'Notes' in chunk.columns else ""
+        parts.append(rows)
+        
+        total += len(rows)
+        if on_chunk:
+            on_chunk(total)
+    
+    if not parts:
+        return pd.DataFrame(columns=['flower_date', 'harvest_date'] + amount_columns + ['Completed', 'Notes']), []
+    errors = [str(unreadable) + " bakul/kg value(s) are not numbers"] if unreadable else []
+    return pd.concat(parts, ignore_index=True), errors
+
+def validate_harvest_import(rows, batches):
+    """Errors that block a harvest import; batches is flower_batch_frame of all flower data"""
+    errors = []
+    
+    missing_date = rows['flower_date'].isna() | rows['harvest_date'].isna()
+    if missing_date.any():
+        errors.append(str(int(missing_date.sum())) + " row(s) have no flower or harvest date")
+    
+    dated = rows[~missing_date]
+    flower_keys = dated['flower_date'].dt.strftime('%Y-%m-%d')
+    pairs = flower_keys + " → " + dated['harvest_date'].dt.strftime('%Y-%m-%d')
+    
+    unknown = flower_keys[~flower_keys.isin(batches['flower_date'])]
+    if not unknown.empty:
+        errors.append("No flower data for: " + ', '.join(sorted(unknown.unique())))
+    
+    too_early = dated['harvest_date'] < dated['flower_date']
+    if too_early.any():
+        errors.append("Harvest before planting on: " + ', '.join(sorted(pairs[too_early].unique())))
+    
+    amount_columns = [size + " bakul" for size in HARVEST_FRUIT_SIZES] + [size + " kg" for size in HARVEST_FRUIT_SIZES]
+    negative = (rows[amount_columns] < 0).any(axis=1)
+    if negative.any():
+        errors.append(str(int(negative.sum())) + " row(s) have negative bakul or kg")
+    
+    return errors
+
+def build_import_harvest_records(rows, batches, harvests, overwrite=False):
+    """Harvest records for validated import rows, built column-wise by build_bulk_harvest_records.
+    The n-th imported harvest of a flower batch on a day conflicts with the n-th one already
+    stored for that day: overwritten in place when overwrite is set, skipped otherwise.
+    Returns (records, conflicts)."""
+    flower_keys = rows['flower_date'].dt.strftime('%Y-%m-%d')
+    aligned = batches.set_index('flower_date').reindex(flower_keys).reset_index()
+    records = build_bulk_harvest_records(aligned, rows.reset_index(drop=True), rows['harvest_date'].to_numpy())
+    
+    stored = {}
+    for harvest in sorted(harvests, key=lambda h: h.get('harvest_number', 0)):
+        stored.setdefault((harvest.get('flower_date'), harvest.get('harvest_date')), []).append(harvest)
+    
+    seen = {}
+    new_records = []
+    conflicts = []
+    for record in records:
+        key = (record['flower_date'], record['harvest_date'])
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        
+        same_day = stored.get(key, [])
+        if occurrence >= len(same_day):
+            new_records.append(record)
+            continue
+        existing = same_day[occurrence]
+        conflicts.append({
+            'Flower Date': record['flower_date'],
+            'Harvest Date': record['harvest_date'],
+            'Stored Bakul': round(float(existing.get('equivalent_bakul', existing.get('total_harvest_bakul', 0))), 1),
+            'Imported Bakul': round(record['equivalent_bakul'], 1)
+        })
+        if overwrite:
+            new_records.append(dict(record, id=existing.get('id'), rev=existing.get('rev', 0), created_at=existing.get('created_at', record['created_at'])))
+    return new_records, conflicts
+
+def bulk_harvest_entry(filtered_flowers, user_harvests):
+    """One harvest date entered for several flower batches in a single table"""
+    st.subheader("🧺 Bulk Harvest Entry")
+    st.caption("Enter one harvest day for several flower batches at once. Rows left at zero are skipped.")
+    
+    if 'bulk_harvest_version' not in st.session_state:
+        st.session_state.bulk_harvest_version = 0
+    version = str(st.session_state.bulk_harvest_version)
+    
+    today = datetime.now().date()
+    harvest_date = st.date_input("Harvest Date", value=today, key="bulk_harvest_date_" + version)
+    
+    batches = flower_batch_frame(filtered_flowers, user_harvests)
+    
+    grid = pd.DataFrame({
+        'Flower Date': batches['flower_date'],
+        'Expected': batches['total_bakul'],
+        'Remaining': batches['remaining_bakul'].round(1)
+    })
+    column_config = {
+        'Flower Date': st.column_config.TextColumn("Flower Date", disabled=True),
+        'Expected': st.column_config.NumberColumn("Expected", disabled=True, format="%d"),
+        'Remaining': st.column_config.NumberColumn("Remaining", disabled=True, format="%.1f")
+    }
+    for size in HARVEST_FRUIT_SIZES:
+        grid[size + " bakul"] = 0
+        grid[size + " kg"] = 0.0
+        column_config[size + " bakul"] = st.column_config.NumberColumn(size + " bakul", min_value=0, step=1, format="%d")
+        column_config[size + " kg"] = st.column_config.NumberColumn(size + " kg", min_value=0.0, max_value=14.9, step=0.1, format="%.1f")
+    grid['Completed'] = batches['is_marked_completed']
+    column_config['Completed'] = st.column_config.CheckboxColumn("Completed", help="Mark the batch as fully harvested")
+    
+    entries = st.data_editor(
+        grid,
+        key="bulk_harvest_grid_" + version,
+        column_config=column_config,
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    notes = st.text_input("Notes (optional)", key="bulk_harvest_notes_" + version)
+    
+    records = build_bulk_harvest_records(batches, entries, harvest_date, notes)
+    if not records:
+        st.info("Enter bakul or kg for at least one flower batch.")
+        return
+    
+    too_early = [r['flower_date'] for r in records if r['days_to_harvest'] < 0]
+    if too_early:
+        st.error("❌ Harvest date cannot be before planting date: " + ', '.join(too_early))
+    
+    remaining_by_date = dict(zip(batches['flower_date'], batches['remaining_bakul']))
+    over_harvest = [
+        r['flower_date'] for r in records
+        if 0 < remaining_by_date[r['flower_date']] < r['equivalent_bakul']
+    ]
+    if over_harvest:
+        st.warning("⚠️ More than the remaining bakul for: " + ', '.join(over_harvest))
+    
+    summary_df = pd.DataFrame([{
+        'Flower Date': r['flower_date'],
+        'Harvest #': r['harvest_number'],
+        'Equivalent Bakul': round(r['equivalent_bakul'], 1),
+        'Efficiency (%)': round(r['harvest_efficiency'], 1),
+        'Cumulative': round(r['cumulative_harvested'], 1),
+        'Will Remain': round(r['remaining_after_harvest'], 1),
+        'Completed': r['marked_completed']
+    } for r in records])
+    st.dataframe(summary_df, use_container_width=True, hide_index=True)
+    
+    if st.button("💾 Save " + str(len(records)) + " Harvest Record(s)", key="bulk_harvest_save", disabled=bool(too_early)):
+        if commit_harvest_changes(st.session_state.username, upserts=records):
+            st.session_state.bulk_harvest_version += 1
+            st.success("✅ Saved " + str(len(records)) + " harvest record(s) for " + harvest_date.isoformat())
+            st.rerun()
+        else:
+            st.error("❌ Failed to save harvest records")
 
+@traced
 def harvest_tracking_tab():
     st.header("🥭 Harvest Tracking")
     
@@ -1260,9 +3760,12 @@ def harvest_tracking_tab():
         return
     
     filtered_flowers = filtered_flowers.sort_values('Date', ascending=False)
-    user_harvests = load_harvest_data(st.session_state.username)
+    user_harvests = get_cached_harvest_data(st.session_state.username)
     
-    entry_tab, history_tab = st.tabs(["🌱 Harvest Entry", "📊 Harvest History"])
+    entry_tab, bulk_tab, history_tab = st.tabs(["🌱 Harvest Entry", "🧺 Bulk Harvest Entry", "📊 Harvest History"])
+    
+    with bulk_tab:
+        bulk_harvest_entry(filtered_flowers, user_harvests)
     
     with entry_tab:
         st.subheader("Select Flower Planting Date")
@@ -1270,27 +3773,15 @@ def harvest_tracking_tab():
         flower_options = []
         flower_date_map = {}
         
-        for idx, row in filtered_flowers.iterrows():
-            plant_date = row['Date'].date()
-            total_bunga = sum([row[col] for col in FARM_COLUMNS])
-            total_bakul = int(total_bunga / 40)
-            
-            existing_harvests = [h for h in user_harvests if h.get('flower_date') == plant_date.isoformat()]
-            harvest_count = len(existing_harvests)
-            
-            total_harvested_bakul = 0
-            is_marked_completed = False
-            
-            for harvest in existing_harvests:
-                if 'equivalent_bakul' in harvest:
-                    total_harvested_bakul += harvest.get('equivalent_bakul', 0)
-                else:
-                    total_harvested_bakul += harvest.get('total_harvest_bakul', 0)
-                
-                if harvest.get('marked_completed', False):
-                    is_marked_completed = True
-            
-            remaining_bakul = max(0, total_bakul - total_harvested_bakul)
+        # Batch totals come from one groupby instead of scanning every harvest per row
+        for _, row in flower_batch_frame(filtered_flowers, user_harvests).iterrows():
+            plant_date = datetime.strptime(row['flower_date'], '%Y-%m-%d').date()
+            total_bunga = int(row['total_bunga'])
+            total_bakul = int(row['total_bakul'])
+            harvest_count = int(row['harvest_count'])
+            total_harvested_bakul = float(row['harvested_bakul'])
+            is_marked_completed = bool(row['is_marked_completed'])
+            remaining_bakul = float(row['remaining_bakul'])
             
             if harvest_count > 0:
                 if is_marked_completed:
@@ -1524,7 +4015,8 @@ def harvest_tracking_tab():
                         st.error("❌ Please enter at least some harvest data!")
                     else:
                         harvest_record = {
-                            'id': f"{plant_date.isoformat()}_{harvest_date.isoformat()}_{int(datetime.now().timestamp())}",
+                            # FIXED: a seconds timestamp let two saves within a second share an id
+                            'id': f"{plant_date.isoformat()}_{harvest_date.isoformat()}_{uuid.uuid4().hex}",
                             'flower_date': plant_date.isoformat(),
                             'harvest_date': harvest_date.isoformat(),
                             'days_to_harvest': (harvest_date - plant_date).days,
@@ -1546,9 +4038,7 @@ def harvest_tracking_tab():
                             'created_at': datetime.now().isoformat()
                         }
                         
-                        user_harvests.append(harvest_record)
-                        
-                        if save_harvest_data(user_harvests, st.session_state.username):
+                        if commit_harvest_changes(st.session_state.username, upserts=[harvest_record]):
                             new_remaining = max(0, total_bakul - (total_harvested_bakul + equivalent_bakul))
                             
                             if mark_completed:
@@ -1571,6 +4061,9 @@ def harvest_tracking_tab():
             st.info("No harvest records found. Add your first harvest in the Harvest Entry tab.")
             return
         
+        harvest_labels = {h.get('id'): h.get('harvest_date', '') + " (flowers " + h.get('flower_date', '') + ")" for h in user_harvests}
+        pending_sync_notice(st.session_state.username, 'harvest_data', lambda record_id: harvest_labels.get(record_id, record_id))
+        
         sorted_harvests = sorted(
             user_harvests,
             key=lambda x: x.get('harvest_date', '1900-01-01'),
@@ -1579,42 +4072,7 @@ def harvest_tracking_tab():
         
         st.subheader("🌸 Harvest Summary by Flower Date")
         
-        flower_date_summary = {}
-        for harvest in user_harvests:
-            flower_date = harvest.get('flower_date', 'Unknown')
-            if flower_date not in flower_date_summary:
-                flower_date_summary[flower_date] = {
-                    'flower_date': flower_date,
-                    'expected_bakul': harvest.get('flower_total_bakul', 0),
-                    'total_bunga': harvest.get('flower_total_bunga', 0),
-                    'total_harvested_bakul': 0,
-                    'harvest_count': 0,
-                    'first_harvest_date': harvest.get('harvest_date', ''),
-                    'last_harvest_date': harvest.get('harvest_date', ''),
-                    'days_to_first_harvest': harvest.get('days_to_harvest', 0),
-                    'farm_breakdown': harvest.get('flower_farm_breakdown', {}),
-                    'is_marked_completed': False
-                }
-            
-            if 'equivalent_bakul' in harvest:
-                flower_date_summary[flower_date]['total_harvested_bakul'] += harvest.get('equivalent_bakul', 0)
-            else:
-                flower_date_summary[flower_date]['total_harvested_bakul'] += harvest.get('total_harvest_bakul', 0)
-            
-            flower_date_summary[flower_date]['harvest_count'] += 1
-            
-            if harvest.get('marked_completed', False):
-                flower_date_summary[flower_date]['is_marked_completed'] = True
-            
-            harvest_date = harvest.get('harvest_date', '')
-            if harvest_date < flower_date_summary[flower_date]['first_harvest_date']:
-                flower_date_summary[flower_date]['first_harvest_date'] = harvest_date
-                flower_date_summary[flower_date]['days_to_first_harvest'] = harvest.get('days_to_harvest', 0)
-            if harvest_date > flower_date_summary[flower_date]['last_harvest_date']:
-                flower_date_summary[flower_date]['last_harvest_date'] = harvest_date
-        
-        summary_list = list(flower_date_summary.values())
-        summary_list = sorted(summary_list, key=lambda x: x['flower_date'], reverse=True)
+        summary_list = summarize_harvests_by_flower_date(user_harvests)
         
         summary_table_data = []
         for summary in summary_list:
@@ -1678,59 +4136,7 @@ def harvest_tracking_tab():
         # NEW SECTION: Daily Harvest Summary with Fruit Sizes as Main Columns
         st.subheader("📅 Daily Harvested Bakul with Fruit Size Breakdown")
         
-        # Group harvests by harvest date and calculate daily totals
-        daily_harvest_summary = {}
-        fruit_size_totals = {size: 0 for size in HARVEST_FRUIT_SIZES}
-        
-        for harvest in sorted_harvests:
-            harvest_date = harvest.get('harvest_date', 'Unknown')
-            flower_date = harvest.get('flower_date', 'Unknown')
-            
-            # Initialize daily summary if not exists
-            if harvest_date not in daily_harvest_summary:
-                daily_harvest_summary[harvest_date] = {
-                    'total_harvested_bakul': 0,
-                    'flower_dates': [],
-                    'harvest_sessions': [],
-                    'fruit_size_totals': {size: 0 for size in HARVEST_FRUIT_SIZES}
-                }
-            
-            # Get harvest amounts
-            equivalent_bakul = harvest.get('equivalent_bakul', 0)
-            if equivalent_bakul == 0:
-                equivalent_bakul = harvest.get('total_harvest_bakul', 0)
-            
-            # Add to daily totals
-            daily_harvest_summary[harvest_date]['total_harvested_bakul'] += equivalent_bakul
-            
-            # Track flower dates for this harvest date
-            if flower_date not in daily_harvest_summary[harvest_date]['flower_dates']:
-                daily_harvest_summary[harvest_date]['flower_dates'].append(flower_date)
-            
-            # Store harvest session details
-            daily_harvest_summary[harvest_date]['harvest_sessions'].append({
-                'flower_date': flower_date,
-                'equivalent_bakul': equivalent_bakul,
-                'harvest_details': harvest
-            })
-            
-            # Calculate fruit size breakdown for this harvest
-            bakul_distribution = harvest.get('harvest_bakul_distribution', {})
-            kg_distribution = harvest.get('harvest_kg_distribution', {})
-            
-            for size in HARVEST_FRUIT_SIZES:
-                bakul_count = bakul_distribution.get(size, 0)
-                kg_count = kg_distribution.get(size, 0) if kg_distribution else 0
-                total_size_bakul = bakul_count + (kg_count / 15)
-                
-                # Add to daily fruit size totals
-                daily_harvest_summary[harvest_date]['fruit_size_totals'][size] += total_size_bakul
-                
-                # Add to overall fruit size totals
-                fruit_size_totals[size] += total_size_bakul
-        
-        # Sort daily summaries by harvest date (newest first)
-        sorted_daily_summaries = sorted(daily_harvest_summary.items(), key=lambda x: x[0], reverse=True)
+        daily_harvest_summary, sorted_daily_summaries, fruit_size_totals = summarize_harvests_by_day(sorted_harvests)
         
         if sorted_daily_summaries:
             # Create main daily summary table with fruit sizes as columns
@@ -1905,9 +4311,13 @@ def harvest_tracking_tab():
         # Enhanced Detailed harvest records table
         st.subheader("📋 All Harvest Records (Detailed)")
         
+        # Rendered a page at a time; statistics over every harvest come from the summary document
+        paged_harvests = history_pager('harvest_history_pages', st.session_state.username, 'harvest_data', 'harvest_date')
+        harvest_summary = get_user_summary(st.session_state.username)
+        
         # Create detailed records table with more information
         detailed_table_data = []
-        for harvest in sorted_harvests:
+        for harvest in paged_harvests:
             flower_date = harvest.get('flower_date', 'Unknown')
             harvest_date = harvest.get('harvest_date', 'Unknown')
             days_to_harvest = harvest.get('days_to_harvest', 0)
@@ -1948,22 +4358,19 @@ def harvest_tracking_tab():
             
             # Add legend for status indicators
             st.caption("**Status Legend:** 🏁 = Marked Complete, ✏️ = Edited")
+            # Archived seasons are left out of the list but counted in the statistics below
+            archived_harvests = archived_count(st.session_state.username, 'harvest_data')
+            history_load_more('harvest_history_pages', harvest_summary.get('harvest_count', len(paged_harvests)) - archived_harvests)
+            if archived_harvests:
+                st.caption(f"🗄️ {format_number(archived_harvests)} harvests from archived seasons are included in the statistics; view them in Data Analysis.")
             
             # Quick statistics for all harvests
-            total_harvest_sessions = len(sorted_harvests)
+            total_harvest_sessions = harvest_summary.get('harvest_count', 0)
             if total_harvest_sessions > 1:
-                avg_days = sum(h.get('days_to_harvest', 0) for h in sorted_harvests) / total_harvest_sessions
-                avg_efficiency = sum(h.get('harvest_efficiency', 0) for h in sorted_harvests) / total_harvest_sessions
-                
-                # Calculate total harvested using equivalent bakul when available
-                total_bakul_harvested = 0
-                total_kg_harvested = 0
-                for h in sorted_harvests:
-                    if 'equivalent_bakul' in h:
-                        total_bakul_harvested += h.get('equivalent_bakul', 0)
-                    else:
-                        total_bakul_harvested += h.get('total_harvest_bakul', 0)
-                    total_kg_harvested += h.get('total_harvest_kg', 0)
+                avg_days = harvest_summary.get('harvest_days_total', 0) / total_harvest_sessions
+                avg_efficiency = harvest_summary.get('harvest_efficiency_total', 0) / total_harvest_sessions
+                # Summaries keep equivalent bakul (bakul + kg) per harvest
+                total_bakul_harvested = harvest_summary.get('harvested_bakul', 0)
                 
                 st.write("**📊 All Harvests Statistics:**")
                 stat_col1, stat_col2, stat_col3, stat_col4 = st.columns(4)
@@ -1982,10 +4389,10 @@ def harvest_tracking_tab():
         # Enhanced Detailed view with better organization
         st.subheader("🔍 Individual Harvest Details")
         
-        if sorted_harvests:
-            # Group harvests by flower date for better organization
+        if paged_harvests:
+            # Group the loaded harvests by flower date for better organization
             harvests_by_flower = {}
-            for harvest in sorted_harvests:
+            for harvest in paged_harvests:
                 flower_date = harvest.get('flower_date', 'Unknown')
                 if flower_date not in harvests_by_flower:
                     harvests_by_flower[flower_date] = []
@@ -2121,9 +4528,8 @@ def harvest_tracking_tab():
                 
                 with delete_col:
                     if st.button("🗑️ Delete Selected Harvest Record", type="secondary"):
-                        updated_harvests = [h for h in user_harvests if h.get('id') != selected_harvest.get('id')]
-                        
-                        if save_harvest_data(updated_harvests, st.session_state.username):
+                        if commit_harvest_changes(st.session_state.username, deleted_ids=[selected_harvest.get('id')],
+                                                  expected_revs={selected_harvest.get('id'): selected_harvest.get('rev', 0)}):
                             st.success("Harvest record deleted successfully!")
                             st.rerun()
                         else:
@@ -2257,15 +4663,8 @@ def harvest_tracking_tab():
                                 'edited_at': datetime.now().isoformat()
                             })
                             
-                            # Find and replace the harvest in the list
-                            updated_harvests = []
-                            for h in user_harvests:
-                                if h.get('id') == edit_harvest.get('id'):
-                                    updated_harvests.append(updated_harvest)
-                                else:
-                                    updated_harvests.append(h)
-                            
-                            if save_harvest_data(updated_harvests, st.session_state.username):
+                            # Later harvests of this batch get renumbered and re-totalled too
+                            if commit_harvest_changes(st.session_state.username, upserts=[updated_harvest]):
                                 st.success("✅ Harvest record updated successfully!")
                                 st.session_state['show_edit_form'] = False
                                 if 'editing_harvest' in st.session_state:
@@ -2274,343 +4673,1019 @@ def harvest_tracking_tab():
                             else:
                                 st.error("❌ Failed to update harvest record")
 
-def main_app():
-    st.title("🌷 Bunga di Kebun - Welcome, " + st.session_state.username + "!")
+def _read_import_file(state_key, uploaded, reader):
+    """Parse an uploaded file once per upload and keep (rows, errors) in session state"""
+    parsed = st.session_state.get(state_key)
+    if parsed and parsed['file_id'] == uploaded.file_id:
+        return parsed['rows'], parsed['errors']
+    
+    status = st.empty()
+    try:
+        rows, errors = reader(uploaded, uploaded.name, on_chunk=lambda count: status.caption("Read " + format_number(count) + " rows..."))
+    except Exception as e:
+        status.empty()
+        st.error("Error reading import file: " + str(e))
+        return None, None
+    status.empty()
+    
+    st.session_state[state_key] = {'file_id': uploaded.file_id, 'rows': rows, 'errors': errors}
+    return rows, errors
+
+def _import_progress(label):
+    bar = st.progress(0.0, text=label)
+    return lambda done, total: bar.progress(done / total if total else 1.0, text=label + " " + str(done) + "/" + str(total))
+
+def farm_import_section():
+    """Import historical daily bunga counts from a CSV or Parquet file"""
+    st.caption("One row per day: a date column plus one column per farm. Legacy headers ("
+               + ', '.join(OLD_FARM_COLUMNS) + ") and DD/MM/YYYY dates are recognised.")
+    uploaded = st.file_uploader("Flower data file", type=['csv', 'parquet'], key="farm_import_file")
+    if uploaded is None:
+        return
+    
+    rows, errors = _read_import_file('farm_import', uploaded, read_farm_import)
+    if rows is None:
+        return
+    
+    errors = errors + validate_farm_rows(rows)
+    for error in errors:
+        st.error("❌ " + error)
+    if errors:
+        return
+    
+    current_df = st.session_state.current_user_data
+    new_rows, conflicts, unchanged = plan_farm_import(current_df, rows)
+    st.info("📝 {} row(s): {} new day(s), {} conflicting, {} already stored".format(
+        format_number(len(rows)), format_number(len(new_rows)), len(conflicts), format_number(unchanged)
+    ))
+    
+    upserts = new_rows
+    if not conflicts.empty:
+        st.warning("⚠️ " + str(len(conflicts)) + " day(s) already have different counts")
+        report = conflicts[['Date']].assign(Date=conflicts['Date'].dt.strftime('%Y-%m-%d'))
+        for col in FARM_COLUMNS:
+            report[col + " (stored)"] = conflicts[col + " (stored)"]
+            report[col + " (imported)"] = conflicts[col]
+        st.dataframe(report, use_container_width=True, hide_index=True)
+        policy = st.radio("For these days", ["Keep stored counts", "Overwrite with imported counts"], key="farm_import_policy", horizontal=True)
+        if policy == "Overwrite with imported counts":
+            upserts = pd.concat([new_rows, conflicts[['Date'] + FARM_COLUMNS]], ignore_index=True)
+    
+    if upserts.empty:
+        st.success("✅ Nothing new to import")
+        return
+    
+    outlier_dates = flag_outliers(upserts, current_df)
+    if outlier_dates:
+        st.warning("⚠️ Unusually high counts (over {}x the usual day) on: {}".format(
+            BULK_OUTLIER_FACTOR, ', '.join(outlier_dates[:20]) + (" ..." if len(outlier_dates) > 20 else "")
+        ))
+    
+    if st.button("📥 Import " + format_number(len(upserts)) + " Day(s)", key="farm_import_save"):
+        updated_df = merge_farm_import(current_df, upserts)
+        if save_farm_changes(st.session_state.username, updated_df, upserts, [], progress=_import_progress("Saving days")):
+            st.session_state.current_user_data = updated_df
+            st.session_state.bulk_editor_version = st.session_state.get('bulk_editor_version', 0) + 1
+            st.success("Imported " + format_number(len(upserts)) + " day(s)")
+            st.rerun()
+
+def harvest_import_section():
+    """Import historical harvest records from a CSV or Parquet file"""
+    st.caption("One row per harvest: Flower Date, Harvest Date, bakul per size (" + ', '.join(HARVEST_FRUIT_SIZES)
+               + "), and optionally '<size> kg', Completed and Notes. Flower data must be imported first.")
+    uploaded = st.file_uploader("Harvest data file", type=['csv', 'parquet'], key="harvest_import_file")
+    if uploaded is None:
+        return
+    
+    rows, errors = _read_import_file('harvest_import', uploaded, read_harvest_import)
+    if rows is None:
+        return
+    
+    current_df = st.session_state.current_user_data
+    if current_df.empty:
+        st.warning("No flower data available. Import or add flower data first.")
+        return
+    
+    user_harvests = get_cached_harvest_data(st.session_state.username)
+    batches = flower_batch_frame(current_df, user_harvests)
+    errors = errors + validate_harvest_import(rows, batches)
+    for error in errors:
+        st.error("❌ " + error)
+    if errors:
+        return
+    
+    overwrite = st.session_state.get('harvest_import_policy') == "Overwrite stored harvests"
+    records, conflicts = build_import_harvest_records(rows, batches, user_harvests, overwrite)
+    skipped = len(rows) - len(records) - (0 if overwrite else len(conflicts))
+    st.info("📝 {} row(s): {} to import, {} conflicting, {} empty".format(
+        format_number(len(rows)), format_number(len(records)), len(conflicts), skipped
+    ))
+    
+    if conflicts:
+        st.warning("⚠️ " + str(len(conflicts)) + " harvest(s) already stored for the same flower and harvest date")
+        st.dataframe(pd.DataFrame(conflicts), use_container_width=True, hide_index=True)
+        st.radio("For these harvests", ["Keep stored harvests", "Overwrite stored harvests"], key="harvest_import_policy", horizontal=True)
+    
+    if not records:
+        st.success("✅ Nothing new to import")
+        return
+    
+    if st.button("📥 Import " + format_number(len(records)) + " Harvest(s)", key="harvest_import_save"):
+        # commit_harvest_changes renumbers and re-totals every affected flower batch
+        if commit_harvest_changes(st.session_state.username, upserts=records, progress=_import_progress("Saving harvests")):
+            st.success("Imported " + format_number(len(records)) + " harvest record(s)")
+            st.rerun()
+
+@traced
+def data_entry_tab():
+    st.header("Add New Data")
+    
+    if 'confirm_data' not in st.session_state:
+        st.session_state.confirm_data = False
+        st.session_state.data_to_confirm = None
+        
+    if st.session_state.confirm_data and st.session_state.data_to_confirm:
+        data = st.session_state.data_to_confirm
+        date = data['date']
+        farm_data = data['farm_data']
+        
+        total_bunga = sum(farm_data.values())
+        total_bakul = int(total_bunga / 40)
+        
+        if isinstance(date, str):
+            try:
+                date_obj = datetime.strptime(date, '%Y-%m-%d')
+            except:
+                date_obj = datetime.strptime(str(date), '%Y-%m-%d')
+        else:
+            date_obj = date
+        
+        day_name = date_obj.strftime('%A')
+        date_formatted = date_obj.strftime('%Y-%m-%d')
+        
+        st.warning("⚠️ Please Confirm Before Save")
+        
+        st.write(f"**Date:** {date_formatted} ({day_name})")
+        st.write(f"**Total Bunga:** {format_number(total_bunga)}")
+        st.write(f"**Total Bakul:** {format_number(total_bakul)}")
+        
+        st.write("**Farm Details:**")
+        for farm, value in farm_data.items():
+            st.write(f"• {farm}: {format_number(value)} bunga")
+        
+        button_col1, button_col2 = st.columns(2)
+        
+        with button_col1:
+            if st.button("✅ CONFIRM & SAVE", key="confirm_save"):
+                result, _ = add_data(
+                    date,
+                    farm_data[FARM_COLUMNS[0]],
+                    farm_data[FARM_COLUMNS[1]],
+                    farm_data[FARM_COLUMNS[2]],
+                    farm_data[FARM_COLUMNS[3]],
+                    confirmed=True
+                )
+                
+                if result == "success":
+                    st.success("Data for " + date_formatted + " added successfully!")
+                    st.session_state.confirm_data = False
+                    st.session_state.data_to_confirm = None
+                    st.rerun()
+        
+        with button_col2:
+            if st.button("❌ CANCEL", key="cancel_save"):
+                st.session_state.confirm_data = False
+                st.session_state.data_to_confirm = None
+                st.rerun()
+    
+    if not st.session_state.confirm_data:
+        with st.form("data_entry_form", clear_on_submit=False):
+            today = datetime.now().date()
+            date = st.date_input("Select Date", today)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                farm_1 = st.number_input("" + FARM_COLUMNS[0] + " (Bunga)", min_value=0, value=0, step=1)
+            
+            with col2:
+                farm_2 = st.number_input("" + FARM_COLUMNS[1] + " (Bunga)", min_value=0, value=0, step=1)
+                
+            with col3:
+                farm_3 = st.number_input("" + FARM_COLUMNS[2] + " (Bunga)", min_value=0, value=0, step=1)
+                
+            with col4:
+                farm_4 = st.number_input("" + FARM_COLUMNS[3] + " (Bunga)", min_value=0, value=0, step=1)
+            
+            submitted = st.form_submit_button("Review Data")
+            
+            if submitted:
+                result, data = add_data(date, farm_1, farm_2, farm_3, farm_4)
+                
+                if result == "confirm":
+                    st.session_state.confirm_data = True
+                    st.session_state.data_to_confirm = data
+                    st.rerun()
+    
+    st.header("Current Data")
+    
+    # NEW: Editable grid for back-filling or correcting many days at once
+    st.caption("Edit counts, add rows at the bottom or delete rows, then save. Only changed days are written.")
+    pending_sync_notice(st.session_state.username, 'farm_data', lambda date_key: date_key)
+    
+    if 'bulk_editor_version' not in st.session_state:
+        st.session_state.bulk_editor_version = 0
+    
+    current_df = st.session_state.current_user_data
+    editor_df = current_df[['Date'] + FARM_COLUMNS].copy() if not current_df.empty else pd.DataFrame(columns=['Date'] + FARM_COLUMNS)
+    editor_df['Date'] = pd.to_datetime(editor_df['Date']).dt.date
+    
+    column_config = {'Date': st.column_config.DateColumn("Date", format="YYYY-MM-DD", required=True)}
+    for col in FARM_COLUMNS:
+        column_config[col] = st.column_config.NumberColumn(col, min_value=0, step=1, format="%d")
+    
+    edited_df = st.data_editor(
+        editor_df,
+        key="bulk_editor_" + str(st.session_state.bulk_editor_version),
+        num_rows="dynamic",
+        column_config=column_config,
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    rows = prepare_farm_rows(edited_df)
+    errors = validate_farm_rows(rows)
+    upserts, deleted_dates = diff_farm_data(current_df, rows) if not errors else (rows.iloc[0:0], [])
+    
+    if errors or not upserts.empty or deleted_dates:
+        for error in errors:
+            st.error("❌ " + error)
+        
+        new_days = int((~upserts['Date'].isin(pd.to_datetime(current_df['Date']))).sum()) if not current_df.empty else len(upserts)
+        if not errors:
+            st.info("📝 {} new day(s), {} changed day(s), {} deleted day(s)".format(
+                new_days, len(upserts) - new_days, len(deleted_dates)
+            ))
+        
+        outlier_dates = flag_outliers(upserts, current_df)
+        outliers_confirmed = True
+        if outlier_dates:
+            st.warning("⚠️ Unusually high counts (over {}x the usual day) on: {}".format(
+                BULK_OUTLIER_FACTOR, ', '.join(outlier_dates)
+            ))
+            outliers_confirmed = st.checkbox("These counts are correct", key="bulk_outliers_confirmed")
+        
+        save_col, discard_col = st.columns(2)
+        with save_col:
+            if st.button("💾 Save Changes", key="bulk_save", disabled=bool(errors) or not outliers_confirmed):
+                updated_df = compact_farm_frame(rows.astype({col: 'int64' for col in FARM_COLUMNS}).sort_values(by='Date').reset_index(drop=True))
+                if save_farm_changes(st.session_state.username, updated_df, upserts, deleted_dates):
+                    st.session_state.current_user_data = updated_df
+                    st.session_state.bulk_editor_version += 1
+                    st.success("Saved " + str(len(upserts) + len(deleted_dates)) + " change(s)")
+                    st.rerun()
+        with discard_col:
+            if st.button("↩️ Discard Changes", key="bulk_discard"):
+                st.session_state.bulk_editor_version += 1
+                st.rerun()
+    
+    if not current_df.empty:
+        # FIXED: exports were built with to_csv() on every rerun; now only when a button is clicked
+        username = st.session_state.username
+        version = get_data_version(username)
+        export_buttons(
+            "Download Data",
+            username + "_bunga_data_export",
+            (username, version, 'flower_data'),
+            lambda: {'Flower Data': current_df}
+        )
+        if excel_engine():
+            export_buttons(
+                "Download Workbook",
+                username + "_bunga_workbook",
+                (username, version, 'workbook'),
+                lambda: {
+                    'Flower Data': current_df,
+                    'Harvests': records_frame(get_cached_harvest_data(username)),
+                    'Estimates': records_frame(get_cached_revenue_data(username))
+                },
+                formats=('xlsx',)
+            )
+        else:
+            st.caption("Install openpyxl to download a workbook with flower data, harvests and estimates.")
+    else:
+        st.info("No data available. Add data using the form above or the grid.")
+    
+    # NEW: Bulk import of historical spreadsheets
+    st.header("Import Historical Data")
+    with st.expander("📥 Flower data (CSV / Parquet)"):
+        farm_import_section()
+    with st.expander("📥 Harvest records (CSV / Parquet)"):
+        harvest_import_section()
+
+def lttb_indices(x, y, threshold):
+    """Indices kept by largest-triangle-three-buckets downsampling: the first and last point
+    plus, per bucket, the point forming the largest triangle with its neighbours"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
     
-    storage_color = "🟢" if "Firebase" in st.session_state.storage_mode else "🟡"
-    st.caption(storage_color + " Storage mode: " + st.session_state.storage_mode)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = (edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        
+        areas = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected])
+                       - (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    return indices
+
+def build_trend_figure(frame, columns, y_title, max_points=CHART_MAX_POINTS):
+    """WebGL line chart of frame's columns over its Date column, each trace reduced to at most
+    max_points with LTTB so multi-year ranges send a small payload to the browser"""
+    import plotly.graph_objects as go  # Deferred, see the note on optional dependencies
+    
+    frame = frame.sort_values('Date')
+    x = frame['Date'].to_numpy(dtype='datetime64[ns]')
+    x_numeric = x.astype(np.int64).astype(float)
+    
+    fig = go.Figure()
+    for col in columns:
+        y = frame[col].to_numpy(dtype=float)
+        keep = lttb_indices(x_numeric, y, max_points)
+        fig.add_trace(go.Scattergl(x=x[keep], y=y[keep], mode='lines', name=col))
+    
+    fig.update_layout(
+        yaxis_title=y_title,
+        hovermode='x unified',
+        legend=dict(orientation='h', yanchor='bottom', y=1.02),
+        margin=dict(l=10, r=10, t=30, b=10)
+    )
+    return fig
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def cached_trend_figure(cache_key, _frame, columns, y_title):
+    """build_trend_figure cached per cache_key (user, data version, chart, date range)"""
+    return build_trend_figure(_frame, list(columns), y_title)
+
+def harvest_size_frame(harvests):
+    """Harvested bakul per fruit size and harvest date; extra kg counted as bakul equivalents"""
+    data = {'Date': pd.to_datetime([h.get('harvest_date') for h in harvests], errors='coerce')}
+    for size in HARVEST_FRUIT_SIZES:
+        data[size] = [
+            h.get('harvest_bakul_distribution', {}).get(size, 0) + h.get('harvest_kg_distribution', {}).get(size, 0) / BAKUL_TO_KG
+            for h in harvests
+        ]
+    return pd.DataFrame(data).dropna(subset=['Date']).groupby('Date', as_index=False).sum()
+
+def production_charts(filtered_df, start_date, end_date, harvests=None):
+    """Daily production per farm and harvest per fruit size for the selected range.
+    harvests replaces the cached harvests when the range reaches archived seasons."""
+    username = st.session_state.username
+    # Loaded before reading the version, which a first load of harvests bumps
+    if harvests is None:
+        sizes_df = get_cached_derived(username, 'harvest_data', 'harvest_size_daily', harvest_size_frame)
+    else:
+        sizes_df = harvest_size_frame(harvests)
+    version = get_data_version(username)
+    
+    st.subheader("📈 Daily Production")
+    unit = st.radio("Show", ["Bakul", "Bunga"], horizontal=True, key="production_chart_unit")
+    
+    chart_df = filtered_df[['Date']].copy()
+    for col in FARM_COLUMNS:
+        chart_df[col] = filtered_df[col] / 40 if unit == "Bakul" else filtered_df[col]
+    chart_df['Total'] = chart_df[FARM_COLUMNS].sum(axis=1)
+    
+    fig = cached_trend_figure(
+        (username, version, 'production_' + unit, str(start_date), str(end_date)),
+        chart_df, tuple(FARM_COLUMNS + ['Total']), unit + " per day"
+    )
+    st.plotly_chart(fig, use_container_width=True)
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📝 Data Entry", "📊 Data Analysis", "💰 Revenue Estimate", "🥭 Harvest Tracking"])
+    in_range = sizes_df[(sizes_df['Date'].dt.date >= start_date) & (sizes_df['Date'].dt.date <= end_date)]
+    if not in_range.empty:
+        st.subheader("🥭 Harvest by Fruit Size")
+        fig = cached_trend_figure(
+            (username, version, 'harvest_sizes', str(start_date), str(end_date)),
+            in_range, tuple(HARVEST_FRUIT_SIZES), "Bakul harvested per day"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+@traced
+def data_analysis_tab():
+    st.header("Bunga Production Analysis")
     
-    with tab1:
-        st.header("Add New Data")
+    username = st.session_state.username
+    archived = archived_range(username, 'farm_data')
+    
+    if st.session_state.current_user_data.empty and not archived:
+        st.info("No data available for analysis. Please add data in the Data Entry tab.")
+    else:
+        analysis_df = st.session_state.current_user_data.copy()
         
-        if 'confirm_data' not in st.session_state:
-            st.session_state.confirm_data = False
-            st.session_state.data_to_confirm = None
-            
-        if st.session_state.confirm_data and st.session_state.data_to_confirm:
-            data = st.session_state.data_to_confirm
-            date = data['date']
-            farm_data = data['farm_data']
-            
-            total_bunga = sum(farm_data.values())
-            total_bakul = int(total_bunga / 40)
+        # Date filter section
+        st.subheader("📅 Date Filter")
+        col_filter1, col_filter2, col_filter3 = st.columns([1, 1, 1])
+        
+        # Get min and max dates from data; by default only the days after the archived seasons
+        if analysis_df.empty:
+            min_date = datetime.fromisoformat(archived[0]).date()
+            max_date = datetime.fromisoformat(archived[1]).date()
+        else:
+            min_date = pd.to_datetime(analysis_df['Date']).min().date()
+            max_date = pd.to_datetime(analysis_df['Date']).max().date()
+            if archived:
+                min_date = min(max(min_date, datetime.fromisoformat(archived[1]).date() + timedelta(days=1)), max_date)
             
-            if isinstance(date, str):
-                try:
-                    date_obj = datetime.strptime(date, '%Y-%m-%d')
-                except:
-                    date_obj = datetime.strptime(str(date), '%Y-%m-%d')
+        with col_filter1:
+            start_date = st.date_input(
+                "Start Date", 
+                value=min_date,
+                help="Select start date for filtering"
+            )
+        
+        with col_filter2:
+            end_date = st.date_input(
+                "End Date", 
+                value=max_date,
+                help="Select end date for filtering"
+            )
+        
+        with col_filter3:
+            st.write("")  # Empty space
+            if st.button("🔄 Reset Filter"):
+                start_date = min_date
+                end_date = max_date
+                st.rerun()
+        
+        # NEW: Ranges reaching before the current season read the archived seasons through
+        chart_harvests = None
+        if archived:
+            if start_date.isoformat() <= archived[1] and end_date.isoformat() >= archived[0]:
+                analysis_df = farm_data_with_archive(username, analysis_df, start_date, end_date)
+                chart_harvests = harvests_with_archive(username, start_date, end_date)
+                st.caption(f"🗄️ Including archived seasons ({archived[0]} to {archived[1]})")
             else:
-                date_obj = date
-            
-            day_name = date_obj.strftime('%A')
-            date_formatted = date_obj.strftime('%Y-%m-%d')
-            
-            st.warning("⚠️ Please Confirm Before Save")
-            
-            st.write(f"**Date:** {date_formatted} ({day_name})")
-            st.write(f"**Total Bunga:** {format_number(total_bunga)}")
-            st.write(f"**Total Bakul:** {format_number(total_bakul)}")
-            
-            st.write("**Farm Details:**")
-            for farm, value in farm_data.items():
-                st.write(f"• {farm}: {format_number(value)} bunga")
-            
-            button_col1, button_col2 = st.columns(2)
-            
-            with button_col1:
-                if st.button("✅ CONFIRM & SAVE", key="confirm_save"):
-                    result, _ = add_data(
-                        date,
-                        farm_data[FARM_COLUMNS[0]],
-                        farm_data[FARM_COLUMNS[1]],
-                        farm_data[FARM_COLUMNS[2]],
-                        farm_data[FARM_COLUMNS[3]],
-                        confirmed=True
-                    )
-                    
-                    if result == "success":
-                        st.success("Data for " + date_formatted + " added successfully!")
-                        st.session_state.confirm_data = False
-                        st.session_state.data_to_confirm = None
-                        st.rerun()
-            
-            with button_col2:
-                if st.button("❌ CANCEL", key="cancel_save"):
-                    st.session_state.confirm_data = False
-                    st.session_state.data_to_confirm = None
-                    st.rerun()
+                st.caption(f"🗄️ Seasons from {archived[0]} to {archived[1]} are archived; choose an earlier start date to include them.")
         
-        if not st.session_state.confirm_data:
-            with st.form("data_entry_form", clear_on_submit=False):
-                today = datetime.now().date()
-                date = st.date_input("Select Date", today)
-                
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    farm_1 = st.number_input("" + FARM_COLUMNS[0] + " (Bunga)", min_value=0, value=0, step=1)
-                
-                with col2:
-                    farm_2 = st.number_input("" + FARM_COLUMNS[1] + " (Bunga)", min_value=0, value=0, step=1)
-                    
-                with col3:
-                    farm_3 = st.number_input("" + FARM_COLUMNS[2] + " (Bunga)", min_value=0, value=0, step=1)
-                    
-                with col4:
-                    farm_4 = st.number_input("" + FARM_COLUMNS[3] + " (Bunga)", min_value=0, value=0, step=1)
-                
-                submitted = st.form_submit_button("Review Data")
-                
-                if submitted:
-                    result, data = add_data(date, farm_1, farm_2, farm_3, farm_4)
-                    
-                    if result == "confirm":
-                        st.session_state.confirm_data = True
-                        st.session_state.data_to_confirm = data
-                        st.rerun()
+        # Apply date filter
+        analysis_df['Date'] = pd.to_datetime(analysis_df['Date'])
+        filtered_df = analysis_df[
+            (analysis_df['Date'].dt.date >= start_date) & 
+            (analysis_df['Date'].dt.date <= end_date)
+        ].copy()
         
-        st.header("Current Data")
+        if filtered_df.empty:
+            st.warning(f"No data found between {start_date} and {end_date}. Please adjust your date range.")
+            return
         
-        if not st.session_state.current_user_data.empty:
-            display_df = st.session_state.current_user_data.copy()
-            display_df = display_df[['Date'] + FARM_COLUMNS]
+        # Calculate totals for filtered data
+        total_bunga = int(filtered_df[FARM_COLUMNS].sum().sum())
+        total_bakul = int(total_bunga / 40)
+        
+        # Show filter info if filtering is active
+        if start_date != min_date or end_date != max_date:
+            st.info(f"📊 Showing data from {start_date} to {end_date} ({len(filtered_df)} records)")
+        else:
+            st.info(f"📊 Showing all data ({len(filtered_df)} records)")
+        
+        # Total summary boxes
+        st.markdown(f"""
+        <div style="background-color: #ffeeee; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
+            <h1 style="color: #ff0000; font-weight: bold; font-size: 2.5em; text-align: center;">
+                Total Bunga: {format_number(total_bunga)}
+            </h1>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        st.markdown(f"""
+        <div style="background-color: #eeeeff; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
+            <h1 style="color: #0000ff; font-weight: bold; font-size: 2.5em; text-align: center;">
+                Total Bakul: {format_number(total_bakul)}
+            </h1>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # NEW: Downsampled WebGL charts, cached per data version and date range
+        production_charts(filtered_df, start_date, end_date, chart_harvests)
+        
+        st.markdown("---")
+        
+        # 1. BAKUL TABLE (First table)
+        st.subheader("🧺 Bakul Production Data")
+        
+        bakul_display_df = filtered_df.copy()
+        bakul_display_df['Date'] = bakul_display_df['Date'].dt.date
+        
+        # Calculate bakul for each farm (divide by 40)
+        bakul_display_df['Total Bakul'] = (bakul_display_df[FARM_COLUMNS].sum(axis=1) / 40).astype(int)
+        
+        # Calculate bakul for each farm
+        for col in FARM_COLUMNS:
+            bakul_col_name = col.replace('Kebun', 'Bakul')  # e.g., "A: Bakul Sendiri"
+            bakul_display_df[bakul_col_name] = (bakul_display_df[col] / 40).astype(int)
+        
+        # Reorder columns: Date, Total Bakul, then farm bakul columns
+        bakul_farm_columns = [col.replace('Kebun', 'Bakul') for col in FARM_COLUMNS]
+        bakul_columns_order = ['Date', 'Total Bakul'] + bakul_farm_columns
+        bakul_display_df = bakul_display_df[bakul_columns_order]
+        
+        # Format numbers for bakul table
+        for col in ['Total Bakul'] + bakul_farm_columns:
+            if col in bakul_display_df.columns:
+                bakul_display_df[col] = bakul_display_df[col].apply(format_number)
+        
+        # Sort by date (newest first)
+        bakul_display_df = bakul_display_df.sort_values('Date', ascending=False)
+        
+        st.dataframe(bakul_display_df, use_container_width=True, hide_index=True)
+        
+        st.markdown("---")
+        
+        # 2. BUNGA TABLE (Second table)
+        st.subheader("🌸 Bunga Production Data")
+        
+        bunga_display_df = filtered_df.copy()
+        bunga_display_df['Date'] = bunga_display_df['Date'].dt.date
+        bunga_display_df['Total Bunga'] = bunga_display_df[FARM_COLUMNS].sum(axis=1).astype(int)
+        
+        # Rename farm columns to be clearer about bunga
+        bunga_farm_columns = [col.replace('Kebun', 'Bunga') for col in FARM_COLUMNS]
+        for i, col in enumerate(FARM_COLUMNS):
+            bunga_display_df[bunga_farm_columns[i]] = bunga_display_df[col]
+        
+        # Reorder columns: Date, Total Bunga, then farm bunga columns
+        bunga_columns_order = ['Date', 'Total Bunga'] + bunga_farm_columns
+        bunga_display_df = bunga_display_df[bunga_columns_order]
+        
+        # Format numbers for bunga table
+        for col in ['Total Bunga'] + bunga_farm_columns:
+            if col in bunga_display_df.columns:
+                bunga_display_df[col] = bunga_display_df[col].apply(format_number)
+        
+        # Sort by date (newest first)
+        bunga_display_df = bunga_display_df.sort_values('Date', ascending=False)
+        
+        st.dataframe(bunga_display_df, use_container_width=True, hide_index=True)
+        
+        # Download filtered data
+        st.markdown("---")
+        st.subheader("📥 Download Data")
+        
+        date_suffix = f"_{start_date}_to_{end_date}" if (start_date != min_date or end_date != max_date) else "_all_data"
+        version = get_data_version(st.session_state.username)
+        
+        # Download bakul data
+        export_buttons(
+            "📊 Download Bakul Data",
+            f"{st.session_state.username}_bakul_data{date_suffix}",
+            (st.session_state.username, version, 'bakul', str(start_date), str(end_date)),
+            lambda: {'Bakul': bakul_display_df},
+            key="bakul_export"
+        )
+        
+        # Download bunga data
+        export_buttons(
+            "🌸 Download Bunga Data",
+            f"{st.session_state.username}_bunga_data{date_suffix}",
+            (st.session_state.username, version, 'bunga', str(start_date), str(end_date)),
+            lambda: {'Bunga': bunga_display_df},
+            key="bunga_export"
+        )
+        
+        # Summary statistics for filtered period
+        st.markdown("---")
+        st.subheader("📈 Summary Statistics")
+        
+        if len(filtered_df) > 1:
+            # Calculate daily averages
+            avg_bunga_per_day = filtered_df[FARM_COLUMNS].sum(axis=1).mean()
+            avg_bakul_per_day = avg_bunga_per_day / 40
             
-            if 'Date' in display_df.columns:
-                display_df['Date'] = pd.to_datetime(display_df['Date']).dt.date
+            # Calculate farm-wise totals and percentages
+            farm_totals = {}
+            farm_percentages = {}
             
             for col in FARM_COLUMNS:
-                if col in display_df.columns:
-                    display_df[col] = display_df[col].apply(format_number)
-            
-            display_df.index = display_df.index + 1
+                farm_total = filtered_df[col].sum()
+                farm_totals[col] = farm_total
+                farm_percentages[col] = (farm_total / total_bunga * 100) if total_bunga > 0 else 0
             
-            st.dataframe(display_df, use_container_width=True)
+            # Display statistics in columns
+            stats_col1, stats_col2 = st.columns(2)
             
-            csv = st.session_state.current_user_data.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="Download Data as CSV",
-                data=csv,
-                file_name=st.session_state.username + "_bunga_data_export.csv",
-                mime="text/csv"
-            )
-        else:
-            st.info("No data available. Add data using the form above.")
-        
-    with tab2:
-            st.header("Bunga Production Analysis")
-            
-            if st.session_state.current_user_data.empty:
-                st.info("No data available for analysis. Please add data in the Data Entry tab.")
-            else:
-                analysis_df = st.session_state.current_user_data.copy()
-                
-                # Date filter section
-                st.subheader("📅 Date Filter")
-                col_filter1, col_filter2, col_filter3 = st.columns([1, 1, 1])
-                
-                # Get min and max dates from data
-                min_date = pd.to_datetime(analysis_df['Date']).min().date()
-                max_date = pd.to_datetime(analysis_df['Date']).max().date()
-                    
-                with col_filter1:
-                    start_date = st.date_input(
-                        "Start Date", 
-                        value=min_date,
-                        help="Select start date for filtering"
-                    )
-                
-                with col_filter2:
-                    end_date = st.date_input(
-                        "End Date", 
-                        value=max_date,
-                        help="Select end date for filtering"
-                    )
-                
-                with col_filter3:
-                    st.write("")  # Empty space
-                    if st.button("🔄 Reset Filter"):
-                        start_date = min_date
-                        end_date = max_date
-                        st.rerun()
-                
-                # Apply date filter
-                analysis_df['Date'] = pd.to_datetime(analysis_df['Date'])
-                filtered_df = analysis_df[
-                    (analysis_df['Date'].dt.date >= start_date) & 
-                    (analysis_df['Date'].dt.date <= end_date)
-                ].copy()
-                
-                if filtered_df.empty:
-                    st.warning(f"No data found between {start_date} and {end_date}. Please adjust your date range.")
-                    return
+            with stats_col1:
+                st.write("**📊 Daily Averages:**")
+                st.write(f"• Average Bunga per Day: {format_number(int(avg_bunga_per_day))}")
+                st.write(f"• Average Bakul per Day: {format_number(int(avg_bakul_per_day))}")
+                st.write(f"• Total Days: {len(filtered_df)}")
                 
-                # Calculate totals for filtered data
-                total_bunga = int(filtered_df[FARM_COLUMNS].sum().sum())
-                total_bakul = int(total_bunga / 40)
+                # Best and worst days
+                daily_totals = filtered_df[FARM_COLUMNS].sum(axis=1)
+                best_day_total = daily_totals.max()
+                worst_day_total = daily_totals.min()
+                best_day_date = filtered_df.loc[daily_totals.idxmax(), 'Date'].strftime('%Y-%m-%d')
+                worst_day_date = filtered_df.loc[daily_totals.idxmin(), 'Date'].strftime('%Y-%m-%d')
                 
-                # Show filter info if filtering is active
-                if start_date != min_date or end_date != max_date:
-                    st.info(f"📊 Showing data from {start_date} to {end_date} ({len(filtered_df)} records)")
-                else:
-                    st.info(f"📊 Showing all data ({len(filtered_df)} records)")
-                
-                # Total summary boxes
-                st.markdown(f"""
-                <div style="background-color: #ffeeee; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
-                    <h1 style="color: #ff0000; font-weight: bold; font-size: 2.5em; text-align: center;">
-                        Total Bunga: {format_number(total_bunga)}
-                    </h1>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown(f"""
-                <div style="background-color: #eeeeff; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
-                    <h1 style="color: #0000ff; font-weight: bold; font-size: 2.5em; text-align: center;">
-                        Total Bakul: {format_number(total_bakul)}
-                    </h1>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # 1. BAKUL TABLE (First table)
-                st.subheader("🧺 Bakul Production Data")
-                
-                bakul_display_df = filtered_df.copy()
-                bakul_display_df['Date'] = bakul_display_df['Date'].dt.date
-                
-                # Calculate bakul for each farm (divide by 40)
-                bakul_display_df['Total Bakul'] = (bakul_display_df[FARM_COLUMNS].sum(axis=1) / 40).astype(int)
-                
-                # Calculate bakul for each farm
+                st.write(f"• Best Day: {format_number(int(best_day_total))} bunga ({best_day_date})")
+                st.write(f"• Lowest Day: {format_number(int(worst_day_total))} bunga ({worst_day_date})")
+            
+            with stats_col2:
+                st.write("**🚜 Farm Performance:**")
                 for col in FARM_COLUMNS:
-                    bakul_col_name = col.replace('Kebun', 'Bakul')  # e.g., "A: Bakul Sendiri"
-                    bakul_display_df[bakul_col_name] = (bakul_display_df[col] / 40).astype(int)
-                
-                # Reorder columns: Date, Total Bakul, then farm bakul columns
-                bakul_farm_columns = [col.replace('Kebun', 'Bakul') for col in FARM_COLUMNS]
-                bakul_columns_order = ['Date', 'Total Bakul'] + bakul_farm_columns
-                bakul_display_df = bakul_display_df[bakul_columns_order]
-                
-                # Format numbers for bakul table
-                for col in ['Total Bakul'] + bakul_farm_columns:
-                    if col in bakul_display_df.columns:
-                        bakul_display_df[col] = bakul_display_df[col].apply(format_number)
-                
-                # Sort by date (newest first)
-                bakul_display_df = bakul_display_df.sort_values('Date', ascending=False)
-                
-                st.dataframe(bakul_display_df, use_container_width=True, hide_index=True)
-                
-                st.markdown("---")
-                
-                # 2. BUNGA TABLE (Second table)
-                st.subheader("🌸 Bunga Production Data")
-                
-                bunga_display_df = filtered_df.copy()
-                bunga_display_df['Date'] = bunga_display_df['Date'].dt.date
-                bunga_display_df['Total Bunga'] = bunga_display_df[FARM_COLUMNS].sum(axis=1).astype(int)
-                
-                # Rename farm columns to be clearer about bunga
-                bunga_farm_columns = [col.replace('Kebun', 'Bunga') for col in FARM_COLUMNS]
-                for i, col in enumerate(FARM_COLUMNS):
-                    bunga_display_df[bunga_farm_columns[i]] = bunga_display_df[col]
-                
-                # Reorder columns: Date, Total Bunga, then farm bunga columns
-                bunga_columns_order = ['Date', 'Total Bunga'] + bunga_farm_columns
-                bunga_display_df = bunga_display_df[bunga_columns_order]
-                
-                # Format numbers for bunga table
-                for col in ['Total Bunga'] + bunga_farm_columns:
-                    if col in bunga_display_df.columns:
-                        bunga_display_df[col] = bunga_display_df[col].apply(format_number)
-                
-                # Sort by date (newest first)
-                bunga_display_df = bunga_display_df.sort_values('Date', ascending=False)
-                
-                st.dataframe(bunga_display_df, use_container_width=True, hide_index=True)
-                
-                # Download filtered data
-                st.markdown("---")
-                st.subheader("📥 Download Data")
-                
-                col_download1, col_download2 = st.columns(2)
-                
-                with col_download1:
-                    # Download bakul data
-                    bakul_csv = bakul_display_df.to_csv(index=False).encode('utf-8')
-                    date_suffix = f"_{start_date}_to_{end_date}" if (start_date != min_date or end_date != max_date) else "_all_data"
-                    st.download_button(
-                        label="📊 Download Bakul Data as CSV",
-                        data=bakul_csv,
-                        file_name=f"{st.session_state.username}_bakul_data{date_suffix}.csv",
-                        mime="text/csv"
-                    )
-                
-                with col_download2:
-                    # Download bunga data
-                    bunga_csv = bunga_display_df.to_csv(index=False).encode('utf-8')
-                    st.download_button(
-                        label="🌸 Download Bunga Data as CSV",
-                        data=bunga_csv,
-                        file_name=f"{st.session_state.username}_bunga_data{date_suffix}.csv",
-                        mime="text/csv"
-                    )
-                
-                # Summary statistics for filtered period
-                st.markdown("---")
-                st.subheader("📈 Summary Statistics")
-                
-                if len(filtered_df) > 1:
-                    # Calculate daily averages
-                    avg_bunga_per_day = filtered_df[FARM_COLUMNS].sum(axis=1).mean()
-                    avg_bakul_per_day = avg_bunga_per_day / 40
-                    
-                    # Calculate farm-wise totals and percentages
-                    farm_totals = {}
-                    farm_percentages = {}
-                    
-                    for col in FARM_COLUMNS:
-                        farm_total = filtered_df[col].sum()
-                        farm_totals[col] = farm_total
-                        farm_percentages[col] = (farm_total / total_bunga * 100) if total_bunga > 0 else 0
-                    
-                    # Display statistics in columns
-                    stats_col1, stats_col2 = st.columns(2)
-                    
-                    with stats_col1:
-                        st.write("**📊 Daily Averages:**")
-                        st.write(f"• Average Bunga per Day: {format_number(int(avg_bunga_per_day))}")
-                        st.write(f"• Average Bakul per Day: {format_number(int(avg_bakul_per_day))}")
-                        st.write(f"• Total Days: {len(filtered_df)}")
-                        
-                        # Best and worst days
-                        daily_totals = filtered_df[FARM_COLUMNS].sum(axis=1)
-                        best_day_total = daily_totals.max()
-                        worst_day_total = daily_totals.min()
-                        best_day_date = filtered_df.loc[daily_totals.idxmax(), 'Date'].strftime('%Y-%m-%d')
-                        worst_day_date = filtered_df.loc[daily_totals.idxmin(), 'Date'].strftime('%Y-%m-%d')
-                        
-                        st.write(f"• Best Day: {format_number(int(best_day_total))} bunga ({best_day_date})")
-                        st.write(f"• Lowest Day: {format_number(int(worst_day_total))} bunga ({worst_day_date})")
-                    
-                    with stats_col2:
-                        st.write("**🚜 Farm Performance:**")
-                        for col in FARM_COLUMNS:
-                            farm_name = col.split(': ')[1] if ': ' in col else col  # Extract farm name
-                            total = farm_totals[col]
-                            percentage = farm_percentages[col]
-                            bakul_count = int(total / 40)
-                            st.write(f"• {farm_name}: {format_number(int(total))} bunga ({percentage:.1f}%) = {format_number(bakul_count)} bakul")
-                
-                else:
-                    st.info("📊 Add more data entries to see detailed statistics and trends.")    
-    with tab3:
-        revenue_estimate_tab()
+                    farm_name = col.split(': ')[1] if ': ' in col else col  # Extract farm name
+                    total = farm_totals[col]
+                    percentage = farm_percentages[col]
+                    bakul_count = int(total / 40)
+                    st.write(f"• {farm_name}: {format_number(int(total))} bunga ({percentage:.1f}%) = {format_number(bakul_count)} bakul")
+        
+        else:
+            st.info("📊 Add more data entries to see detailed statistics and trends.")
+
+def list_usernames():
+    """Every registered user (plus users with only local data when Firestore is unavailable)"""
+    users = get_users_collection()
+    if users:
+        try:
+            return sorted({(doc.to_dict() or {}).get('username') or doc.id for doc in users.select(['username']).get()})
+        except Exception as e:
+            st.error("Error listing users: " + str(e))
+            return []
+    
+    store = get_local_store()
+    return sorted(set(store['users']) | set(store['farm_data']) | set(store['harvest_data']) | set(store['revenue_data']))
+
+def summary_rollup(username, summary):
+    """One user's admin row and monthly bunga, from their summary document"""
+    farm_totals = summary.get('farm_totals', {})
+    row = {
+        'User': username,
+        'Days Recorded': summary.get('farm_days', 0),
+        'First Day': summary.get('first_day'),
+        'Last Day': summary.get('last_day')
+    }
+    for col in FARM_COLUMNS:
+        row[col] = farm_totals.get(col, 0)
+    row['Total Bunga'] = summary.get('total_bunga', 0)
+    row['Harvests'] = summary.get('harvest_count', 0)
+    row['Harvested Bakul'] = round(summary.get('harvested_bakul', 0), 1)
+    row['Estimates'] = summary.get('estimate_count', 0)
+    row['Estimated Revenue'] = round(summary.get('estimated_revenue', 0), 2)
+    
+    monthly = pd.DataFrame(
+        [(pd.Timestamp(month + '-01'), username, bunga) for month, bunga in summary.get('monthly_bunga', {}).items()],
+        columns=['Month', 'User', 'Bunga']
+    )
+    return row, monthly
+
+@st.cache_data(ttl=ADMIN_ROLLUP_TTL_SECONDS, show_spinner=False)
+def build_admin_rollup(usernames):
+    """Rollups for all users from one query over their summary documents. Users without a
+    complete summary are backfilled concurrently from their full data, once.
+    Returns (users_df, monthly_df, seconds)."""
+    start = time.perf_counter()
+    summaries = load_all_summaries()
+    missing = [username for username in usernames
+               if any(marker not in summaries.get(username, {}) for marker in SUMMARY_MARKERS.values())]
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, min(ADMIN_MAX_WORKERS, len(missing)))) as pool:
+            backfilled = pool.map(lambda username: backfill_user_summary(username, summaries.get(username, {})), missing)
+            summaries.update(zip(missing, backfilled))
+    
+    results = [summary_rollup(username, summaries[username]) for username in usernames]
+    users_df = pd.DataFrame([row for row, _ in results])
+    monthly = [frame for _, frame in results if not frame.empty]
+    monthly_df = pd.concat(monthly, ignore_index=True) if monthly else pd.DataFrame(columns=['Month', 'User', 'Bunga'])
+    return users_df, monthly_df, time.perf_counter() - start
+
+@traced
+def admin_dashboard_tab():
+    st.header("🛡️ All Farms")
+    
+    usernames = tuple(list_usernames())
+    if not usernames:
+        st.info("No users found.")
+        return
+    
+    refresh_col, info_col = st.columns([1, 3])
+    with refresh_col:
+        if st.button("🔄 Refresh", key="admin_rollup_refresh"):
+            build_admin_rollup.clear()
+            for username in usernames:
+                get_shared_user_cache()['users'].pop(username, None)
+    
+    with st.spinner("Loading all users..."):
+        users_df, monthly_df, seconds = build_admin_rollup(usernames)
+    with info_col:
+        st.caption("{} user(s) aggregated in {:.2f}s, cached for {} minutes".format(
+            len(usernames), seconds, ADMIN_ROLLUP_TTL_SECONDS // 60
+        ))
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Users", len(users_df))
+    col2.metric("Total Bunga", format_number(users_df['Total Bunga'].sum()))
+    col3.metric("Harvested Bakul", format_number(users_df['Harvested Bakul'].sum()))
+    col4.metric("Estimated Revenue", format_currency(users_df['Estimated Revenue'].sum()))
+    
+    st.subheader("👥 Per User")
+    st.dataframe(users_df.sort_values('Total Bunga', ascending=False), use_container_width=True, hide_index=True)
+    
+    st.subheader("🌾 Bunga per Farm (All Users)")
+    st.dataframe(pd.DataFrame([{col: format_number(users_df[col].sum()) for col in FARM_COLUMNS}]), use_container_width=True, hide_index=True)
+    
+    if not monthly_df.empty:
+        st.subheader("📅 Monthly Bunga by User")
+        st.bar_chart(monthly_df.pivot_table(index='Month', columns='User', values='Bunga', aggfunc='sum'))
+
+def headline_totals(username):
+    """Header totals from the user's summary document instead of their full history"""
+    summary = get_user_summary(username)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Bunga", format_number(summary.get('total_bunga', 0)))
+    col2.metric("Total Bakul", format_number(int(summary.get('total_bunga', 0) / 40)))
+    col3.metric("Harvests", format_number(summary.get('harvest_count', 0)),
+                help=format_number(round(summary.get('harvested_bakul', 0), 1)) + " bakul harvested")
+    col4.metric("Estimated Revenue", format_currency(summary.get('estimated_revenue', 0)))
+
+def main_app():
+    live_sync = live_sync_enabled() and start_live_sync(st.session_state.username)
+    
+    # Pick up saves made by this user's other sessions from the shared cache
+    st.session_state.current_user_data = get_cached_farm_data(st.session_state.username)
+    
+    st.title("🌷 Bunga di Kebun - Welcome, " + st.session_state.username + "!")
+    
+    storage_color = "🟢" if "Firebase" in st.session_state.storage_mode else "🟡"
+    st.caption(storage_color + " Storage mode: " + st.session_state.storage_mode + (" · 🔄 Live sync" if live_sync else ""))
+    
+    headline_totals(st.session_state.username)
+    
+    # FIXED: st.tabs executed all four sections on every rerun; navigation runs only the
+    # selected one. Sections share user data through the get_cached_* functions.
+    pages = [
+        st.Page(data_entry_tab, title="Data Entry", icon="📝", url_path="data-entry", default=True),
+        st.Page(data_analysis_tab, title="Data Analysis", icon="📊", url_path="data-analysis"),
+        st.Page(revenue_estimate_tab, title="Revenue Estimate", icon="💰", url_path="revenue-estimate"),
+        st.Page(harvest_tracking_tab, title="Harvest Tracking", icon="🥭", url_path="harvest-tracking")
+    ]
+    if st.session_state.role == "admin":
+        pages.append(st.Page(admin_dashboard_tab, title="All Farms", icon="🛡️", url_path="all-farms"))
+    sections = st.navigation(pages, position="top")
+    sections.run()
     
-    with tab4:
-        harvest_tracking_tab()
+    if live_sync:
+        # After the page so this session's own saves are already counted as seen
+        live_sync_monitor(st.session_state.username)
+
+def schema_migration_sidebar():
+    """Admin-only controls for the one-shot farm_data schema migration"""
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🛠️ Schema Migration")
+
+    if "Firebase" in st.session_state.storage_mode:
+        current_version = load_schema_version()
+    else:
+        current_version = get_local_store()['farm_data_schema_version']
+
+    if current_version >= SCHEMA_VERSION:
+        st.sidebar.success(f"✅ Schema up to date (v{current_version})")
+        return
+
+    st.sidebar.warning(f"⚠️ Schema v{current_version} → v{SCHEMA_VERSION} pending")
+    for version, description, _ in SCHEMA_MIGRATIONS:
+        if version > current_version:
+            st.sidebar.caption(f"v{version}: {description}")
+
+    dry_run_col, migrate_col = st.sidebar.columns(2)
+    with dry_run_col:
+        if st.button("🔍 Dry Run", key="schema_dry_run"):
+            st.session_state.schema_migration_report = run_schema_migrations(dry_run=True)
+    with migrate_col:
+        if st.button("🚀 Migrate", key="schema_migrate"):
+            st.session_state.schema_migration_report = run_schema_migrations()
+
+    report = st.session_state.get('schema_migration_report')
+    if report:
+        mode_label = "Dry run" if report['dry_run'] else "Migration"
+        st.sidebar.info(
+            f"{mode_label}: {report['changed']} of {report['scanned']} documents "
+            f"{'would change' if report['dry_run'] else 'rewritten'} in {report['batches']} batch(es)"
+        )
+        if report['samples']:
+            st.sidebar.json(report['samples'], expanded=False)
+
+def season_archive_sidebar():
+    """Admin-only controls for moving closed seasons to the archive"""
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🗄️ Season Archive")
+    
+    after_months = archive_settings()
+    st.sidebar.caption(f"Closed flower days and harvest batches older than {after_months} months "
+                       f"(before {archive_cutoff(after_months)}) move to compressed season archives.")
+    
+    dry_run_col, archive_col = st.sidebar.columns(2)
+    with dry_run_col:
+        if st.button("🔍 Dry Run", key="archive_dry_run"):
+            st.session_state.season_archive_report = run_season_archival(dry_run=True)
+    with archive_col:
+        if st.button("🗄️ Archive", key="archive_run"):
+            st.session_state.season_archive_report = run_season_archival()
+            # Pages were drawn from the data before archival
+            st.rerun()
+    
+    report = st.session_state.get('season_archive_report')
+    if report:
+        mode_label = "Dry run" if report['dry_run'] else "Archived"
+        st.sidebar.info(
+            f"{mode_label}: {report['farm_data']} flower day(s) and {report['harvest_data']} harvest(s) "
+            f"from {report['users']} user(s) {'would move' if report['dry_run'] else 'moved'}"
+        )
+        for username, error in report['errors'].items():
+            st.sidebar.error(username + ": " + error)
+
+def profiler_sidebar():
+    """Admin-only breakdown of the last reruns recorded by perf_profiler"""
+    history = st.session_state.get('profiler_history', [])
+    
+    with st.sidebar.expander("⏱️ Performance Profiler", expanded=False):
+        if not history:
+            st.caption("No reruns recorded yet. Interact with the app to collect profiles.")
+            return
+        
+        rerun_rows = []
+        for profile in reversed(history):
+            totals = profile.op_totals()
+            rerun_rows.append({
+                'Rerun': profile.label,
+                'Total (ms)': round(profile.duration_ms or 0, 1),
+                'Reads': totals['read'],
+                'Writes': totals['write'],
+                'Deletes': totals['delete']
+            })
+        st.dataframe(pd.DataFrame(rerun_rows), use_container_width=True, hide_index=True)
+        
+        selected_index = st.selectbox(
+            "Rerun details",
+            range(len(history)),
+            format_func=lambda i: history[len(history) - 1 - i].label,
+            key="profiler_selected_rerun"
+        )
+        selected_profile = history[len(history) - 1 - selected_index]
+        
+        span_rows = [{
+            'Span': entry['name'],
+            'Calls': entry['calls'],
+            'Total (ms)': round(entry['total_ms'], 1)
+        } for entry in selected_profile.span_totals()]
+        if span_rows:
+            st.dataframe(pd.DataFrame(span_rows), use_container_width=True, hide_index=True)
+        
+        op_rows = [{
+            'Operation': kind,
+            'Collection': collection,
+            'Count': count
+        } for (kind, collection), count in sorted(selected_profile.ops.items())]
+        if op_rows:
+            st.dataframe(pd.DataFrame(op_rows), use_container_width=True, hide_index=True)
+        
+        st.download_button(
+            label="📥 Export Chrome Trace",
+            data=json.dumps(perf_profiler.chrome_trace(history)),
+            file_name="bunga_profile_trace.json",
+            mime="application/json",
+            key="profiler_trace_download"
+        )
+
+def cost_meter_sidebar():
+    """Admin-only Firestore usage, projected monthly cost and the functions driving it"""
+    _, pricing = cost_meter_settings()
+    
+    with st.sidebar.expander("💸 Firestore Cost Meter", expanded=False):
+        summary = cost_meter.cost_summary(cost_meter.load_usage(days=30), pricing=pricing)
+        
+        if not summary['daily']:
+            st.caption("No Firestore operations recorded yet.")
+            return
+        
+        st.metric(
+            "Projected Monthly Cost",
+            "${:,.2f}".format(summary['projected_monthly_billed']),
+            help="Average of recorded days × 30, after the daily free quota"
+        )
+        st.caption("Without free quota: ${:,.2f}/month".format(summary['projected_monthly_gross']))
+        
+        st.write("**Daily Operations:**")
+        daily_df = pd.DataFrame(summary['daily']).sort_values('date', ascending=False)
+        daily_df['billed_cost'] = daily_df['billed_cost'].map("${:,.4f}".format)
+        st.dataframe(
+            daily_df[['date', 'reads', 'writes', 'deletes', 'billed_cost']],
+            use_container_width=True, hide_index=True
+        )
+        
+        st.write("**Cost by Function:**")
+        function_rows = [{
+            'Function': ("⚠️ " if entry['dominant'] else "") + entry['function'],
+            'Reads': entry['reads'],
+            'Writes': entry['writes'],
+            'Deletes': entry['deletes'],
+            'Share': format_percentage(entry['share'] * 100)
+        } for entry in summary['functions']]
+        st.dataframe(pd.DataFrame(function_rows), use_container_width=True, hide_index=True)
+        
+        dominant = [entry['function'] for entry in summary['functions'] if entry['dominant']]
+        if dominant:
+            st.warning("⚠️ Dominant cost: " + ', '.join(dominant))
+        
+        st.write("**Cost by User:**")
+        for user, cost in summary['users']:
+            st.write(f"• {user}: ${cost:,.4f}")
+        
+        st.write("**Cost by Collection:**")
+        for collection, cost in summary['collections']:
+            st.write(f"• {collection}: ${cost:,.4f}")
+
+def email_report_sidebar():
+    """Admin-only status of the scheduled email reports"""
+    with st.sidebar.expander("📧 Email Reports", expanded=False):
+        scheduler = get_report_scheduler()
+        if scheduler is None:
+            st.caption("Not enabled. Add an [email_reports] section to the secrets (see email_reports.py).")
+            return
+        
+        status = scheduler.status()
+        settings = scheduler.settings
+        st.write("**Schedule:** " + settings['schedule'] + " at " + settings['send_time'] + " to " + str(len(settings['recipients'])) + " recipient(s)")
+        if status['next_run']:
+            st.caption("Next run: " + status['next_run'].strftime('%Y-%m-%d %H:%M'))
+        if status['running']:
+            st.info("Sending reports...")
+        elif status['last_run']:
+            st.caption("Last run: " + status['last_run'].strftime('%Y-%m-%d %H:%M') + ", sent to " + str(len(status['sent'])))
+        for name, error in status['errors'].items():
+            st.error(name + ": " + error)
+        
+        if st.button("📤 Send Reports Now", key="email_reports_send_now", disabled=status['running']):
+            scheduler.run_now()
+            st.success("Reports are being sent in the background")
+
+SYNC_ICONS = {write_journal.PENDING: '⏳ Pending', write_journal.CONFLICT: '⚠️ Conflict'}
+
+def pending_sync_notice(username, key, describe):
+    """Caption naming the user's records of one dataset that have not reached Firestore yet.
+    Returns record key -> journal status ({} without write-behind)."""
+    write_behind = get_write_behind()
+    if not write_behind:
+        return {}
+    
+    status = write_behind.journal.record_status(username, key)
+    for journal_status, message in ((write_journal.PENDING, "⏳ Waiting to sync: "), (write_journal.CONFLICT, "⚠️ Not saved, changed on another device: ")):
+        labels = [describe(record_key) for record_key, value in status.items() if value == journal_status]
+        if labels:
+            more = " and {} more".format(len(labels) - 10) if len(labels) > 10 else ""
+            st.caption(message + ", ".join(labels[:10]) + more)
+    return status
+
+def sync_status_sidebar():
+    """Write-behind sync state for the signed-in user"""
+    write_behind = get_write_behind()
+    if not write_behind:
+        return
+    
+    username = st.session_state.username
+    summary = write_behind.journal.summary(username)
+    status = write_behind.status()
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("☁️ Sync")
+    
+    if summary[write_journal.PENDING]:
+        st.sidebar.warning("⏳ {} save(s) waiting to sync (oldest {}s ago)".format(
+            summary[write_journal.PENDING], int(time.time() - summary['oldest'])
+        ))
+        if status['retry_at']:
+            st.sidebar.caption("Connection problem, retrying in {}s: {}".format(
+                max(0, int(status['retry_at'] - time.time())), summary['last_error']
+            ))
+        if st.sidebar.button("🔄 Retry Now", key="write_behind_retry"):
+            write_behind.notify()
+    else:
+        st.sidebar.success("✅ All changes synced")
+    
+    if summary[write_journal.CONFLICT]:
+        st.sidebar.error("⚠️ {} save(s) were not applied because the records changed on another device. The latest data is shown.".format(
+            summary[write_journal.CONFLICT]
+        ))
+        if st.sidebar.button("Dismiss", key="write_behind_dismiss"):
+            write_behind.journal.dismiss(username)
+            st.rerun()
 
 def sidebar_options():
     st.sidebar.header("User: " + st.session_state.username)
@@ -2627,6 +5702,18 @@ def sidebar_options():
     st.sidebar.subheader("Storage Information")
     storage_color = "🟢" if "Firebase" in st.session_state.storage_mode else "🟡"
     st.sidebar.info(storage_color + " Data Storage Mode: " + st.session_state.storage_mode)
+    
+    memory = session_memory_report(st.session_state.username)
+    st.sidebar.caption("💾 Memory: {:.2f} MB this session, {:.2f} MB shared with your other sessions".format(
+        memory['session_bytes'] / 1024 / 1024, memory['shared_bytes'] / 1024 / 1024
+    ))
+    sync_status_sidebar()
+
+    if st.session_state.role == "admin":
+        schema_migration_sidebar()
+        season_archive_sidebar()
+        cost_meter_sidebar()
+        email_report_sidebar()
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("🌷 Bunga di Kebun - v2.0 with Harvest Tracking")
@@ -2656,21 +5743,57 @@ def check_storage_mode():
             except:
                 pass
             
-            st.session_state.storage_mode = "Firebase Database"
-            return
+            return "Firebase Database"
         except Exception as e:
             st.error("Firebase connection test failed: " + str(e))
     
-    st.session_state.storage_mode = "Session State"
+    return "Session State"
 
-# Initialize the app
-initialize_app()
-
-if st.session_state.storage_mode == "Checking...":
-    check_storage_mode()
+@st.cache_resource(show_spinner=False)
+def bootstrap_app():
+    """Seed the admin account and detect the storage mode once per server process.
+    Widget reruns read this cached result instead of re-probing Firestore (the caller
+    clears it when the probe fell back to session state)."""
+    initialize_app()
+    get_report_scheduler()
+    # Sends saves journaled before a restart
+    get_write_behind()
+    return {
+        'storage_mode': check_storage_mode(),
+        'initialized_at': datetime.now().isoformat()
+    }
 
-if not st.session_state.logged_in:
-    login_page()
-else:
-    main_app()
-    sidebar_options()
+# Streamlit runs this script as __main__; importing it (benchmarks, tooling) skips the UI
+if __name__ == "__main__":
+    cost_meter.set_current_user(st.session_state.username)
+    
+    profiling = profiling_enabled()
+    if profiling:
+        st.session_state.profiler_rerun_count = st.session_state.get('profiler_rerun_count', 0) + 1
+        perf_profiler.start_rerun(
+            "#{} {}".format(st.session_state.profiler_rerun_count, datetime.now().strftime('%H:%M:%S'))
+        )
+    
+    try:
+        # Initialize the app (once per process, cached across reruns and sessions)
+        app_state = bootstrap_app()
+        if app_state['storage_mode'] != "Firebase Database" and storage_backend() != 'local':
+            # Firestore was unreachable; probe again next rerun instead of for the process lifetime
+            bootstrap_app.clear()
+        
+        # Follows the latest probe, so sessions notice when Firestore comes back
+        st.session_state.storage_mode = app_state['storage_mode']
+        
+        if not st.session_state.logged_in:
+            login_page()
+        else:
+            main_app()
+            sidebar_options()
+    finally:
+        if profiling:
+            finished_profile = perf_profiler.end_rerun()
+            history = st.session_state.get('profiler_history', [])
+            st.session_state.profiler_history = (history + [finished_profile])[-PROFILER_HISTORY_SIZE:]
+    
+    if profiling and st.session_state.logged_in and st.session_state.role == "admin":
+        profiler_sidebar()
@@ -0,0 +1,50 @@
+"""Shared fixtures for the Bunga di Kebun tests.
+
+The app module is imported against the in-memory fake Firestore (fake_firestore.py)
+with write-behind and the disk cache off; tests that need either turn it on for
+themselves.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ['BUNGA_STORAGE_BACKEND'] = 'fake'
+os.environ['BUNGA_WRITE_BEHIND'] = '0'
+os.environ['BUNGA_DISK_CACHE'] = '0'
+for name in ('BUNGA_FAKE_LATENCY_MS', 'BUNGA_FAKE_JITTER_MS', 'BUNGA_FAKE_FAILURE_RATE'):
+    os.environ.pop(name, None)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import streamlit.logger
+from streamlit import config as streamlit_config
+
+# st.* calls outside a script run log a warning each; see benchmarks/run_benchmarks.py
+streamlit_config.get_config_options()
+streamlit.logger.set_log_level('error')
+
+import cost_meter
+import streamlit_firebase_tracker as app
+
+# Keep metered operations out of the working tree
+cost_meter.configure(usage_dir=tempfile.mkdtemp(prefix='bunga_usage_'))
+
+USERNAME = 'test_user'
+
+
+@pytest.fixture
+def fake():
+    """The app's fake Firestore client, emptied, with no simulated latency or failures"""
+    client = app.get_fake_firestore_client()
+    client.clear()
+    client.configure(latency_ms=0, jitter_ms=0, failure_rate=0)
+    client.reset_stats()
+    app.get_shared_user_cache()['users'].clear()
+    app.get_disk_cache.clear()
+    yield client
+    client.clear()
+    app.get_shared_user_cache()['users'].clear()
+    app.get_disk_cache.clear()
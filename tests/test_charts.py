@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamlit_firebase_tracker as app
+
+
+def test_lttb_keeps_every_point_below_the_threshold():
+    x = np.arange(10, dtype=float)
+    assert list(app.lttb_indices(x, x, 10)) == list(range(10))
+    assert list(app.lttb_indices(x, x, 50)) == list(range(10))
+    assert list(app.lttb_indices(x, x, 2)) == list(range(10))
+
+
+def test_lttb_returns_threshold_sorted_indices_with_both_ends():
+    rng = np.random.default_rng(1)
+    x = np.arange(5000, dtype=float)
+    y = rng.normal(size=5000).cumsum()
+
+    keep = app.lttb_indices(x, y, 300)
+
+    assert len(keep) == 300
+    assert keep[0] == 0 and keep[-1] == 4999
+    assert (np.diff(keep) > 0).all()
+
+
+def test_lttb_keeps_isolated_peaks():
+    x = np.arange(3650, dtype=float)
+    y = np.zeros(3650)
+    peaks = [400, 1800, 3100]
+    y[peaks] = [500, 800, 650]
+
+    keep = app.lttb_indices(x, y, 100)
+
+    assert set(peaks) <= set(keep)
+
+
+def test_trend_figure_sends_at_most_max_points_per_trace():
+    pytest.importorskip('plotly')
+    frame = pd.DataFrame({
+        'Date': pd.date_range('2015-01-01', periods=3650, freq='D'),
+        'Bunga': np.arange(3650),
+        'Bakul': np.arange(3650) // 40
+    }).sample(frac=1, random_state=1)
+
+    figure = app.build_trend_figure(frame, ['Bunga', 'Bakul'], "Count", max_points=200)
+
+    assert [len(trace.x) for trace in figure.data] == [200, 200]
+    assert pd.Series(figure.data[0].x).is_monotonic_increasing
+    assert figure.data[0].y[-1] == 3649
@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import streamlit_firebase_tracker as app
+from conftest import USERNAME
+
+pytest.importorskip('pyarrow')
+
+import disk_cache
+
+
+@pytest.fixture
+def cached(fake, tmp_path, monkeypatch):
+    """The fake client with the disk cache on, seeded with two estimates"""
+    monkeypatch.setenv('BUNGA_DISK_CACHE', '1')
+    monkeypatch.setenv('BUNGA_DISK_CACHE_DIR', str(tmp_path))
+    app.get_disk_cache.clear()
+    estimates = app.get_revenue_data_collection()
+    for record_id in ('e1', 'e2'):
+        estimates.document(record_id).set(app.stamp_record({'id': record_id, 'username': USERNAME, 'total_revenue': 1.0}))
+    return fake
+
+
+def fetch(fake):
+    """fetch_user_documents for the seeded estimates, and the round trips it took by kind"""
+    before = dict(fake.calls)
+    documents = app.fetch_user_documents(USERNAME, 'revenue_data', app.get_revenue_data_collection())
+    return documents, {kind: count - before.get(kind, 0) for kind, count in fake.calls.items() if count != before.get(kind, 0)}
+
+
+def test_disk_cache_round_trips_documents(tmp_path):
+    cache = disk_cache.DiskCache(str(tmp_path))
+    documents = {
+        'a': {'id': 'a', 'total': 1.5, 'sizes': {'>600g': 2}, 'buyers': ['Green'], 'notes': None},
+        'b': {'id': 'b', 'total': 2, 'mixed': 'text'},
+        'c': {}
+    }
+    high_water = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    counted_at = datetime(2024, 1, 3, tzinfo=timezone.utc)
+    cache.write('a/../user', 'revenue_data', documents, high_water, counted_at)
+
+    read, read_high_water, read_counted_at = cache.read('a/../user', 'revenue_data')
+    assert read == {'a': {'id': 'a', 'total': 1.5, 'sizes': {'>600g': 2}, 'buyers': ['Green']},
+                    'b': {'id': 'b', 'total': 2, 'mixed': 'text'}, 'c': {}}
+    assert (read_high_water, read_counted_at) == (high_water, counted_at)
+    assert cache.read('someone_else', 'revenue_data') == (None, None, None)
+
+
+def test_warm_load_fetches_only_changes_and_tombstones(cached):
+    documents, calls = fetch(cached)
+    assert sorted(documents) == ['e1', 'e2']
+    assert calls == {'query': 1}
+
+    estimates = app.get_revenue_data_collection()
+    estimates.document('e3').set(app.stamp_record({'id': 'e3', 'username': USERNAME, 'total_revenue': 3.0}))
+    estimates.document('e1').set(app.stamp_record({'id': 'e1', 'username': USERNAME, 'total_revenue': 9.0}))
+    app.delete_record(None, estimates.document('e2'), 'revenue_data', USERNAME)
+
+    documents, calls = fetch(cached)
+    assert {doc_id: data['total_revenue'] for doc_id, data in documents.items()} == {'e1': 9.0, 'e3': 3.0}
+    # The changed documents and the tombstones; the count is not due yet
+    assert calls == {'query': 2}
+
+
+def test_count_notices_deletes_without_a_tombstone(cached, monkeypatch):
+    fetch(cached)
+    app.get_revenue_data_collection().document('e2').delete()
+
+    documents, _ = fetch(cached)
+    assert sorted(documents) == ['e1', 'e2']
+
+    monkeypatch.setattr(app, 'DISK_CACHE_COUNT_SECONDS', 0)
+    documents, calls = fetch(cached)
+    assert sorted(documents) == ['e1']
+    assert calls == {'query': 3, 'aggregate': 1}
+
+
+def test_cache_older_than_the_tombstones_is_loaded_in_full(cached, monkeypatch):
+    fetch(cached)
+    monkeypatch.setattr(app, 'TOMBSTONE_TTL_DAYS', 0)
+    documents, calls = fetch(cached)
+    assert sorted(documents) == ['e1', 'e2']
+    assert calls == {'query': 1}
+
+
+def test_tombstones_are_written_only_with_the_disk_cache(cached, monkeypatch):
+    estimates = app.get_revenue_data_collection()
+    app.delete_record(None, estimates.document('e1'), 'revenue_data', USERNAME)
+    assert [doc.get('document_id') for doc in app.get_deleted_records_collection().get()] == ['e1']
+
+    monkeypatch.setenv('BUNGA_DISK_CACHE', '0')
+    app.get_disk_cache.clear()
+    app.delete_record(None, estimates.document('e2'), 'revenue_data', USERNAME)
+    assert [doc.get('document_id') for doc in app.get_deleted_records_collection().get()] == ['e1']
+    assert estimates.get() == []
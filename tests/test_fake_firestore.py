@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+import fake_firestore
+from fake_firestore import SERVER_TIMESTAMP, FakeAborted, FakeClient, FakeUnavailable
+
+
+def seeded_client():
+    client = FakeClient(seed=1)
+    client.load_documents('harvest_data', [
+        {'username': 'alice', 'id': 'h1', 'flower_date': '2024-01-02', 'rev': 1},
+        {'username': 'alice', 'id': 'h2', 'flower_date': '2024-01-01', 'rev': 1},
+        {'username': 'alice', 'id': 'h3', 'flower_date': '2024-01-03', 'rev': 1},
+        {'username': 'bob', 'id': 'h4', 'flower_date': '2024-01-01', 'rev': 1}
+    ])
+    return client
+
+
+def test_queries_filter_order_and_page():
+    harvests = seeded_client().collection('harvest_data')
+    alice = harvests.where('username', '==', 'alice').order_by('flower_date')
+
+    assert [doc.get('id') for doc in alice.get()] == ['h2', 'h1', 'h3']
+    first = alice.limit(2).get()
+    assert [doc.get('id') for doc in alice.start_after(first[-1]).get()] == ['h3']
+    assert [doc.get('id') for doc in harvests.where('id', 'in', ['h1', 'h4']).order_by('id').get()] == ['h1', 'h4']
+    assert alice.count().get()[0][0].value == 3
+
+
+def test_round_trips_are_counted_per_call():
+    client = seeded_client()
+    harvests = client.collection('harvest_data')
+    harvests.where('username', '==', 'alice').get()
+    batch = client.batch()
+    batch.set(harvests.document('new'), {'username': 'alice'})
+    batch.delete(harvests.document('missing'))
+    batch.commit()
+
+    assert client.round_trips == 2
+    assert client.calls == {'query': 1, 'commit': 1}
+
+
+def test_failure_injection_raises_unavailable():
+    client = seeded_client()
+    client.configure(failure_rate=1.0)
+    with pytest.raises(FakeUnavailable):
+        client.collection('harvest_data').get()
+    client.configure(failure_rate=0)
+    assert len(client.collection('harvest_data').get()) == 4
+
+
+def test_server_timestamp_is_replaced_with_the_commit_time():
+    client = FakeClient()
+    _, reference = client.collection('farm_data').add({'Date': '2024-01-01', 'updated_at': SERVER_TIMESTAMP})
+    snapshot = reference.get()
+    assert snapshot.get('updated_at') == snapshot.update_time
+
+
+def test_transaction_aborts_when_a_read_document_changes():
+    client = seeded_client()
+    harvests = client.collection('harvest_data')
+    reference = harvests.where('id', '==', 'h1').get()[0].reference
+    transaction = client.transaction(max_attempts=1)
+
+    snapshot = next(transaction.get_all([reference]))
+    reference.set(dict(snapshot.to_dict(), rev=2))
+    transaction.set(reference, dict(snapshot.to_dict(), rev=snapshot.get('rev') + 1))
+    with pytest.raises(FakeAborted):
+        transaction.commit()
+    assert reference.get().get('rev') == 2
+
+
+def test_transactional_retries_from_a_fresh_read():
+    client = seeded_client()
+    reference = client.collection('harvest_data').where('id', '==', 'h1').get()[0].reference
+    attempts = []
+
+    @fake_firestore.transactional
+    def bump(transaction):
+        snapshot = next(transaction.get_all([reference]))
+        if not attempts:
+            # Another device saves between this attempt's read and its commit
+            reference.set(dict(snapshot.to_dict(), rev=5))
+        attempts.append(snapshot.get('rev'))
+        transaction.set(reference, dict(snapshot.to_dict(), rev=snapshot.get('rev') + 1))
+
+    bump(client.transaction())
+    assert attempts == [1, 5]
+    assert reference.get().get('rev') == 6
+
+
+def test_snapshot_listener_sees_changes():
+    client = seeded_client()
+    seen = []
+    watch = client.collection('harvest_data').where('username', '==', 'bob').on_snapshot(
+        lambda snapshots, changes, read_time: seen.append(sorted(doc.get('id') for doc in snapshots)))
+    client.collection('harvest_data').add({'username': 'bob', 'id': 'h5'})
+    for _ in range(200):
+        if seen and seen[-1] == ['h4', 'h5']:
+            break
+        time.sleep(0.01)
+    watch.unsubscribe()
+    assert seen[0] == ['h4']
+    assert seen[-1] == ['h4', 'h5']
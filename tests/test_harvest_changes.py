@@ -0,0 +1,116 @@
+import pytest
+
+import streamlit_firebase_tracker as app
+from conftest import USERNAME
+
+
+def harvest(record_id, flower_date, harvest_date, bakul, rev=1):
+    return {
+        'id': record_id,
+        'username': USERNAME,
+        'flower_date': flower_date,
+        'harvest_date': harvest_date,
+        'created_at': harvest_date + 'T08:00:00',
+        'equivalent_bakul': bakul,
+        'flower_total_bakul': 10,
+        'rev': rev
+    }
+
+
+def derived(records):
+    """{id: (harvest_number, cumulative_harvested, remaining_after_harvest)}"""
+    return {r['id']: (r['harvest_number'], r['cumulative_harvested'], r['remaining_after_harvest']) for r in records}
+
+
+def stored_batches(*records):
+    """records as saved once, with their derived fields filled in"""
+    updated, _ = app.derive_harvest_changes([], [dict(r, rev=r['rev'] - 1) for r in records], set(), {}, set())
+    return updated
+
+
+def test_apply_record_changes_replaces_appends_and_deletes():
+    current = [harvest('a', '2024-01-01', '2024-01-28', 2), harvest('b', '2024-01-01', '2024-01-29', 3)]
+    edited = dict(current[0], equivalent_bakul=4)
+    added = harvest('c', '2024-01-01', '2024-01-30', 1, rev=0)
+
+    updated = app.apply_record_changes(current, [edited, added], {'b'}, {}, {'a'})
+
+    assert [(r['id'], r['rev']) for r in updated] == [('a', 2), ('c', 1)]
+    assert updated[0]['equivalent_bakul'] == 4
+    assert current[0]['equivalent_bakul'] == 2
+
+
+def test_apply_record_changes_rejects_a_stale_rev():
+    current = [harvest('a', '2024-01-01', '2024-01-28', 2, rev=3)]
+    with pytest.raises(app.ConcurrentEditError) as error:
+        app.apply_record_changes(current, [harvest('a', '2024-01-01', '2024-01-28', 5, rev=2)], set(), {}, {'a'})
+    assert error.value.record_ids == ['a']
+
+
+def test_apply_record_changes_rejects_editing_a_record_deleted_elsewhere():
+    with pytest.raises(app.ConcurrentEditError):
+        app.apply_record_changes([], [harvest('a', '2024-01-01', '2024-01-28', 2)], set(), {}, {'a'})
+
+
+def test_apply_record_changes_guards_deletes_with_expected_revs():
+    current = [harvest('a', '2024-01-01', '2024-01-28', 2, rev=2)]
+    with pytest.raises(app.ConcurrentEditError):
+        app.apply_record_changes(current, [], {'a'}, {'a': 1}, set())
+    # Without an expected rev (an older client) the delete goes through
+    assert app.apply_record_changes(current, [], {'a'}, {}, set()) == []
+
+
+def test_derive_harvest_changes_renumbers_after_an_earlier_harvest():
+    current = stored_batches(harvest('a', '2024-01-01', '2024-01-28', 4), harvest('b', '2024-01-01', '2024-01-30', 3))
+    earlier = harvest('c', '2024-01-01', '2024-01-27', 2, rev=0)
+
+    updated, written = app.derive_harvest_changes(current, [earlier], set(), {}, set())
+
+    assert derived(updated) == {'c': (1, 2.0, 8.0), 'a': (2, 6.0, 4.0), 'b': (3, 9.0, 1.0)}
+    assert sorted(r['id'] for r in written) == ['a', 'b', 'c']
+
+
+def test_derive_harvest_changes_renumbers_the_batch_a_record_left():
+    current = stored_batches(
+        harvest('a', '2024-01-01', '2024-01-28', 4),
+        harvest('b', '2024-01-01', '2024-01-29', 3),
+        harvest('c', '2024-01-01', '2024-01-30', 2),
+        harvest('d', '2024-01-02', '2024-01-29', 1)
+    )
+    moved = dict(next(r for r in current if r['id'] == 'b'), flower_date='2024-01-02')
+
+    updated, written = app.derive_harvest_changes(current, [moved], set(), {}, {'b'})
+
+    assert derived(updated) == {'a': (1, 4.0, 6.0), 'b': (2, 4.0, 6.0), 'c': (2, 6.0, 4.0), 'd': (1, 1.0, 9.0)}
+    assert sorted(r['id'] for r in written) == ['b', 'c']
+
+
+def test_commit_harvest_changes_keeps_the_other_devices_edit(fake):
+    fake.load_documents('harvest_data', stored_batches(
+        harvest('a', '2024-01-01', '2024-01-28', 4), harvest('b', '2024-01-01', '2024-01-30', 3)))
+    stale = {r['id']: r for r in app.get_cached_harvest_data(USERNAME)}
+
+    assert app.commit_harvest_changes(USERNAME, upserts=[dict(stale['a'], equivalent_bakul=5)])
+    # A second device still holding the first copy
+    assert not app.commit_harvest_changes(USERNAME, upserts=[dict(stale['a'], equivalent_bakul=1)])
+    assert not app.commit_harvest_changes(USERNAME, deleted_ids=['a'], expected_revs={'a': stale['a']['rev']})
+
+    stored = {r['id']: r for r in app.load_harvest_data(USERNAME)}
+    assert stored['a']['equivalent_bakul'] == 5
+    assert stored['a']['rev'] == stale['a']['rev'] + 1
+    assert stored['b']['cumulative_harvested'] == 8.0
+
+
+def test_commit_harvest_changes_moves_records_between_batches(fake):
+    fake.load_documents('harvest_data', stored_batches(
+        harvest('a', '2024-01-01', '2024-01-28', 4),
+        harvest('b', '2024-01-01', '2024-01-29', 3),
+        harvest('c', '2024-01-02', '2024-01-29', 1)
+    ))
+    records = {r['id']: r for r in app.get_cached_harvest_data(USERNAME)}
+
+    assert app.commit_harvest_changes(USERNAME, upserts=[dict(records['a'], flower_date='2024-01-02')])
+
+    stored = app.load_harvest_data(USERNAME)
+    assert len(stored) == 3
+    assert derived(stored) == {'a': (1, 4.0, 6.0), 'b': (1, 3.0, 7.0), 'c': (2, 5.0, 5.0)}
@@ -0,0 +1,56 @@
+import streamlit_firebase_tracker as app
+from conftest import USERNAME
+
+
+def seed_estimates(fake, count=23):
+    # Estimates share created_at in pairs, so odd page sizes break pages between ties
+    fake.load_documents('revenue_data', [
+        {'id': 'e%02d' % number, 'username': USERNAME, 'created_at': '2024-01-%02dT08:00:00' % (1 + number // 2)}
+        for number in range(count)
+    ])
+
+
+def all_pages(limit):
+    """[(ids on the page, round trips it took)] until the last page"""
+    fake = app.get_fake_firestore_client()
+    pages = []
+    cursor = None
+    while True:
+        before = fake.round_trips
+        records, cursor = app.fetch_history_page(USERNAME, 'revenue_data', 'created_at', limit, cursor)
+        pages.append(([record['id'] for record in records], fake.round_trips - before))
+        if cursor is None:
+            return pages
+
+
+def newest_first():
+    records = app.load_revenue_data(USERNAME)
+    return [record['id'] for record in sorted(records, key=lambda r: app.history_sort_key(r, 'created_at'), reverse=True)]
+
+
+def test_firestore_pages_cover_every_record_once_in_order(fake):
+    seed_estimates(fake)
+
+    pages = all_pages(5)
+
+    assert [ids for ids, _ in pages] == [newest_first()[start:start + 5] for start in range(0, 23, 5)]
+    assert [trips for _, trips in pages] == [1] * 5
+    assert 'revenue_data' not in app._user_cache_entry(USERNAME)
+
+
+def test_cached_pages_match_the_firestore_pages(fake):
+    seed_estimates(fake)
+    from_firestore = [ids for ids, _ in all_pages(4)]
+    app.get_cached_revenue_data(USERNAME)
+
+    pages = all_pages(4)
+
+    assert [ids for ids, _ in pages] == from_firestore
+    assert [trips for _, trips in pages] == [0] * len(pages)
+
+
+def test_a_page_size_dividing_the_total_ends_without_an_empty_page(fake):
+    seed_estimates(fake, count=10)
+    assert [len(ids) for ids, _ in all_pages(5)] == [5, 5]
+    app.get_cached_revenue_data(USERNAME)
+    assert [len(ids) for ids, _ in all_pages(5)] == [5, 5]
@@ -0,0 +1,112 @@
+import io
+
+import pandas as pd
+import pytest
+
+import streamlit_firebase_tracker as app
+
+
+def csv(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def flower_batches(harvests=()):
+    farm = pd.DataFrame({'Date': pd.to_datetime(['2024-03-01', '2024-03-02'])})
+    for col, count in zip(app.FARM_COLUMNS, (400, 400, 200, 0)):
+        farm[col] = count
+    return app.flower_batch_frame(farm, list(harvests))
+
+
+def test_read_farm_import_maps_old_and_short_headers():
+    rows, errors = app.read_farm_import(csv(
+        "Tarikh,A,Kebun DeYe,c: kebun asan,D: Kebun Uncle\n"
+        "31/01/2024,\"1,200\",300,,x\n"
+        "01/02/2024,5,6,7,8\n"
+    ), 'days.csv')
+
+    assert list(rows.columns) == ['Date'] + app.FARM_COLUMNS
+    assert list(rows['Date']) == [pd.Timestamp('2024-01-31'), pd.Timestamp('2024-02-01')]
+    assert rows[app.FARM_COLUMNS].values.tolist() == [[1200, 300, 0, 0], [5, 6, 7, 8]]
+    assert errors == ["1 bunga count(s) are not numbers"]
+
+
+def test_read_farm_import_needs_a_date_column():
+    with pytest.raises(ValueError):
+        app.read_farm_import(csv("Day,A\n2024-01-01,5\n"), 'days.csv')
+
+
+def test_read_harvest_import_reads_sizes_flags_and_notes():
+    rows, errors = app.read_harvest_import(csv(
+        "Flower Date,Harvest_Date,>600g,>500g kg,Reject bakul,Completed,Notes\n"
+        "2024-03-01,2024-03-29,2,1.5,1,yes,first pick\n"
+        "2024-03-02,2024-03-30,x,,0,,\n"
+    ), 'harvests.csv')
+
+    assert list(rows['flower_date']) == [pd.Timestamp('2024-03-01'), pd.Timestamp('2024-03-02')]
+    assert list(rows['harvest_date']) == [pd.Timestamp('2024-03-29'), pd.Timestamp('2024-03-30')]
+    assert list(rows['>600g bakul']) == [2, 0]
+    assert list(rows['>500g kg']) == [1.5, 0]
+    assert list(rows['Reject bakul']) == [1, 0]
+    assert list(rows['>400g bakul']) == [0, 0]
+    assert list(rows['Completed']) == [True, False]
+    assert list(rows['Notes']) == ['first pick', '']
+    assert errors == ["1 bakul/kg value(s) are not numbers"]
+
+
+def test_read_harvest_import_reads_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'harvests.parquet'
+    pd.DataFrame({
+        'flower date': pd.to_datetime(['2024-03-01']),
+        'harvest date': pd.to_datetime(['2024-03-29']),
+        '>300g bakul': [4]
+    }).to_parquet(path)
+
+    rows, errors = app.read_harvest_import(str(path), 'harvests.parquet')
+
+    assert rows[['flower_date', 'harvest_date', '>300g bakul']].values.tolist() == [
+        [pd.Timestamp('2024-03-01'), pd.Timestamp('2024-03-29'), 4]]
+    assert errors == []
+
+
+def test_validate_harvest_import_reports_blocking_rows():
+    rows, _ = app.read_harvest_import(csv(
+        "Flower Date,Harvest Date,>600g bakul\n"
+        "2024-03-01,2024-02-20,1\n"
+        "2024-04-01,2024-04-29,1\n"
+        "2024-03-02,,1\n"
+        "2024-03-02,2024-03-30,-1\n"
+    ), 'harvests.csv')
+
+    errors = app.validate_harvest_import(rows, flower_batches())
+
+    assert errors == [
+        "1 row(s) have no flower or harvest date",
+        "No flower data for: 2024-04-01",
+        "Harvest before planting on: 2024-03-01 → 2024-02-20",
+        "1 row(s) have negative bakul or kg"
+    ]
+
+
+def test_build_import_harvest_records_skips_or_overwrites_stored_harvests():
+    text = ("Flower Date,Harvest Date,>600g bakul,>600g kg\n"
+            "2024-03-01,2024-03-29,2,0\n"
+            "2024-03-01,2024-03-29,1,7.5\n"
+            "2024-03-02,2024-03-30,0,0\n")
+    rows, _ = app.read_harvest_import(csv(text), 'harvests.csv')
+    records, conflicts = app.build_import_harvest_records(rows, flower_batches(), [])
+
+    assert conflicts == []
+    assert [(r['flower_date'], r['equivalent_bakul'], r['flower_total_bakul']) for r in records] == [
+        ('2024-03-01', 2.0, 25), ('2024-03-01', 1.5, 25)]
+    assert len({r['id'] for r in records}) == 2
+    assert records[0]['created_at'] < records[1]['created_at']
+
+    stored = [dict(record, harvest_number=number, rev=1) for number, record in enumerate(records, 1)]
+    skipped, conflicts = app.build_import_harvest_records(rows, flower_batches(stored), stored)
+    assert skipped == []
+    assert [(c['Stored Bakul'], c['Imported Bakul']) for c in conflicts] == [(2.0, 2.0), (1.5, 1.5)]
+
+    overwritten, _ = app.build_import_harvest_records(rows, flower_batches(stored), stored, overwrite=True)
+    assert [(r['id'], r['rev'], r['created_at']) for r in overwritten] == [
+        (r['id'], 1, r['created_at']) for r in stored]
@@ -0,0 +1,104 @@
+import pandas as pd
+
+import streamlit_firebase_tracker as app
+from conftest import USERNAME
+
+
+def seed_farm(fake, days):
+    """Farm days 'YYYY-MM-DD' -> count per farm, stored as save_farm_changes writes them"""
+    fake.load_documents('farm_data', [
+        dict({'Date': day + 'T00:00:00', 'username': USERNAME}, **{col: count for col in app.FARM_COLUMNS})
+        for day, count in days.items()
+    ])
+
+
+def day_rows(days):
+    return pd.DataFrame([dict({'Date': pd.Timestamp(day)}, **{col: count for col in app.FARM_COLUMNS})
+                         for day, count in days.items()])
+
+
+def session_frame():
+    """The farm frame a newly opened session starts from"""
+    app.get_shared_user_cache()['users'].pop(USERNAME, None)
+    return app.get_cached_farm_data(USERNAME).copy()
+
+
+def stored_summary():
+    app.get_shared_user_cache()['users'].pop(USERNAME, None)
+    return app.get_user_summary(USERNAME)
+
+
+def expected_summary():
+    return app.summarize_dataset('farm_data', app.load_data(USERNAME))
+
+
+def farm_fields(summary):
+    return {field: summary[field] for field in expected_summary()}
+
+
+def test_saves_from_stale_sessions_keep_each_others_totals(fake):
+    seed_farm(fake, {'2024-01-01': 10, '2024-01-02': 20, '2024-02-01': 30})
+    stored_summary()
+    first = session_frame()
+    second = session_frame()
+
+    added = day_rows({'2024-02-02': 5})
+    assert app.save_farm_changes(USERNAME, pd.concat([first, added], ignore_index=True), added, [])
+    # The second session never saw the added day
+    edited = day_rows({'2024-01-02': 25})
+    updated = second.copy()
+    updated.loc[updated['Date'] == pd.Timestamp('2024-01-02'), app.FARM_COLUMNS] = 25
+    assert app.save_farm_changes(USERNAME, updated, edited, [])
+
+    summary = stored_summary()
+    assert farm_fields(summary) == expected_summary()
+    assert summary['farm_days'] == 4
+    assert summary['total_bunga'] == (10 + 25 + 30 + 5) * len(app.FARM_COLUMNS)
+    assert summary['last_day'] == '2024-02-02'
+
+
+def test_deleting_an_edge_day_moves_the_range(fake):
+    seed_farm(fake, {'2024-01-01': 10, '2024-01-02': 20, '2024-02-01': 30})
+    stored_summary()
+    frame = session_frame()
+
+    remaining = frame[frame['Date'] != pd.Timestamp('2024-01-01')].reset_index(drop=True)
+    assert app.save_farm_changes(USERNAME, remaining, remaining.iloc[0:0], [pd.Timestamp('2024-01-01')])
+
+    summary = stored_summary()
+    assert farm_fields(summary) == expected_summary()
+    assert (summary['first_day'], summary['last_day']) == ('2024-01-02', '2024-02-01')
+    assert summary['monthly_bunga'] == {'2024-01': 20 * len(app.FARM_COLUMNS), '2024-02': 30 * len(app.FARM_COLUMNS)}
+
+
+def test_large_saves_apply_each_chunk_once(fake, monkeypatch):
+    write_chunks = app.write_chunks
+    monkeypatch.setattr(app, 'write_chunks', lambda writes: write_chunks(writes, limit=3))
+    seed_farm(fake, {'2024-01-01': 10})
+    stored_summary()
+    frame = session_frame()
+
+    added = day_rows({'2024-01-%02d' % day: day for day in range(2, 12)})
+    assert app.save_farm_changes(USERNAME, pd.concat([frame, added], ignore_index=True), added, [])
+
+    assert fake.calls['commit'] >= 4
+    assert farm_fields(stored_summary()) == expected_summary()
+
+
+def test_harvest_saves_adjust_the_harvest_totals(fake):
+    fake.load_documents('harvest_data', [{
+        'id': 'a', 'username': USERNAME, 'flower_date': '2024-01-01', 'harvest_date': '2024-01-29',
+        'created_at': '2024-01-29T08:00:00', 'equivalent_bakul': 4.0, 'flower_total_bakul': 10,
+        'days_to_harvest': 28, 'harvest_efficiency': 40.0, 'rev': 1
+    }])
+    before = stored_summary()
+    stored = app.get_cached_harvest_data(USERNAME)[0]
+    added = dict(stored, id='b', harvest_date='2024-01-30', created_at='2024-01-30T08:00:00', equivalent_bakul=2.0, rev=0)
+
+    assert app.commit_harvest_changes(USERNAME, upserts=[added])
+    assert app.commit_harvest_changes(USERNAME, upserts=[dict(stored, equivalent_bakul=5.0)])
+
+    summary = stored_summary()
+    assert (before['harvest_count'], before['harvested_bakul']) == (1, 4.0)
+    assert (summary['harvest_count'], summary['harvested_bakul']) == (2, 7.0)
+    assert summary['harvest_days_total'] == 28 + 28
@@ -0,0 +1,110 @@
+import pytest
+
+import streamlit_firebase_tracker as app
+from conftest import USERNAME
+from write_journal import CONFLICT, PENDING, WriteBehindQueue, WriteJournal
+
+
+class Conflict(Exception):
+    pass
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'journal.sqlite3')
+
+
+def test_entries_left_by_a_previous_run_are_replayed_in_order(journal_path):
+    journal = WriteJournal(journal_path)
+    for number in range(3):
+        journal.append(USERNAME, 'farm_data', {'number': number}, ['2024-01-0' + str(number + 1)])
+
+    sent = []
+    queue = WriteBehindQueue(WriteJournal(journal_path), lambda entry: sent.append(entry['payload']['number']))
+    assert queue.flush() == 0
+    assert sent == [0, 1, 2]
+    assert WriteJournal(journal_path).pending() == []
+
+
+def test_a_failed_entry_is_retried_and_holds_back_later_ones(journal_path):
+    journal = WriteJournal(journal_path)
+    journal.append(USERNAME, 'farm_data', {'number': 1}, ['2024-01-01'])
+    journal.append(USERNAME, 'farm_data', {'number': 2}, ['2024-01-02'])
+    sent = []
+    down = [True]
+
+    def apply_entry(entry):
+        if down[0]:
+            raise ConnectionError("offline")
+        sent.append(entry['payload']['number'])
+
+    queue = WriteBehindQueue(journal, apply_entry)
+    assert queue.flush() == 1
+    assert queue.flush() == 2
+    assert sent == []
+    assert journal.summary(USERNAME)[PENDING] == 2
+    assert journal.summary(USERNAME)['last_error'] == "offline"
+
+    down[0] = False
+    assert queue.flush() == 0
+    assert sent == [1, 2]
+
+
+def test_a_conflicting_entry_is_kept_and_later_ones_are_sent(journal_path):
+    journal = WriteJournal(journal_path)
+    journal.append(USERNAME, 'harvest_data', {'id': 'a'}, ['a'])
+    journal.append(USERNAME, 'harvest_data', {'id': 'b'}, ['b'])
+    journal.append(USERNAME, 'harvest_data', {'id': 'a'}, ['a'])
+    sent = []
+    conflicts = []
+
+    def apply_entry(entry):
+        if entry['seq'] == 1:
+            raise Conflict("changed on another device")
+        sent.append(entry['payload']['id'])
+
+    queue = WriteBehindQueue(journal, apply_entry, (Conflict,), conflicts.append)
+    journal.append(USERNAME, 'harvest_data', {'id': 'c'}, ['c'])
+    assert queue.flush() == 0
+    assert sent == ['b', 'a', 'c']
+    assert [entry['seq'] for entry in conflicts] == [1]
+    assert journal.record_status(USERNAME, 'harvest_data') == {'a': CONFLICT}
+    assert journal.summary(USERNAME)[CONFLICT] == 1
+
+    journal.dismiss(USERNAME)
+    assert journal.record_status(USERNAME, 'harvest_data') == {}
+
+
+def test_record_status_shows_unsent_records(journal_path):
+    journal = WriteJournal(journal_path)
+    journal.append(USERNAME, 'farm_data', {}, ['2024-01-01', '2024-01-02'])
+    journal.append('someone_else', 'farm_data', {}, ['2024-01-03'])
+    assert journal.has_pending(USERNAME, 'farm_data')
+    assert not journal.has_pending(USERNAME, 'harvest_data')
+    assert journal.record_status(USERNAME, 'farm_data') == {'2024-01-01': PENDING, '2024-01-02': PENDING}
+
+
+def test_stale_journaled_estimate_is_marked_as_a_conflict(fake, journal_path):
+    fake.load_documents('revenue_data', [{'id': 'e1', 'username': USERNAME, 'total_revenue': 10.0, 'rev': 2}])
+    app.get_cached_revenue_data(USERNAME)
+    version = app.get_data_version(USERNAME)
+    journal = WriteJournal(journal_path)
+    # Saved offline from a copy read before another device's edit
+    journal.append(USERNAME, 'revenue_data', {
+        'upserts': [{'id': 'e1', 'username': USERNAME, 'total_revenue': 99.0, 'rev': 1}],
+        'deleted_ids': [], 'expected_revs': {}, 'known_ids': ['e1']
+    }, ['e1'])
+    journal.append(USERNAME, 'revenue_data', {
+        'upserts': [{'id': 'e2', 'username': USERNAME, 'total_revenue': 5.0, 'rev': 0}],
+        'deleted_ids': [], 'expected_revs': {}, 'known_ids': []
+    }, ['e2'])
+
+    queue = WriteBehindQueue(journal, app.apply_journal_entry, (app.ConcurrentEditError,), app.drop_conflicted_dataset)
+    assert queue.flush() == 0
+
+    stored = {record['id']: record for record in app.load_revenue_data(USERNAME)}
+    assert stored['e1']['total_revenue'] == 10.0
+    assert stored['e2']['rev'] == 1
+    assert journal.record_status(USERNAME, 'revenue_data') == {'e1': CONFLICT}
+    assert app.get_data_version(USERNAME) > version
+    assert 'revenue_data' not in app._user_cache_entry(USERNAME)
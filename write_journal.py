@@ -0,0 +1,220 @@
+"""Write-behind journal for Bunga di Kebun.
+
+With write-behind enabled, saves append an entry to a SQLite journal on local
+disk and return immediately. A WriteBehindQueue thread sends pending entries to
+Firestore in the order they were saved, retrying with exponential backoff while
+the connection is down. Entries are deleted only once Firestore has accepted
+them, so anything still pending when the server stops is sent after the next
+start.
+
+Entries whose write can never succeed (another device changed the same record)
+are kept with status 'conflict' so the UI can show them until dismissed.
+
+Configured from the app's secrets:
+
+    [storage]
+    write_behind = true
+    journal_path = ".bunga_journal.sqlite3"
+
+The journal has to live on a disk that survives restarts for replay to work.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+PENDING = 'pending'
+CONFLICT = 'conflict'
+RETRY_BASE_SECONDS = 1
+RETRY_MAX_SECONDS = 60
+FLUSH_BATCH_ENTRIES = 50
+
+logger = logging.getLogger(__name__)
+
+
+class WriteJournal:
+    """Append-only list of saves not yet accepted by Firestore, kept in SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL keeps appends cheap and readable while the flusher is sending
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " username TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " record_keys TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL)"
+        )
+
+    def append(self, username, kind, payload, record_keys):
+        """Journal one save; record_keys identify the records it touches for pending-sync display"""
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO entries (username, kind, payload, record_keys, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (username, kind, json.dumps(payload, default=str), json.dumps(sorted(record_keys, key=str)), PENDING, time.time())
+            )
+            return cursor.lastrowid
+
+    def pending(self, limit=FLUSH_BATCH_ENTRIES):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT seq, username, kind, payload, attempts FROM entries WHERE status = ? ORDER BY seq LIMIT ?",
+                (PENDING, limit)
+            ).fetchall()
+        return [{'seq': seq, 'username': username, 'kind': kind, 'payload': json.loads(payload), 'attempts': attempts}
+                for seq, username, kind, payload, attempts in rows]
+
+    def mark_done(self, seq):
+        with self._lock:
+            self._connection.execute("DELETE FROM entries WHERE seq = ?", (seq,))
+
+    def mark_retry(self, seq, error):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE entries SET attempts = attempts + 1, last_error = ? WHERE seq = ?", (error, seq)
+            )
+
+    def mark_conflict(self, seq, error):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE entries SET status = ?, attempts = attempts + 1, last_error = ? WHERE seq = ?",
+                (CONFLICT, error, seq)
+            )
+
+    def dismiss(self, username, status=CONFLICT):
+        with self._lock:
+            self._connection.execute("DELETE FROM entries WHERE username = ? AND status = ?", (username, status))
+
+    def has_pending(self, username, kind):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM entries WHERE username = ? AND kind = ? AND status = ? LIMIT 1", (username, kind, PENDING)
+            ).fetchone()
+        return row is not None
+
+    def record_status(self, username, kind):
+        """record key -> 'pending' or 'conflict' for the user's unsent entries of one kind"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT record_keys, status FROM entries WHERE username = ? AND kind = ? ORDER BY seq",
+                (username, kind)
+            ).fetchall()
+        status = {}
+        for record_keys, entry_status in rows:
+            for key in json.loads(record_keys):
+                # A conflict stays visible even if a later save of the record is pending
+                if status.get(key) != CONFLICT:
+                    status[key] = entry_status
+        return status
+
+    def summary(self, username):
+        """{'pending', 'conflict', 'attempts', 'last_error', 'oldest'} for the user's unsent entries"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*), MAX(attempts), MIN(created_at) FROM entries WHERE username = ? GROUP BY status",
+                (username,)
+            ).fetchall()
+            last_error = self._connection.execute(
+                "SELECT last_error FROM entries WHERE username = ? AND last_error IS NOT NULL ORDER BY seq DESC LIMIT 1",
+                (username,)
+            ).fetchone()
+        result = {PENDING: 0, CONFLICT: 0, 'attempts': 0, 'last_error': last_error[0] if last_error else None, 'oldest': None}
+        for status, count, attempts, oldest in rows:
+            result[status] = count
+            result['attempts'] = max(result['attempts'], attempts or 0)
+            if status == PENDING:
+                result['oldest'] = oldest
+        return result
+
+
+class WriteBehindQueue:
+    """Background thread sending journal entries to Firestore in order.
+
+    apply_entry(entry) performs one entry's writes and raises on failure. Exceptions
+    of a conflict_errors type mark the entry as a conflict and move on; anything else
+    is treated as a connection problem: the entry is retried with backoff and later
+    entries wait behind it so saves reach Firestore in order.
+    """
+
+    def __init__(self, journal, apply_entry, conflict_errors=(), on_conflict=None):
+        self.journal = journal
+        self._apply_entry = apply_entry
+        self._conflict_errors = tuple(conflict_errors)
+        self._on_conflict = on_conflict
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._status = {'last_flush': None, 'sent': 0, 'retry_at': None}
+
+    def start(self):
+        # Entries left by a previous run are sent on the first pass
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='write-behind', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def notify(self):
+        """A save was journaled (or a retry was requested); flush now"""
+        with self._lock:
+            self._status['retry_at'] = None
+        self._wake.set()
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def _loop(self):
+        # No wait on the first pass, so entries journaled before a restart are sent right away
+        delay = 0
+        while not self._stopped.is_set():
+            self._wake.wait(timeout=delay)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            failures = self.flush()
+            if failures:
+                delay = min(RETRY_BASE_SECONDS * 2 ** (failures - 1), RETRY_MAX_SECONDS)
+                with self._lock:
+                    self._status['retry_at'] = time.time() + delay
+            else:
+                delay = None
+
+    def flush(self):
+        """Send pending entries until the journal is empty or one fails.
+        Returns the failing entry's attempt count (0 when everything was sent)."""
+        while True:
+            entries = self.journal.pending()
+            if not entries:
+                return 0
+            for entry in entries:
+                try:
+                    self._apply_entry(entry)
+                except self._conflict_errors as e:
+                    logger.warning("Write-behind entry %s conflicts: %s", entry['seq'], e)
+                    self.journal.mark_conflict(entry['seq'], str(e))
+                    if self._on_conflict:
+                        self._on_conflict(entry)
+                    continue
+                except Exception as e:
+                    logger.warning("Write-behind entry %s failed, will retry: %s", entry['seq'], e)
+                    self.journal.mark_retry(entry['seq'], str(e))
+                    return entry['attempts'] + 1
+                self.journal.mark_done(entry['seq'])
+                with self._lock:
+                    self._status['sent'] += 1
+                    self._status['last_flush'] = time.time()